@@ -178,6 +178,12 @@ class ReferenceTab(ttk.Frame):
             for param, desc in sorted_params:
                 if param.startswith(cat_prefix):
                     self.params_tree.insert(category_id, "end", values=(param, desc))
+        # Properties added with core_logic.register_property() under any other prefix.
+        custom_params = [(p, d) for p, d in sorted_params if not p.startswith(tuple(categories.values()))]
+        if custom_params:
+            category_id = self.params_tree.insert("", "end", values=("--- Custom Properties ---", ""), open=False, tags=('category',))
+            for param, desc in custom_params:
+                self.params_tree.insert(category_id, "end", values=(param, desc))
         self.params_tree.tag_configure('category', background='#d3d3d3', foreground='black', font=('Segoe UI', 10, 'bold'))
 
     def create_operators_table(self, parent):
@@ -0,0 +1,324 @@
+# benchmark_finder.py
+# A small, offline benchmark for the ElementFinder. It runs the finder against a synthetic
+# pool of elements that count their "cross-process" calls, so the cost of each search mode
+# can be compared without a live application.
+
+import logging
+import sys
+import time
+
+# --- Shared Logic Import ---
+try:
+    import core_logic
+    from finder_backends import InMemoryBackend, InMemoryElement
+except ImportError:
+    print("CRITICAL ERROR: 'core_logic.py' and 'finder_backends.py' must be in the same directory.")
+    sys.exit(1)
+
+# ======================================================================
+#                      SYNTHETIC ELEMENTS
+# ======================================================================
+
+class _Rect:
+    def __init__(self, left, top, right, bottom):
+        self.left, self.top, self.right, self.bottom = left, top, right, bottom
+
+    def mid_point(self):
+        class _Point: pass
+        point = _Point()
+        point.x, point.y = (self.left + self.right) // 2, (self.top + self.bottom) // 2
+        return point
+
+class SyntheticElement:
+    """Mimics the pywinauto wrapper calls used by core_logic and counts them."""
+    call_count = 0
+
+    def __init__(self, index):
+        self.index = index
+        self.handle = 0
+        self._control_type = 'Edit' if index % 20 == 0 else 'Text'
+
+    def _call(self, value):
+        SyntheticElement.call_count += 1
+        return value
+
+    def window_text(self): return self._call(f"Element {self.index}")
+    def control_type(self): return self._call(self._control_type)
+    def automation_id(self): return self._call(f"auto_{self.index}")
+    def class_name(self): return self._call('SyntheticClass')
+    def is_enabled(self): return self._call(True)
+    def is_visible(self): return self._call(True)
+    def rectangle(self): return self._call(_Rect(0, self.index * 10, 100, self.index * 10 + 8))
+
+def build_pool(size):
+    return [SyntheticElement(i) for i in range(size)]
+
+# ======================================================================
+#                      BENCHMARK RUNNERS
+# ======================================================================
+
+def _time_find(finder, pool, spec, repeat):
+    SyntheticElement.call_count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = finder.find(lambda: pool, spec)
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, SyntheticElement.call_count // repeat, len(result)
+
+def benchmark_logging_modes(pool_size=5000, repeat=5):
+    """Compares a silent finder with a verbose one (every diagnostic line consumed)."""
+    pool = build_pool(pool_size)
+    spec = {'pwa_control_type': 'Edit', 'state_is_enabled': True}
+    messages = []
+
+    silent_finder = core_logic.ElementFinder(None, None)
+    verbose_finder = core_logic.ElementFinder(None, None, log_callback=lambda level, message: messages.append(message))
+
+    results = {}
+    for mode, finder in (('silent', silent_finder), ('verbose', verbose_finder)):
+        elapsed, calls, found = _time_find(finder, pool, spec, repeat)
+        results[mode] = {'seconds': elapsed, 'element_calls': calls, 'found': found}
+    return results
+
+def build_form_tree(panels=50, fields_per_panel=40):
+    """Builds an in-memory window of panels full of labels, edits and buttons."""
+    window = InMemoryElement({'pwa_title': 'Synthetic Window', 'pwa_control_type': 'Window'})
+    for p in range(panels):
+        panel = window.add_child(InMemoryElement({'pwa_control_type': 'Pane', 'pwa_auto_id': f'panel{p}'}))
+        for f in range(fields_per_panel):
+            control_type = ('Text', 'Edit', 'Button')[f % 3]
+            panel.add_child(InMemoryElement({
+                'pwa_title': f'Field {p}.{f}',
+                'pwa_control_type': control_type,
+                'pwa_auto_id': f'field_{p}_{f}',
+                'pwa_class_name': 'Synthetic' + control_type,
+                'state_is_enabled': f % 7 != 0,
+                'geo_bounding_rect_tuple': (f * 10, p * 30, f * 10 + 8, p * 30 + 20),
+            }))
+    return window
+
+def benchmark_pushdown(repeat=5):
+    """
+    Runs the same specs with push-down on and off over an in-memory tree, checks that
+    both give identical results and reports the wrapper calls made by each.
+    """
+    window = build_form_tree()
+    specs = [
+        {'pwa_auto_id': 'field_10_5', 'pwa_control_type': 'Button'},
+        {'pwa_control_type': 'Edit', 'state_is_enabled': False, 'sort_by_scan_order': 3},
+        {'pwa_class_name': ('in', ['SyntheticEdit', 'SyntheticButton']), 'pwa_title': ('icontains', 'field 4.')},
+        {'pwa_title': 'Field 3.3'},
+    ]
+    finders = {
+        'pushdown': core_logic.ElementFinder(None, None, backend=InMemoryBackend()),
+        'python': core_logic.ElementFinder(None, None, backend=InMemoryBackend(), pushdown=False),
+    }
+    results = {}
+    for mode, finder in finders.items():
+        InMemoryElement.call_count = 0
+        start = time.perf_counter()
+        found = []
+        for _ in range(repeat):
+            found = [finder.find(finder.scope(window), spec) for spec in specs]
+        results[mode] = {
+            'seconds': (time.perf_counter() - start) / repeat,
+            'element_calls': InMemoryElement.call_count // repeat,
+            'found': sum(len(f) for f in found),
+            'results': found,
+        }
+    if results['pushdown']['results'] != results['python']['results']:
+        raise AssertionError("Push-down and pure-Python evaluation returned different results.")
+    return results
+
+def benchmark_prefetch(repeat=5):
+    """
+    Runs searches that must see every candidate with property prefetch on and off over an
+    in-memory tree, checks that both give identical results and reports the element calls
+    (a prefetch counts as one call for the whole result set).
+    """
+    window = build_form_tree()
+    specs = [
+        {'pwa_title': ('icontains', '.1'), 'state_is_enabled': True},
+        {'pwa_control_type': 'Edit', 'sort_by_y_pos': -1},
+        {'pwa_class_name': ('regex', '^SyntheticB'), 'pwa_auto_id': ('regex', r'_1\d_')},
+        {'pwa_control_type': 'Pane', 'sort_by_child_count': -1},
+    ]
+    finders = {
+        'prefetch': core_logic.ElementFinder(None, None, backend=InMemoryBackend()),
+        'live': core_logic.ElementFinder(None, None, backend=InMemoryBackend(), prefetch=False),
+    }
+    results = {}
+    for mode, finder in finders.items():
+        InMemoryElement.call_count = 0
+        start = time.perf_counter()
+        found = []
+        for _ in range(repeat):
+            found = [finder.find(finder.scope(window), spec) for spec in specs]
+        results[mode] = {
+            'seconds': (time.perf_counter() - start) / repeat,
+            'element_calls': InMemoryElement.call_count // repeat,
+            'found': sum(len(f) for f in found),
+            'results': found,
+        }
+    if results['prefetch']['results'] != results['live']['results']:
+        raise AssertionError("Prefetched and live property reads returned different results.")
+    return results
+
+def benchmark_find_many(repeat=5):
+    """
+    Resolves a login-style set of specs one find() at a time and with one find_many() pass,
+    checks that both give identical results and reports the element calls and tree walks
+    of each. Three of the specs read the same keys, which one pass reads once.
+    """
+    window = build_form_tree()
+    specs = {
+        'username': {'pwa_class_name': 'SyntheticEdit', 'sort_by_scan_order': 1},
+        'password': {'pwa_class_name': 'SyntheticEdit', 'sort_by_scan_order': 2},
+        'login': {'pwa_title': ('equals', 'Field 12.5'), 'pwa_control_type': 'Button'},
+        'help': {'pwa_title': ('equals', 'Field 30.2'), 'pwa_control_type': 'Button'},
+        'cancel': {'pwa_title': ('equals', 'Field 45.8'), 'pwa_control_type': 'Button'},
+    }
+    backend = InMemoryBackend()
+    finder = core_logic.ElementFinder(None, None, backend=backend, pushdown=False, prefetch=False)
+    runs = {
+        'one_by_one': lambda: {name: finder.find(finder.scope(window), spec, limit=2) for name, spec in specs.items()},
+        'find_many': lambda: finder.find_many(finder.scope(window), specs, limit=2),
+    }
+    results = {}
+    for mode, run in runs.items():
+        InMemoryElement.call_count = 0
+        backend.walks = backend.nodes_walked = 0
+        start = time.perf_counter()
+        found = {}
+        for _ in range(repeat):
+            found = run()
+        results[mode] = {
+            'seconds': (time.perf_counter() - start) / repeat,
+            'element_calls': InMemoryElement.call_count // repeat,
+            'walks': backend.walks // repeat,
+            'nodes_walked': backend.nodes_walked // repeat,
+            'found': sum(len(f) for f in found.values()),
+            'results': found,
+        }
+    if results['one_by_one']['results'] != results['find_many']['results']:
+        raise AssertionError("find_many() and one-by-one find() returned different results.")
+    return results
+
+def benchmark_relations(repeat=5):
+    """
+    Finds the field right of / below / near a label with the relation operators (one
+    SpatialIndex per search) and with pairwise checks of every candidate against every
+    anchor, checks that both give identical results and reports the time of each.
+    """
+    window = build_form_tree()
+    specs = [
+        {'pwa_control_type': 'Edit', 'geo_bounding_rect_tuple': ('right_of', {'pwa_title': 'Field 12.3'}), 'sort_by_anchor_distance': 1},
+        {'geo_bounding_rect_tuple': ('below', ({'pwa_class_name': 'SyntheticButton', 'pwa_title': ('regex', r'^Field 7\.')}, 15))},
+        {'pwa_control_type': 'Button', 'geo_bounding_rect_tuple': ('near', ({'pwa_title': 'Field 20.20'}, 40))},
+    ]
+    finder = core_logic.ElementFinder(None, None, backend=InMemoryBackend())
+
+    def pairwise(spec):
+        pool = list(finder.iter_descendants(window))
+        cache = finder.new_property_cache()
+        criteria = spec['geo_bounding_rect_tuple']
+        anchor_spec, _ = core_logic.relation_target(criteria[1])
+        anchors = finder._apply_filters(pool, dict(anchor_spec), cache)
+        anchor_rects = [cache.get(a, 'geo_bounding_rect_tuple') for a in anchors]
+        matches = [e for e in pool if e not in anchors
+                   and finder._check_condition(cache.get(e, 'geo_bounding_rect_tuple'), criteria, anchor_rects)]
+        others = {k: v for k, v in spec.items() if k != 'geo_bounding_rect_tuple'}
+        return finder._run_plan(matches, core_logic.compile_spec(others).ordered_filters(),
+                                core_logic.compile_spec(others).selectors, cache, anchor_rects)
+
+    runs = {
+        'index': lambda: [finder.find(finder.scope(window), spec) for spec in specs],
+        'pairwise': lambda: [pairwise(spec) for spec in specs],
+    }
+    results = {}
+    for mode, run in runs.items():
+        InMemoryElement.call_count = 0
+        start = time.perf_counter()
+        found = []
+        for _ in range(repeat):
+            found = run()
+        results[mode] = {
+            'seconds': (time.perf_counter() - start) / repeat,
+            'element_calls': InMemoryElement.call_count // repeat,
+            'found': sum(len(f) for f in found),
+            'results': found,
+        }
+    if results['index']['results'] != results['pairwise']['results']:
+        raise AssertionError("Indexed and pairwise relation checks returned different results.")
+    return results
+
+def build_deep_tree(depth=6, fanout=4):
+    """Builds a Swing-like window of nested panes, `depth` levels deep, with fields at the leaves."""
+    window = InMemoryElement({'pwa_title': 'Deep Window', 'pwa_control_type': 'Window'})
+    level = [(window, '')]
+    for d in range(depth):
+        next_level = []
+        for parent, name in level:
+            for i in range(fanout):
+                child_name = f'{name}{i}'
+                if d < depth - 1:
+                    child = parent.add_child(InMemoryElement({'pwa_control_type': 'Pane', 'pwa_auto_id': f'pane{child_name}'}))
+                else:
+                    child = parent.add_child(InMemoryElement({'pwa_control_type': ('Text', 'Edit')[i % 2], 'pwa_auto_id': f'field{child_name}'}))
+                next_level.append((child, child_name))
+        level = next_level
+    return window
+
+def benchmark_path(repeat=5):
+    """
+    Resolves a leaf field of a deep tree with a flat spec (a full descendants scan) and
+    with path specs that walk only the branch leading to it, checks that all give the same
+    element and reports the element calls made by each.
+    """
+    window = build_deep_tree()
+    flat_spec = {'pwa_auto_id': 'field210311', 'pwa_control_type': 'Edit'}
+    child_path = [('child', {'pwa_auto_id': 'pane2'}), ('child', {'pwa_auto_id': 'pane21'}),
+                  {'pwa_auto_id': 'pane210'}, {'pwa_control_type': 'Edit', 'pwa_auto_id': 'field210311'}]
+    pushdown_path = [{'pwa_auto_id': 'pane21'}, {'pwa_auto_id': 'field210311'}]
+    live = core_logic.ElementFinder(None, None, backend=InMemoryBackend(), pushdown=False, prefetch=False)
+    pushdown = core_logic.ElementFinder(None, None, backend=InMemoryBackend(), prefetch=False)
+    runs = {
+        'flat': lambda: live.find(live.scope(window), flat_spec, limit=2),
+        'path': lambda: live.find(live.scope(window), child_path, limit=2),
+        'pushdown': lambda: pushdown.find(pushdown.scope(window), pushdown_path, limit=2),
+    }
+    results = {}
+    for mode, run in runs.items():
+        InMemoryElement.call_count = 0
+        start = time.perf_counter()
+        found = []
+        for _ in range(repeat):
+            found = run()
+        results[mode] = {
+            'seconds': (time.perf_counter() - start) / repeat,
+            'element_calls': InMemoryElement.call_count // repeat,
+            'found': len(found),
+            'results': found,
+        }
+    if not results['flat']['results'] == results['path']['results'] == results['pushdown']['results']:
+        raise AssertionError("Path and flat specs returned different results.")
+    return results
+
+def print_results(title, results):
+    print(f"--- {title} ---")
+    for mode, data in results.items():
+        walked = f"   {data['walks']} walks / {data['nodes_walked']} nodes" if 'walks' in data else ''
+        print(f"  {mode:<10} {data['seconds'] * 1000:9.2f} ms   {data['element_calls']:7d} element calls   {data['found']} found{walked}")
+
+# ======================================================================
+#                       ENTRY POINT
+# ======================================================================
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', stream=sys.stdout)
+    print_results("Logging modes (5,000 elements)", benchmark_logging_modes())
+    print_results("Push-down vs pure Python (2,050 in-memory elements)", benchmark_pushdown())
+    print_results("Prefetch vs live reads (2,050 in-memory elements)", benchmark_prefetch())
+    print_results("One-by-one vs find_many (2,050 in-memory elements)", benchmark_find_many())
+    print_results("Indexed vs pairwise relations (2,050 in-memory elements)", benchmark_relations())
+    print_results("Flat vs path specs (5,461 in-memory elements)", benchmark_path())
@@ -1,16 +1,39 @@
 # core_controller.py
 # Refactored Version: Provides the main class for executing UI actions.
 # --- FIX: Corrected a TypeError in get_next_state by passing the missing 'retry_interval' argument.
+# --- PERF: resolve_many() resolves several element specs of one window with a single tree walk.
+# --- PERF: Element searches stream the window tree (with UIA push-down of equality criteria)
+# and existence checks stop at the second match.
+# --- PERF: An element_spec may be a path spec (a list of child/descendant steps), which only
+# walks the panes the path leads into instead of the whole window.
+# --- PERF: Resolved windows are cached per window_spec and revalidated (IsWindow + the spec's
+# filters on that one window) before falling back to a desktop scan. See cache_stats().
+# Uniqueness checks (check_exists, get_next_state, resolve_many) always scan the desktop.
+# --- PERF: Resolved elements are cached per window and element_spec. A hit is confirmed by
+# reading the element's RuntimeId (plus the spec's filters if they use volatile properties);
+# notify_structure_changed() drops the entries of a window. Uniqueness checks search again.
+# --- PERF: wait_mode='events' replaces the sleep between attempts with a wait for a relevant
+# UI event (window opened/closed, structure or property change, see ui_events), with
+# polling every event_fallback_interval seconds as a fallback (on the retry schedule for
+# desktop-level waits, which do not see changes inside the windows).
+# --- PERF: Each get_next_state tick enumerates the desktop windows once and resolves all cases
+# against that snapshot (one pass per distinct window_spec set, one per resolved window).
+# --- PERF: One Deadline covers the whole resolution (window + element); retries follow a
+# BackoffPolicy (fast first probe, exponential backoff with jitter, capped at
+# default_retry_interval, clamped to the remaining time) unless a fixed retry_interval is given.
 
 import logging
+import random
 import time
 import threading
 import sys
+from collections import OrderedDict
 
 # --- Required Libraries ---
 try:
     import win32api
     import win32con
+    import win32gui
     import pyperclip
     from pynput import mouse, keyboard
     from pywinauto.findwindows import ElementNotFoundError
@@ -32,13 +55,15 @@ if not logging.getLogger().hasHandlers():
 # --- Import refactored components ---
 try:
     from . import core_logic
+    from . import ui_events
     from .ui_notifier import StatusNotifier
 except ImportError:
     try:
         import core_logic
+        import ui_events
         from ui_notifier import StatusNotifier
     except ImportError:
-        print("CRITICAL ERROR: 'core_logic.py' and 'ui_notifier.py' must be in the same directory.")
+        print("CRITICAL ERROR: 'core_logic.py', 'ui_events.py' and 'ui_notifier.py' must be in the same directory.")
         sys.exit(1)
 
 
@@ -98,13 +123,136 @@ class HumanActivityListener:
             if event_emitter_callback:
                 event_emitter_callback('success', "User is idle. Resuming automation...", duration=3)
 
+class Deadline:
+    """The moment a whole operation must be done by, on the monotonic clock."""
+    def __init__(self, timeout, clock=time.monotonic):
+        self.timeout = timeout
+        self._clock = clock
+        self.expires_at = clock() + max(timeout, 0)
+
+    def remaining(self):
+        return max(self.expires_at - self._clock(), 0.0)
+
+    def expired(self):
+        return self._clock() >= self.expires_at
+
+    def __repr__(self):
+        return f"Deadline(timeout={self.timeout}, remaining={self.remaining():.3f})"
+
+class BackoffPolicy:
+    """
+    Delays between the attempts of a retry loop: 'initial' before the first retry (a fast
+    probe), then multiplied by 'factor' per retry up to 'max_delay'. Each delay is spread
+    by +/- 'jitter' (a fraction), so loops started together do not poll in lockstep, and
+    never exceeds the cap or the deadline's remaining time.
+    """
+    def __init__(self, initial=0.05, factor=2.0, max_delay=2.0, jitter=0.2, rng=None):
+        self.initial = initial
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._random = rng or random.Random()
+
+    @classmethod
+    def fixed(cls, interval):
+        """The old behaviour: the same delay before every retry."""
+        return cls(initial=interval, factor=1.0, max_delay=interval, jitter=0.0)
+
+    def schedule(self, deadline):
+        return RetrySchedule(self, deadline)
+
+    def jitter_factor(self):
+        return 1 + self._random.uniform(-self.jitter, self.jitter) if self.jitter else 1.0
+
+    def __repr__(self):
+        return f"BackoffPolicy(initial={self.initial}, factor={self.factor}, max_delay={self.max_delay}, jitter={self.jitter})"
+
+class RetrySchedule:
+    """The delays of one retry loop under a BackoffPolicy and a Deadline."""
+    def __init__(self, policy, deadline):
+        self.policy = policy
+        self.deadline = deadline
+        self.attempts = 0
+        self._base = min(policy.initial, policy.max_delay)
+
+    def next_delay(self):
+        policy = self.policy
+        delay = self._base * policy.jitter_factor()
+        self._base = min(self._base * policy.factor, policy.max_delay)
+        self.attempts += 1
+        return max(min(delay, policy.max_delay, self.deadline.remaining()), 0.0)
+
+class ResolutionCache:
+    """
+    Bounded LRU map from a canonical spec key to the last element it resolved to, with
+    hit/miss/invalidation counters. lookup() takes a validate(entry) callback; an entry
+    that fails it (or raises) is dropped and the lookup counts as an invalidation and a miss.
+    Safe to invalidate from an event thread.
+    """
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def lookup(self, key, validate):
+        with self._lock:
+            return self._lookup(key, validate)
+
+    def _lookup(self, key, validate):
+        entry = self._entries.get(key)
+        if entry is not None:
+            try:
+                valid = validate(entry)
+            except Exception:
+                valid = False
+            if valid:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry
+            self.invalidate(key)
+        self.stats['misses'] += 1
+        return None
+
+    def store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stats['invalidations'] += 1
+
+    def invalidate_where(self, predicate):
+        """Drops every entry for which predicate(key, entry) is true; returns how many."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if predicate(key, entry)]
+            for key in stale:
+                self.invalidate(key)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
 DEFAULT_CONTROLLER_CONFIG = {
     'backend': 'uia',
     'human_interruption_detection': False,
     'human_cooldown_period': 5,
     'secure_mode': False,
     'default_timeout': 10,
-    'default_retry_interval': 0.5
+    'default_retry_interval': 0.5,   # Longest delay between retries of the default retry_policy.
+    'retry_policy': None,            # A BackoffPolicy; default: backoff capped at default_retry_interval.
+    'resolution_cache': True,        # Reuse resolved targets; a reused one is not re-checked for uniqueness.
+    'wait_mode': 'poll',               # 'poll' or 'events'
+    'event_source': None,              # a ui_events.EventSource; default UIAEventSource in 'events' mode
+    'event_fallback_interval': 2.0     # Longest wait for an event before checking again anyway.
 }
 
 class UIController:
@@ -112,6 +260,10 @@ class UIController:
     BACKGROUND_SAFE_ACTIONS = {'set_text', 'send_message_text'}
     SENSITIVE_ACTIONS = {'paste_text', 'type_keys', 'set_text'}
     VALID_ACTIONS = {action['name'] for action in core_logic.ACTION_DEFINITIONS}
+    # Properties that do not change during an element's lifetime: a cached element whose
+    # spec only uses these is confirmed by its RuntimeId alone.
+    IDENTITY_KEYS = {'pwa_auto_id', 'pwa_control_type', 'pwa_class_name', 'pwa_framework_id',
+                     'win32_handle', 'proc_pid', 'proc_name', 'proc_path'}
 
     def __init__(self, notifier=None, event_callback=None, **kwargs):
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -136,8 +288,17 @@ class UIController:
         self.finder = core_logic.ElementFinder(
             uia_instance=self.uia,
             tree_walker=self.tree_walker,
-            log_callback=self._internal_log
+            log_callback=self._internal_log,
+            log_wants=self._internal_log_wants
         )
+        self.window_cache = ResolutionCache()
+        self.element_cache = ResolutionCache(max_size=512)
+        self.retry_policy = self.config['retry_policy']
+        if self.retry_policy is None:
+            self.retry_policy = BackoffPolicy(max_delay=self.config['default_retry_interval'])
+        self.event_source = self.config['event_source']
+        if self.event_source is None and self.config['wait_mode'] == 'events':
+            self.event_source = ui_events.UIAEventSource(self.uia)
         
         self._bot_acting_lock = threading.Lock()
         self._is_bot_acting = [False]
@@ -152,6 +313,9 @@ class UIController:
     def _internal_log(self, level, message):
         self.logger.debug(f"[ElementFinder] {message}")
 
+    def _internal_log_wants(self, level):
+        return self.logger.isEnabledFor(logging.DEBUG)
+
     def _emit_event(self, event_type, message, **kwargs):
         log_levels = {"info": logging.INFO, "success": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR, "process": logging.DEBUG, "debug": logging.DEBUG}
         self.logger.log(log_levels.get(event_type, logging.INFO), message)
@@ -167,15 +331,80 @@ class UIController:
 
     def close(self):
         self.logger.info("Closing UIController...")
+        if self.event_source:
+            self.event_source.close()
+
+    def cache_stats(self):
+        """Hit/miss/invalidation counters of the resolution caches."""
+        return {'window': dict(self.window_cache.stats), 'element': dict(self.element_cache.stats)}
+
+    def clear_caches(self):
+        self.window_cache.clear()
+        self.element_cache.clear()
+
+    def notify_structure_changed(self, window=None):
+        """
+        Drops the cached elements of a window (a wrapper or a handle), or of every window,
+        after its tree changed. Returns how many entries were dropped. The pattern
+        interfaces cached by RuntimeId (core_logic.PATTERN_CACHE) are dropped as well: they
+        are not kept per window, and a changed tree is where RuntimeIds get reused.
+        """
+        core_logic.clear_pattern_cache()
+        if window is None:
+            return self.element_cache.invalidate_where(lambda key, entry: True)
+        window_id = window if isinstance(window, int) else self._window_identity(window)
+        return self.element_cache.invalidate_where(lambda key, entry: key[0] == window_id)
+
+    def _waiter(self, root=None, specs=()):
+        """
+        The waiter of a retry loop: an EventWaiter for the changes below root that can affect
+        the specs' properties, or a PollingWaiter when no event source is used.
+        """
+        if self.event_source is None:
+            return ui_events.PollingWaiter()
+        keys = set()
+        for spec in specs:
+            if not spec:
+                continue
+            if not isinstance(spec, dict):
+                keys = None  # Path specs: any property change may matter.
+                break
+            keys.update(core_logic.compile_spec(spec).property_keys())
+        return ui_events.EventWaiter(self.event_source, root, keys, on_event=self._on_ui_event)
+
+    def _on_ui_event(self, event):
+        if event.kind == ui_events.STRUCTURE_CHANGED and event.window:
+            self.notify_structure_changed(event.window)
+
+    def _retry_policy(self, retry_interval):
+        """A fixed policy for an explicit retry_interval, else the controller's retry_policy."""
+        return self.retry_policy if retry_interval is None else BackoffPolicy.fixed(retry_interval)
+
+    def _pause(self, waiter, schedule):
+        """
+        Waits before the next attempt: the schedule's next delay when polling; with events,
+        until a relevant event arrives (at most event_fallback_interval). A desktop-level
+        waiter (no root) only hears about top-level windows, not about changes inside them
+        (e.g. get_next_state's element specs), so it waits at most the schedule's delay.
+        Never past the deadline.
+        """
+        if self.event_source is None:
+            waiter.wait(schedule.next_delay())
+            return
+        timeout = self.config['event_fallback_interval']
+        if waiter.root is None:
+            timeout = min(timeout, schedule.next_delay())
+        waiter.wait(min(timeout, schedule.deadline.remaining()))
 
     def check_exists(self, window_spec, element_spec=None, timeout=None, retry_interval=None):
         timeout = timeout if timeout is not None else self.config['default_timeout']
-        retry_interval = retry_interval if retry_interval is not None else self.config['default_retry_interval']
+        policy = self._retry_policy(retry_interval)
         self._emit_event('info', "Checking for target existence...")
         
         try:
             self._wait_for_user_idle()
-            self._find_target_element(window_spec, element_spec, timeout, retry_interval)
+            # Two matches are enough to tell "unique" from "ambiguous".
+            self._find_target_element(window_spec, element_spec, Deadline(timeout), policy, max_matches=2)
             self._emit_event('success', "Target found.")
             return True
         except (WindowNotFoundError, ElementNotFoundFromWindowError, AmbiguousElementError) as e:
@@ -188,37 +417,81 @@ class UIController:
 
     def get_next_state(self, cases, timeout=None, retry_interval=None, description=None, notify_style='info'):
         timeout = timeout if timeout is not None else self.config['default_timeout']
-        retry_interval = retry_interval if retry_interval is not None else self.config['default_retry_interval']
+        policy = self._retry_policy(retry_interval)
         display_message = description or f"Waiting for one of {len(cases)} states"
         self._emit_event(notify_style if description else 'info', display_message)
         
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        deadline = Deadline(timeout)
+        watched = [spec for specs in cases.values() for spec in (specs.get('window_spec'), specs.get('element_spec'))]
+        with self._waiter(None, watched) as waiter:
+            return self._wait_for_next_state(cases, waiter, policy.schedule(deadline), display_message)
+
+    def _wait_for_next_state(self, cases, waiter, schedule, display_message):
+        while not schedule.deadline.expired():
             self._wait_for_user_idle()
-            for case_name, specs in cases.items():
-                self.logger.debug(f"--- Checking case: '{case_name}' ---")
-                try:
-                    # FIX: Added the missing 'retry_interval' argument. Using 0 as we don't want
-                    # the internal find to wait, the waiting is handled by this method's loop.
-                    self._find_target_element(
-                        specs.get('window_spec'), 
-                        specs.get('element_spec'), 
-                        timeout=0, 
-                        retry_interval=0
-                    )
-                    self._emit_event('success', f"Success: '{display_message}' -> State '{case_name}' found")
-                    return case_name
-                except (WindowNotFoundError, ElementNotFoundFromWindowError, AmbiguousElementError) as e:
-                    self.logger.debug(f"Case '{case_name}' does not match. Reason: {e}")
-                    continue
-            time.sleep(retry_interval)
+            case_name = self._match_state(cases)
+            if case_name is not None:
+                self._emit_event('success', f"Success: '{display_message}' -> State '{case_name}' found")
+                return case_name
+            self._pause(waiter, schedule)
             
         self._emit_event('warning', f"Timeout waiting for: '{display_message}'")
         return None
 
+    def _match_state(self, cases):
+        """
+        One tick of get_next_state. The desktop windows are enumerated once and every
+        distinct window_spec is resolved against that snapshot in a single find_many pass;
+        the element specs are then resolved with one pass per resolved window. The caches
+        are not consulted, since a case needs its window and element to be unique, but what
+        is found unique is remembered for later actions. Returns the first case (in order)
+        whose window, and element if given, are unique, or None.
+        """
+        pending = OrderedDict()
+        for specs in cases.values():
+            pending.setdefault(core_logic.spec_cache_key(specs.get('window_spec')), specs.get('window_spec'))
+        windows = {}
+        if pending:
+            try:
+                snapshot = list(self.desktop.windows())
+            except Exception as e:
+                self.logger.error(f"Error listing desktop windows: {e}")
+                snapshot = []
+            names = list(pending)
+            found = self.finder.find_many(lambda: snapshot, {i: pending[key] for i, key in enumerate(names)}, limit=2)
+            for i, key in enumerate(names):
+                windows[key] = found[i]
+                if len(found[i]) == 1:
+                    self._remember_window(self._resolution_key(pending[key]), found[i][0])
+
+        per_window = OrderedDict()  # window identity -> (window, {case name: element_spec})
+        for case_name, specs in cases.items():
+            matches = windows[core_logic.spec_cache_key(specs.get('window_spec'))]
+            if len(matches) == 1 and specs.get('element_spec'):
+                window = matches[0]
+                per_window.setdefault(self._window_identity(window), (window, {}))[1][case_name] = specs['element_spec']
+        elements = {}
+        for window, element_specs in per_window.values():
+            found = self.finder.find_many(self.finder.scope(window), element_specs, limit=2)
+            for case_name, matches in found.items():
+                elements[case_name] = matches
+                if len(matches) == 1:
+                    element_spec = element_specs[case_name]
+                    self._remember_element(self._element_cache_key(window, element_spec), matches[0], element_spec)
+
+        for case_name, specs in cases.items():
+            matches = windows[core_logic.spec_cache_key(specs.get('window_spec'))]
+            if len(matches) != 1:
+                self.logger.debug(f"Case '{case_name}' does not match. Reason: {len(matches)} matching windows.")
+            elif specs.get('element_spec') and len(elements.get(case_name, ())) != 1:
+                self.logger.debug(f"Case '{case_name}' does not match. Reason: {len(elements.get(case_name, ()))} matching elements.")
+            else:
+                return case_name
+        return None
+
     def run_action(self, window_spec, element_spec=None, action=None, timeout=None, auto_activate=False, retry_interval=None, description=None, notify_style='info'):
         timeout = timeout if timeout is not None else self.config['default_timeout']
-        retry_interval = retry_interval if retry_interval is not None else self.config['default_retry_interval']
+        policy = self._retry_policy(retry_interval)
         
         log_action = action
         if self.config['secure_mode'] and action and ':' in action:
@@ -232,7 +505,7 @@ class UIController:
 
         try:
             self._wait_for_user_idle()
-            target_element = self._find_target_element(window_spec, element_spec, timeout, retry_interval)
+            target_element = self._find_target_element(window_spec, element_spec, Deadline(timeout), policy)
             
             if action:
                 command = action.split(':', 1)[0].lower().strip()
@@ -255,16 +528,16 @@ class UIController:
 
     def get_property(self, window_spec, element_spec=None, property_name=None, timeout=None, retry_interval=None, description=None, notify_style='info'):
         timeout = timeout if timeout is not None else self.config['default_timeout']
-        retry_interval = retry_interval if retry_interval is not None else self.config['default_retry_interval']
+        policy = self._retry_policy(retry_interval)
         display_message = description or f"Getting property '{property_name}'"
         self._emit_event(notify_style if description else 'info', display_message)
 
-        if property_name not in self.GETTABLE_PROPERTIES:
+        if property_name not in self.GETTABLE_PROPERTIES and property_name not in core_logic.PROPERTY_PROVIDERS:
             raise ValueError(f"Property '{property_name}' is not supported for getting.")
 
         try:
             self._wait_for_user_idle()
-            target_element = self._find_target_element(window_spec, element_spec, timeout, retry_interval)
+            target_element = self._find_target_element(window_spec, element_spec, Deadline(timeout), policy)
             value = core_logic.get_property_value(target_element, property_name, self.uia, self.tree_walker)
             self._emit_event('success', f"Successfully got property '{property_name}'.")
             return value
@@ -277,48 +550,192 @@ class UIController:
             self._emit_event('error', f"Failed: {display_message}")
             return None
 
-    def _find_window(self, window_spec, timeout, retry_interval):
-        start_time = time.time()
+    def resolve_many(self, window_spec, element_specs, timeout=None, retry_interval=None, description=None, notify_style='info'):
+        """
+        Finds the window once, then resolves all element specs ({name: element_spec}) with a
+        single walk of its tree per attempt. Returns {name: element}, or None if any spec
+        stays unresolved (not found or ambiguous) until the timeout.
+        """
+        timeout = timeout if timeout is not None else self.config['default_timeout']
+        policy = self._retry_policy(retry_interval)
+        display_message = description or f"Resolving {len(element_specs)} elements"
+        self._emit_event(notify_style if description else 'info', display_message)
+
+        try:
+            self._wait_for_user_idle()
+            deadline = Deadline(timeout)
+            window = self._find_window(window_spec, deadline, policy, max_matches=2)
+            resolved = self._resolve_many_in_window(window, element_specs, deadline, policy)
+            self._emit_event('success', f"Success: {display_message}")
+            return resolved
+        except (UIActionError, WindowNotFoundError, ElementNotFoundFromWindowError, AmbiguousElementError) as e:
+            self.logger.error(f"Error performing '{display_message}': {e}", exc_info=True)
+            self._emit_event('error', f"Failed: {display_message}")
+            return None
+        except Exception as e:
+            self.logger.critical(f"Unexpected error performing '{display_message}': {e}", exc_info=True)
+            self._emit_event('error', f"Failed: {display_message}")
+            return None
+
+    def _resolve_many_in_window(self, window, element_specs, deadline, policy):
+        with self._waiter(window, element_specs.values()) as waiter:
+            return self._resolve_many_until(window, element_specs, waiter, policy.schedule(deadline))
+
+    def _resolve_many_until(self, window, element_specs, waiter, schedule):
+        resolved = {}
         while True:
-            windows = self.finder.find(lambda: self.desktop.windows(), window_spec)
+            pending = {name: spec for name, spec in element_specs.items() if name not in resolved}
+            found = self.finder.find_many(self.finder.scope(window), pending, limit=2)
+            for name, elements in found.items():
+                if len(elements) == 1:
+                    resolved[name] = elements[0]
+                elif len(elements) > 1:
+                    details = [f"'{c.window_text()}'" for c in elements[:5]]
+                    raise AmbiguousElementError(f"Found {self._ambiguity_count(elements, 2)} ambiguous elements for '{name}' inside the window. Details: {details}")
+            if len(resolved) == len(element_specs):
+                return {name: resolved[name] for name in element_specs}
+
+            if schedule.deadline.expired():
+                missing = [name for name in element_specs if name not in resolved]
+                raise ElementNotFoundFromWindowError(f"Timeout. No unique element found for {missing} inside window '{window.window_text()}'.")
+
+            self._pause(waiter, schedule)
+
+    def _ambiguity_count(self, found, max_matches):
+        return f"at least {len(found)}" if max_matches and len(found) >= max_matches else str(len(found))
+
+    def _resolution_key(self, spec):
+        """
+        The cache key of a spec, or None if its result cannot be reused: path specs, and
+        specs with selectors or relations, depend on the other candidates, not only on the match.
+        """
+        if not self.config['resolution_cache'] or not isinstance(spec, dict) or not spec:
+            return None
+        plan = core_logic.compile_spec(spec)
+        if plan.selectors or plan.relations:
+            return None
+        return core_logic.spec_cache_key(spec)
+
+    def _window_still_matches(self, entry, window_spec):
+        """The cheap check of a cached window: it still exists and still passes the spec's filters."""
+        window = entry['window']
+        if entry['handle']:
+            if not win32gui.IsWindow(entry['handle']):
+                self.notify_structure_changed(entry['handle'])
+                return False
+        elif core_logic.element_runtime_id(window) != entry['runtime_id']:
+            return False
+        return self.finder.matches(window, window_spec)
+
+    def _cached_window(self, cache_key, window_spec):
+        if cache_key is None:
+            return None
+        entry = self.window_cache.lookup(cache_key, lambda e: self._window_still_matches(e, window_spec))
+        if entry is None:
+            return None
+        self.logger.debug(f"Reusing cached window (Handle: {entry['handle']})")
+        return entry['window']
+
+    def _remember_window(self, cache_key, window):
+        if cache_key is not None:
+            self.window_cache.store(cache_key, {'window': window, 'handle': window.handle,
+                                                'runtime_id': core_logic.element_runtime_id(window)})
+
+    def _find_window(self, window_spec, deadline, policy, max_matches=None):
+        """
+        Resolves a unique window. A cached window that still matches is reused unless
+        max_matches is given: a uniqueness check has to see the other candidates too, so it
+        always scans (and remembers the window it confirms).
+        """
+        cache_key = self._resolution_key(window_spec)
+        window = self._cached_window(cache_key, window_spec) if max_matches is None else None
+        if window is not None:
+            return window
+
+        schedule = policy.schedule(deadline)
+        with self._waiter(None, [window_spec]) as waiter:
+            while True:
+                windows = self.finder.find(lambda: self.desktop.windows(), window_spec, limit=max_matches)
             
-            if len(windows) == 1:
-                window = windows[0]
-                self.logger.debug(f"Found unique window: '{window.window_text()}' (Handle: {window.handle})")
-                return window
-            elif len(windows) > 1:
-                details = [f"'{c.window_text()}'" for c in windows[:5]]
-                raise AmbiguousElementError(f"Found {len(windows)} ambiguous windows. Details: {details}")
+                if len(windows) == 1:
+                    window = windows[0]
+                    self.logger.debug(f"Found unique window: '{window.window_text()}' (Handle: {window.handle})")
+                    self._remember_window(cache_key, window)
+                    return window
+                elif len(windows) > 1:
+                    details = [f"'{c.window_text()}'" for c in windows[:5]]
+                    raise AmbiguousElementError(f"Found {self._ambiguity_count(windows, max_matches)} ambiguous windows. Details: {details}")
             
-            if time.time() - start_time >= timeout:
-                raise WindowNotFoundError("Timeout. No unique window matching spec found.")
+                if deadline.expired():
+                    raise WindowNotFoundError("Timeout. No unique window matching spec found.")
             
-            time.sleep(retry_interval)
+                self._pause(waiter, schedule)
     
-    def _find_element_in_window(self, window, element_spec, timeout, retry_interval):
-        start_time = time.time()
-        while True:
-            elements = self.finder.find(lambda: window.descendants(), element_spec)
+    def _window_identity(self, window):
+        return getattr(window, 'handle', None) or core_logic.element_runtime_id(window)
+
+    def _element_still_matches(self, entry, element_spec):
+        """One RuntimeId read; specs on volatile properties also re-run their filters."""
+        if core_logic.element_runtime_id(entry['element']) != entry['runtime_id']:
+            return False
+        return entry['stable'] or self.finder.matches(entry['element'], element_spec)
+
+    def _element_cache_key(self, window, element_spec):
+        cache_key = self._resolution_key(element_spec)
+        return None if cache_key is None else (self._window_identity(window), cache_key)
+
+    def _cached_element(self, cache_key, element_spec):
+        if cache_key is None:
+            return None
+        entry = self.element_cache.lookup(cache_key, lambda e: self._element_still_matches(e, element_spec))
+        if entry is None:
+            return None
+        self.logger.debug("Reusing cached element.")
+        return entry['element']
+
+    def _remember_element(self, cache_key, element, element_spec):
+        runtime_id = core_logic.element_runtime_id(element) if cache_key is not None else None
+        if runtime_id is not None:
+            self.element_cache.store(cache_key, {'element': element, 'runtime_id': runtime_id,
+                                                 'stable': set(element_spec) <= self.IDENTITY_KEYS})
+
+    def _find_element_in_window(self, window, element_spec, deadline, policy, max_matches=None):
+        """
+        Resolves a unique element in the window. As in _find_window(), a cached element is
+        only reused when no max_matches (uniqueness check) is given: a hit is confirmed by its
+        RuntimeId, and sometimes filters, which says nothing about other matches.
+        """
+        cache_key = self._element_cache_key(window, element_spec)
+        element = self._cached_element(cache_key, element_spec) if max_matches is None else None
+        if element is not None:
+            return element
+
+        schedule = policy.schedule(deadline)
+        with self._waiter(window, [element_spec]) as waiter:
+            while True:
+                elements = self.finder.find(self.finder.scope(window), element_spec, limit=max_matches)
 
-            if len(elements) == 1:
-                element = elements[0]
-                self.logger.debug(f"Found unique element: '{element.window_text()}'")
-                return element
-            elif len(elements) > 1:
-                details = [f"'{c.window_text()}'" for c in elements[:5]]
-                raise AmbiguousElementError(f"Found {len(elements)} ambiguous elements inside the window. Details: {details}")
+                if len(elements) == 1:
+                    element = elements[0]
+                    self.logger.debug(f"Found unique element: '{element.window_text()}'")
+                    self._remember_element(cache_key, element, element_spec)
+                    return element
+                elif len(elements) > 1:
+                    details = [f"'{c.window_text()}'" for c in elements[:5]]
+                    raise AmbiguousElementError(f"Found {self._ambiguity_count(elements, max_matches)} ambiguous elements inside the window. Details: {details}")
 
-            if time.time() - start_time >= timeout:
-                raise ElementNotFoundFromWindowError(f"Timeout. No unique element matching spec found inside window '{window.window_text()}'.")
+                if deadline.expired():
+                    raise ElementNotFoundFromWindowError(f"Timeout. No unique element matching spec found inside window '{window.window_text()}'.")
 
-            time.sleep(retry_interval)
+                self._pause(waiter, schedule)
             
-    def _find_target_element(self, window_spec, element_spec, timeout, retry_interval):
-        window = self._find_window(window_spec, timeout, retry_interval)
+    def _find_target_element(self, window_spec, element_spec, deadline, policy, max_matches=None):
+        """Resolves the window and then the element within one shared deadline."""
+        window = self._find_window(window_spec, deadline, policy, max_matches)
         if not element_spec:
             return window
         
-        return self._find_element_in_window(window, element_spec, timeout, retry_interval)
+        return self._find_element_in_window(window, element_spec, deadline, policy, max_matches)
 
     def _execute_action(self, element, action_str):
         self.logger.debug(f"Executing action '{action_str}' on element '{element.window_text()}'")
@@ -1,10 +1,14 @@
 # core_logic.py
 # Contains the core, shared logic and ALL definitions for the suite.
-# --- VERSION 7.0: Added 'sort_by_scan_order' as the primary, most stable sorting key.
-# The ElementFinder is now optimized to handle this key efficiently.
+# --- VERSION 8.9: Pattern interfaces are cached per element for a short TTL (PATTERN_CACHE),
+# including "not supported" answers, and every declared uia_* pattern property is implemented
+# (selection items, range value info, grid cell info, table row headers).
 
+import heapq
 import logging
 import re
+import time
+from collections import OrderedDict
 from datetime import datetime
 
 # --- Required Libraries ---
@@ -22,6 +26,15 @@ except ImportError as e:
     print("Suggestion: pip install psutil pywin32 comtypes pywinauto")
     exit()
 
+try:
+    from . import finder_backends
+    from . import spatial_index
+    from . import text_index
+except ImportError:
+    import finder_backends
+    import spatial_index
+    import text_index
+
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
 
@@ -76,6 +89,12 @@ PARAMETER_DEFINITIONS = {
 STRING_OPERATORS = {'equals', 'iequals', 'contains', 'icontains', 'in', 'regex',
                     'not_equals', 'not_iequals', 'not_contains', 'not_icontains'}
 NUMERIC_OPERATORS = {'>', '>=', '<', '<='}
+GEOMETRY_OPERATORS = {'contains_point', 'within', 'intersects'}
+# Relations to an anchor element found by its own spec in the same candidate pool.
+RELATION_OPERATORS = set(spatial_index.RELATIONS)
+# Similarity matching: ('fuzzy', text) or ('fuzzy', text, threshold).
+FUZZY_OPERATORS = {'fuzzy'}
+FUZZY_DEFAULT_THRESHOLD = 0.8
 OPERATOR_DEFINITIONS = [
     {'category': 'String', 'name': 'equals', 'example': "'pwa_title': ('equals', 'File Explorer')", 'desc': "Matches the exact string (case-sensitive)."},
     {'category': 'String', 'name': 'iequals', 'example': "'pwa_title': ('iequals', 'file explorer')", 'desc': "Matches the exact string (case-insensitive)."},
@@ -89,6 +108,16 @@ OPERATOR_DEFINITIONS = [
     {'category': 'Numeric', 'name': '>=', 'example': "'rel_child_count': ('>=', 5)", 'desc': "Greater than or equal to."},
     {'category': 'Numeric', 'name': '<', 'example': "'win32_handle': ('<', 100000)", 'desc': "Less than."},
     {'category': 'Numeric', 'name': '<=', 'example': "'rel_level': ('<=', 3)", 'desc': "Less than or equal to."},
+    {'category': 'Geometry', 'name': 'contains_point', 'example': "'geo_bounding_rect_tuple': ('contains_point', (640, 360))", 'desc': "The element's rectangle contains the (x, y) point."},
+    {'category': 'Geometry', 'name': 'within', 'example': "'geo_bounding_rect_tuple': ('within', (0, 0, 800, 200))", 'desc': "The element lies completely inside the (L, T, R, B) region."},
+    {'category': 'Geometry', 'name': 'intersects', 'example': "'geo_center_point': ('intersects', (0, 0, 800, 200))", 'desc': "The element (or point) overlaps the (L, T, R, B) region."},
+    {'category': 'Fuzzy', 'name': 'fuzzy', 'example': "'pwa_title': ('fuzzy', 'Teamcenter Login', 0.85)", 'desc': "Trigram similarity (0-1, case and spacing ignored) of at least the threshold (default 0.8). Tolerates version numbers, trailing marks and small typos."},
+    {'category': 'Relation', 'name': 'right_of', 'example': "'geo_bounding_rect_tuple': ('right_of', {'pwa_title': 'User ID:'})", 'desc': "On the same row as, and right of, an anchor element matched by the given spec."},
+    {'category': 'Relation', 'name': 'left_of', 'example': "'geo_bounding_rect_tuple': ('left_of', {'pwa_auto_id': 'btnOK'})", 'desc': "On the same row as, and left of, the anchor element."},
+    {'category': 'Relation', 'name': 'below', 'example': "'geo_bounding_rect_tuple': ('below', ({'pwa_title': 'Address'}, 40))", 'desc': "In the same column as, and below, the anchor. An optional distance limits the gap in pixels."},
+    {'category': 'Relation', 'name': 'above', 'example': "'geo_bounding_rect_tuple': ('above', {'pwa_title': 'Total'})", 'desc': "In the same column as, and above, the anchor element."},
+    {'category': 'Relation', 'name': 'near', 'example': "'geo_bounding_rect_tuple': ('near', ({'pwa_title': 'Search'}, 30))", 'desc': "Within a distance (default 50 px, edge to edge) of the anchor element."},
+    {'category': 'Relation', 'name': 'inside', 'example': "'geo_bounding_rect_tuple': ('inside', {'pwa_auto_id': 'loginPanel'})", 'desc': "Lies completely inside the anchor element's rectangle."},
 ]
 
 # --- Action Definitions ---
@@ -117,6 +146,7 @@ SELECTOR_DEFINITIONS = [
     {'name': 'sort_by_width', 'example': "'sort_by_width': -1", 'desc': "Sorts elements by their width. Use -1 for the widest element."},
     {'name': 'sort_by_title_length', 'example': "'sort_by_title_length': 1", 'desc': "Sorts elements by the length of their title text. Use 1 for the shortest title."},
     {'name': 'sort_by_child_count', 'example': "'sort_by_child_count': -1", 'desc': "Sorts elements by the number of direct children they have. Use -1 for the one with the most children."},
+    {'name': 'sort_by_anchor_distance', 'example': "'sort_by_anchor_distance': 1", 'desc': "Sorts by the distance to the anchor of a relation operator in the same spec. Use 1 for the closest element."},
     {'name': 'z_order_index', 'example': "'z_order_index': 1", 'desc': "Selects an element based on its Z-order (drawing order). Rarely needed."},
 ]
 
@@ -129,12 +159,69 @@ PROC_PROPS = {k for k in PARAMETER_DEFINITIONS if k.startswith('proc_')}
 REL_PROPS = {k for k in PARAMETER_DEFINITIONS if k.startswith('rel_')}
 UIA_PROPS = {k for k in PARAMETER_DEFINITIONS if k.startswith('uia_')}
 
+# --- Property Profiles (which keys get_all_properties loads up front) ---
+# 'full' (None) means every registered property; the others list only what a tool shows.
+PROPERTY_PROFILES = {
+    'minimal': ['pwa_title', 'pwa_control_type', 'pwa_auto_id', 'pwa_class_name'],
+    'explorer_columns': ['rel_level', 'pwa_title', 'pwa_control_type', 'pwa_auto_id', 'pwa_class_name',
+                         'win32_handle', 'state_is_enabled', 'state_is_visible', 'geo_bounding_rect_tuple'],
+    'quick_spec': ['pwa_title', 'pwa_control_type', 'pwa_auto_id', 'pwa_class_name', 'pwa_framework_id',
+                   'win32_handle', 'proc_name', 'rel_level', 'geo_bounding_rect_tuple'],
+    'full': None,
+}
+
+# --- Filter Cost Classes (cheapest first) ---
+# Used by the ElementFinder planner to decide which filters to run first. Each property's
+# class is declared by its provider (see PROPERTY PROVIDER REGISTRY below).
+COST_UIA_PROPERTY = 0    # A single UIA property read (name, ids, state flags, rectangle...).
+COST_WIN32_CALL = 1      # A Win32 API call on the window handle.
+COST_PROCESS_LOOKUP = 2  # A psutil process query (cached per PID afterwards).
+COST_TREE_WALK = 3       # Walking the UI tree (parents, children, focus).
+COST_PATTERN_QUERY = 4   # Querying a UIA control pattern.
+FILTER_COST_WEIGHTS = {
+    COST_UIA_PROPERTY: 1,
+    COST_WIN32_CALL: 2,
+    COST_PROCESS_LOOKUP: 5,
+    COST_TREE_WALK: 20,
+    COST_PATTERN_QUERY: 25,
+}
+
 # --- Selectors and Operators ---
 SORTING_KEYS = {item['name'] for item in SELECTOR_DEFINITIONS}
-VALID_OPERATORS = STRING_OPERATORS.union(NUMERIC_OPERATORS)
+# The property each selector sorts on (used to decide what to prefetch).
+SELECTOR_PROPERTY_KEYS = {
+    'sort_by_creation_time': 'proc_create_time',
+    'sort_by_title_length': 'pwa_title',
+    'sort_by_child_count': 'rel_child_count',
+    'sort_by_y_pos': 'geo_bounding_rect_tuple',
+    'sort_by_x_pos': 'geo_bounding_rect_tuple',
+    'sort_by_width': 'geo_bounding_rect_tuple',
+    'sort_by_height': 'geo_bounding_rect_tuple',
+    'sort_by_anchor_distance': 'geo_bounding_rect_tuple',
+}
+VALID_OPERATORS = STRING_OPERATORS.union(NUMERIC_OPERATORS).union(GEOMETRY_OPERATORS).union(RELATION_OPERATORS).union(FUZZY_OPERATORS)
 SUPPORTED_FILTER_KEYS = PWA_PROPS | WIN32_PROPS | STATE_PROPS | GEO_PROPS | PROC_PROPS | REL_PROPS | UIA_PROPS
 _CONTROL_TYPE_ID_TO_NAME = {v: k for k, v in uia_defines.IUIA().known_control_types.items()}
-PROC_INFO_CACHE = {}
+PATH_AXES = ('child', 'descendant')
+SPEC_PLAN_CACHE = OrderedDict()
+SPEC_PLAN_CACHE_SIZE = 256
+# (id(tree_walker), RuntimeId) -> (depth below the desktop root in that walker's view,
+# time.monotonic() when stored); entries expire after the TTL, because RuntimeIds and id()s
+# are reused once an element (or walker) is gone and elements can be re-parented.
+DEPTH_CACHE = OrderedDict()
+DEPTH_CACHE_SIZE = 10000
+DEPTH_CACHE_TTL = 2.0
+_ROOT_RUNTIME_IDS = {}
+# RuntimeId -> (child count, time.monotonic() when counted); entries expire after the TTL.
+CHILD_COUNT_CACHE = OrderedDict()
+CHILD_COUNT_CACHE_SIZE = 10000
+CHILD_COUNT_TTL = 2.0
+# RuntimeId -> (time.monotonic() when stored, {pattern id: pattern interface, or None if the
+# element does not support it}); entries expire after the TTL like the caches above, so a
+# reused RuntimeId does not inherit another element's answers and interfaces are released.
+PATTERN_CACHE = OrderedDict()
+PATTERN_CACHE_SIZE = 1000
+PATTERN_CACHE_TTL = 2.0
 
 # ======================================================================
 #                      PUBLIC UTILITY FUNCTIONS
@@ -168,150 +255,617 @@ def clean_element_spec(window_info, element_info):
 #                      CORE INFORMATION GETTERS
 # ======================================================================
 
-def get_process_info(pid):
-    """Gets process information and caches it for performance."""
-    if pid in PROC_INFO_CACHE:
-        return PROC_INFO_CACHE[pid]
-    if pid > 0:
+class ProcessInfoCache:
+    """
+    Bounded cache of process information, safe against PID reuse.
+
+    Entries are keyed by (pid, create_time): a PID seen again is re-checked against the
+    process's creation time (at most every 'revalidate_after' seconds), so a recycled PID
+    never returns the previous process's data. Each field (name, exe, cmdline, username...)
+    is loaded only when first asked for, since cmdline() and username() are much slower
+    than name(). Entries expire after 'ttl' seconds and the least recently used ones are
+    dropped beyond 'max_size'. prefetch() fills the cache from one psutil.process_iter() pass.
+    """
+    # Spec key -> (psutil attribute for process_iter, reader of a psutil.Process)
+    FIELDS = {
+        'proc_name': ('name', lambda p: p.name()),
+        'proc_path': ('exe', lambda p: p.exe()),
+        'proc_cmdline': ('cmdline', lambda p: p.cmdline()),
+        'proc_username': ('username', lambda p: p.username()),
+        'proc_create_time': ('create_time', lambda p: p.create_time()),
+    }
+
+    def __init__(self, max_size=512, ttl=300.0, revalidate_after=2.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.revalidate_after = revalidate_after
+        # (pid, create_time) -> {'process': psutil.Process or None, 'fields': {}, 'loaded_at': t}
+        self._entries = OrderedDict()
+        # pid -> ((pid, create_time), time of the last create_time check)
+        self._pid_index = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _format(key, raw):
+        if raw is None:
+            return None
+        if key == 'proc_cmdline':
+            return ' '.join(raw)
+        if key == 'proc_create_time':
+            return datetime.fromtimestamp(raw).strftime('%Y-%m-%d %H:%M:%S')
+        return raw
+
+    def _store(self, entry_key, process, fields, now):
+        entry = {'process': process, 'fields': fields, 'loaded_at': now}
+        self._entries[entry_key] = entry
+        self._entries.move_to_end(entry_key)
+        self._pid_index[entry_key[0]] = (entry_key, now)
+        while len(self._entries) > self.max_size:
+            old_key, _ = self._entries.popitem(last=False)
+            if self._pid_index.get(old_key[0], (None,))[0] == old_key:
+                del self._pid_index[old_key[0]]
+        return entry
+
+    def _entry(self, pid):
+        """Returns the live entry for pid (creating it if needed), or None if there is no such process."""
+        now = time.monotonic()
+        indexed = self._pid_index.get(pid)
+        entry = self._entries.get(indexed[0]) if indexed else None
+        if entry is not None and now - entry['loaded_at'] >= self.ttl:
+            self._drop_pid(pid)
+            entry = None
+        if entry is not None and now - indexed[1] < self.revalidate_after:
+            self._entries.move_to_end(indexed[0])
+            return entry
         try:
-            p = psutil.Process(pid)
-            info = {
-                'proc_name': p.name(),
-                'proc_path': p.exe(),
-                'proc_cmdline': ' '.join(p.cmdline()),
-                'proc_create_time': datetime.fromtimestamp(p.create_time()).strftime('%Y-%m-%d %H:%M:%S'),
-                'proc_username': p.username()
-            }
-            PROC_INFO_CACHE[pid] = info
-            return info
+            process = psutil.Process(pid)
+            entry_key = (pid, process.create_time())
         except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    return {}
+            self._drop_pid(pid)
+            return None
+        if entry is not None and indexed[0] == entry_key:
+            self._pid_index[pid] = (entry_key, now)
+            self._entries.move_to_end(entry_key)
+            return entry
+        # New process (or the PID was reused): start a fresh entry.
+        self._drop_pid(pid)
+        return self._store(entry_key, process, {'proc_create_time': self._format('proc_create_time', entry_key[1])}, now)
 
-def get_property_value(pwa_element, key, uia_instance=None, tree_walker=None):
+    def _drop_pid(self, pid):
+        indexed = self._pid_index.pop(pid, None)
+        if indexed is not None:
+            self._entries.pop(indexed[0], None)
+
+    def get(self, pid, key):
+        """Returns one process field (a 'proc_*' key) for pid, loading only that field."""
+        if not pid or pid <= 0 or key not in self.FIELDS:
+            return None
+        entry = self._entry(pid)
+        if entry is None:
+            return None
+        fields = entry['fields']
+        if key in fields:
+            self.hits += 1
+            return fields[key]
+        self.misses += 1
+        try:
+            value = self._format(key, self.FIELDS[key][1](entry['process']))
+        except psutil.NoSuchProcess:
+            self._drop_pid(pid)
+            return None
+        except psutil.AccessDenied:
+            value = None
+        fields[key] = value
+        return value
+
+    def get_all(self, pid):
+        """Returns all process fields that could be read for pid (empty if there is no such process)."""
+        info = {key: self.get(pid, key) for key in self.FIELDS}
+        return {key: value for key, value in info.items() if value is not None}
+
+    def prefetch(self, keys=('proc_name',)):
+        """
+        Fills the cache for every running process with one psutil.process_iter() pass,
+        reading only the given 'proc_*' keys. Returns the number of processes seen.
+        """
+        attrs = {'pid', 'create_time'} | {self.FIELDS[k][0] for k in keys if k in self.FIELDS}
+        now = time.monotonic()
+        count = 0
+        for process in psutil.process_iter(attrs=sorted(attrs), ad_value=None):
+            info = process.info
+            if info.get('create_time') is None:
+                continue
+            fields = {}
+            for key, (attr, _) in self.FIELDS.items():
+                if attr in info:
+                    fields[key] = self._format(key, info[attr])
+            entry_key = (info['pid'], info['create_time'])
+            existing = self._entries.get(entry_key)
+            if existing is not None:
+                existing['fields'].update(fields)
+                self._pid_index[entry_key[0]] = (entry_key, now)
+            else:
+                self._drop_pid(entry_key[0])
+                self._store(entry_key, process, fields, now)
+            count += 1
+        return count
+
+    def clear(self):
+        self._entries.clear()
+        self._pid_index.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+PROCESS_INFO_CACHE = ProcessInfoCache()
+
+def get_process_info(pid):
+    """Gets process information (all fields) through the shared ProcessInfoCache."""
+    return PROCESS_INFO_CACHE.get_all(pid)
+
+# ======================================================================
+#                      PROPERTY PROVIDER REGISTRY
+# ======================================================================
+
+class PropertyContext:
     """
-    Central function to get the value of a property from a pywinauto element.
+    What a provider's getter receives: the pywinauto element plus the UIA instance and
+    tree walker of the caller. 'com' and 'handle' are resolved on first use.
     """
-    prop = key.lower()
-    
-    if hasattr(pwa_element, 'element_info'):
-        com_element = getattr(pwa_element.element_info, 'element', None)
-    else:
-        com_element = getattr(pwa_element, 'element', pwa_element)
+    __slots__ = ('element', 'uia', 'tree_walker', '_com', '_handle')
+    _UNSET = object()
+
+    def __init__(self, pwa_element, uia_instance=None, tree_walker=None):
+        self.element = pwa_element
+        self.uia = uia_instance
+        self.tree_walker = tree_walker
+        self._com = self._UNSET
+        self._handle = self._UNSET
+
+    @property
+    def com(self):
+        if self._com is self._UNSET:
+            if hasattr(self.element, 'element_info'):
+                self._com = getattr(self.element.element_info, 'element', None)
+            else:
+                self._com = getattr(self.element, 'element', self.element)
+        return self._com
+
+    @property
+    def handle(self):
+        if self._handle is self._UNSET:
+            self._handle = self.element.handle
+        return self._handle
+
+    def satisfies(self, requires):
+        """True if everything a provider requires is available for this element."""
+        for requirement in requires:
+            if requirement == 'handle' and not self.handle: return False
+            if requirement == 'com' and not self.com: return False
+            if requirement == 'uia' and not self.uia: return False
+            if requirement == 'tree_walker' and not self.tree_walker: return False
+        return True
 
+class PropertyProvider:
+    """
+    How one property key is read.
+
+    - getter(ctx) returns the value for a PropertyContext.
+    - cost_class is one of the COST_* classes; the planner runs cheap filters first.
+    - cacheable=False marks volatile values (focus, pattern state...) that must be re-read
+      instead of memoized by a PropertyCache.
+    - requires lists what the getter needs: 'handle' (a native window handle), 'com'
+      (the UIA COM element), 'uia' (the UIA instance) and/or 'tree_walker'. When one is
+      missing the value is None and the getter is not called.
+    """
+    __slots__ = ('key', 'getter', 'description', 'cost_class', 'cacheable', 'requires')
+
+    def __init__(self, key, getter, description='', cost_class=COST_UIA_PROPERTY, cacheable=True, requires=()):
+        self.key = key
+        self.getter = getter
+        self.description = description
+        self.cost_class = cost_class
+        self.cacheable = cacheable
+        self.requires = tuple(requires)
+
+    def read(self, pwa_element, uia_instance=None, tree_walker=None):
+        ctx = PropertyContext(pwa_element, uia_instance, tree_walker)
+        try:
+            if not ctx.satisfies(self.requires):
+                return None
+            return self.getter(ctx)
+        except Exception as e:
+            logger.debug(f"Error getting property '{self.key}': {type(e).__name__} - {e}")
+            return None
+
+    def __repr__(self):
+        return f"PropertyProvider({self.key!r}, cost_class={self.cost_class}, cacheable={self.cacheable}, requires={self.requires})"
+
+# key -> PropertyProvider, in registration order.
+PROPERTY_PROVIDERS = OrderedDict()
+
+def register_property(key, getter, description='', cost_class=COST_UIA_PROPERTY, cacheable=True, requires=()):
+    """
+    Registers (or replaces) the provider of a property key. The key becomes usable in
+    specs, get_property_value() and get_all_properties(), and shows up in the tools
+    (scanner quick-spec options, explorer/debugger details, reference tab).
+
+    Example (an app-specific attribute read from the element's help text):
+        register_property('app_tc_item_id', lambda ctx: ctx.com.CurrentHelpText,
+                          "Teamcenter item ID shown in the tooltip.", requires=('com',))
+    """
+    provider = PropertyProvider(key, getter, description, cost_class, cacheable, requires)
+    PROPERTY_PROVIDERS[key] = provider
+    PARAMETER_DEFINITIONS[key] = description or PARAMETER_DEFINITIONS.get(key, '')
+    SUPPORTED_FILTER_KEYS.add(key)
+    return provider
+
+def get_property_provider(key):
+    return PROPERTY_PROVIDERS.get(key) or PROPERTY_PROVIDERS.get(key.lower())
+
+def property_cost_class(key):
+    provider = get_property_provider(key)
+    return provider.cost_class if provider else COST_UIA_PROPERTY
+
+# --- Built-in getters ---
+def _com_rect(ctx):
+    """Fallback when pwa_element.rectangle() fails: the bounding rectangle straight from COM."""
+    logger.debug(f"pwa_element.rectangle() failed. Trying direct COM access.")
+    if not ctx.com:
+        return None
     try:
-        # --- PWA Properties ---
-        if prop in PWA_PROPS:
-            if prop == 'pwa_title': return pwa_element.window_text()
-            if prop == 'pwa_class_name': return pwa_element.class_name()
-            if prop == 'pwa_auto_id': return pwa_element.automation_id()
-            if prop == 'pwa_control_type': return pwa_element.control_type()
-            if prop == 'pwa_framework_id': return pwa_element.framework_id()
-
-        # --- WIN32 Properties ---
-        handle = pwa_element.handle
-        if handle:
-            if prop in WIN32_PROPS:
-                if prop == 'win32_handle': return handle
-                if prop == 'win32_styles': return win32gui.GetWindowLong(handle, win32con.GWL_STYLE)
-                if prop == 'win32_extended_styles': return win32gui.GetWindowLong(handle, win32con.GWL_EXSTYLE)
-            if prop == 'proc_thread_id': return win32process.GetWindowThreadProcessId(handle)[0]
-            if prop == 'rel_parent_handle': return win32gui.GetParent(handle)
-
-        # --- State Properties ---
-        if prop in STATE_PROPS:
-            if prop == 'state_is_visible': return pwa_element.is_visible()
-            if prop == 'state_is_enabled': return pwa_element.is_enabled()
-            if prop == 'state_is_active': return pwa_element.is_active()
-            if prop == 'state_is_minimized': return pwa_element.is_minimized()
-            if prop == 'state_is_maximized': return pwa_element.is_maximized()
-            if prop == 'state_is_focusable': return pwa_element.is_focusable()
-            if prop == 'state_is_password': return pwa_element.is_password()
-            if prop == 'state_is_offscreen': return pwa_element.is_offscreen()
-            if prop == 'state_is_content_element': return pwa_element.is_content_element()
-            if prop == 'state_is_control_element': return pwa_element.is_control_element()
-
-        # --- Geometry Properties ---
-        if prop in GEO_PROPS:
-            try:
-                rect = pwa_element.rectangle()
-                if prop == 'geo_bounding_rect_tuple': return (rect.left, rect.top, rect.right, rect.bottom)
-                if prop == 'geo_center_point':
-                    mid_point = rect.mid_point()
-                    return (mid_point.x, mid_point.y)
-            except Exception:
-                logger.debug(f"pwa_element.rectangle() failed. Trying direct COM access.")
-                if com_element:
-                    try:
-                        com_rect = com_element.CurrentBoundingRectangle
-                        if prop == 'geo_bounding_rect_tuple':
-                            return (com_rect.left, com_rect.top, com_rect.right, com_rect.bottom)
-                        if prop == 'geo_center_point':
-                            return ((com_rect.left + com_rect.right) // 2, (com_rect.top + com_rect.bottom) // 2)
-                    except (comtypes.COMError, AttributeError):
-                        logger.debug(f"Direct COM access for BoundingRectangle also failed.")
-                        return None
-        
-        # --- Process Properties ---
-        if prop in PROC_PROPS:
-            pid = pwa_element.process_id()
-            if prop == 'proc_pid': return pid
-            proc_info = get_process_info(pid)
-            return proc_info.get(prop)
-
-        # --- Relational Properties ---
-        if prop in REL_PROPS:
-            if prop == 'rel_child_count': return len(pwa_element.children())
-            parent = pwa_element.parent()
-            if prop == 'rel_parent_title': return parent.window_text() if parent else ''
-            if prop == 'rel_labeled_by': return pwa_element.labeled_by() if hasattr(pwa_element, 'labeled_by') else ''
-            
-            if prop == 'rel_level' and com_element and tree_walker and uia_instance:
-                level = 0
-                root = uia_instance.GetRootElement()
-                if comtypes.client.GetBestInterface(com_element) == comtypes.client.GetBestInterface(root):
-                    return 0
-
-                current = com_element
-                while True:
-                    parent = tree_walker.GetParentElement(current)
-                    if not parent: break
-                    level += 1
-                    if comtypes.client.GetBestInterface(parent) == comtypes.client.GetBestInterface(root):
-                        break
-                    current = parent
-                    if level > 50:
-                        logger.warning("Reached max depth (50) when calculating rel_level.")
-                        break
-                return level
-
-        # --- UIA Properties ---
-        if prop in UIA_PROPS and com_element and uia_instance:
-            if prop == 'uia_value':
-                pattern = com_element.GetCurrentPattern(UIA.UIA_ValuePatternId)
-                if pattern: return pattern.QueryInterface(UIA.IUIAutomationValuePattern).CurrentValue
-            if prop == 'uia_toggle_state':
-                pattern = com_element.GetCurrentPattern(UIA.UIA_TogglePatternId)
-                if pattern: return pattern.QueryInterface(UIA.IUIAutomationTogglePattern).CurrentToggleState.name
-            if prop == 'uia_expand_state':
-                pattern = com_element.GetCurrentPattern(UIA.UIA_ExpandCollapsePatternId)
-                if pattern: return pattern.QueryInterface(UIA.IUIAutomationExpandCollapsePattern).CurrentExpandCollapseState.name
-            
+        return ctx.com.CurrentBoundingRectangle
+    except (comtypes.COMError, AttributeError):
+        logger.debug(f"Direct COM access for BoundingRectangle also failed.")
         return None
-    except (comtypes.COMError, AttributeError, Exception) as e:
-        logger.debug(f"Error getting property '{prop}': {type(e).__name__} - {e}")
+
+def _get_bounding_rect(ctx):
+    try:
+        rect = ctx.element.rectangle()
+    except Exception:
+        rect = _com_rect(ctx)
+        if rect is None: return None
+    return (rect.left, rect.top, rect.right, rect.bottom)
+
+def _get_center_point(ctx):
+    try:
+        mid_point = ctx.element.rectangle().mid_point()
+        return (mid_point.x, mid_point.y)
+    except Exception:
+        com_rect = _com_rect(ctx)
+        if com_rect is None: return None
+        return ((com_rect.left + com_rect.right) // 2, (com_rect.top + com_rect.bottom) // 2)
+
+_NO_COM_VALUE = object()
+
+def _uia_current(name, method, convert=None):
+    """
+    Getter reading 'Current<name>' from the element's UIA COM object, which is the property
+    the UIA backend caches for prefetch, so live and prefetched reads agree. Elements
+    without a COM object (e.g. in-memory elements) are asked through 'method' if they have it.
+    """
+    def getter(ctx):
+        value = getattr(ctx.com, 'Current' + name, _NO_COM_VALUE) if ctx.com is not None else _NO_COM_VALUE
+        if value is _NO_COM_VALUE:
+            read = getattr(ctx.element, method, None)
+            return read() if callable(read) else None
+        return convert(value) if convert else value
+    return getter
+
+def _process_field(field):
+    return lambda ctx: PROCESS_INFO_CACHE.get(ctx.element.process_id(), field)
+
+def _get_parent_title(ctx):
+    parent = ctx.element.parent()
+    return parent.window_text() if parent else ''
+
+def _get_labeled_by(ctx):
+    return ctx.element.labeled_by() if hasattr(ctx.element, 'labeled_by') else ''
+
+def element_runtime_id(element):
+    """The UIA RuntimeId of a pywinauto element or COM element as a tuple, or None."""
+    com_element = getattr(getattr(element, 'element_info', None), 'element', element)
+    try:
+        return tuple(com_element.GetRuntimeId())
+    except (comtypes.COMError, AttributeError, TypeError):
         return None
 
-def get_all_properties(pwa_element, uia_instance=None, tree_walker=None):
-    all_props = {}
-    for key in SUPPORTED_FILTER_KEYS:
-        value = get_property_value(pwa_element, key, uia_instance, tree_walker)
-        if value or value is False or value == 0:
-            all_props[key] = value
-    if 'pwa_title' not in all_props:
+def _remember_depth(tree_walker, runtime_id, depth):
+    key = (id(tree_walker), runtime_id)
+    DEPTH_CACHE[key] = (depth, time.monotonic())
+    DEPTH_CACHE.move_to_end(key)
+    if len(DEPTH_CACHE) > DEPTH_CACHE_SIZE:
+        DEPTH_CACHE.popitem(last=False)
+
+def record_element_depth(element, depth, tree_walker):
+    """
+    Stores the rel_level of an element that a traversal already knows (e.g. a scan that
+    walks down from a window of known depth), so later lookups of it and of its
+    descendants stop there instead of walking up to the desktop.
+    """
+    runtime_id = element_runtime_id(element)
+    if runtime_id is not None:
+        _remember_depth(tree_walker, runtime_id, depth)
+
+def clear_depth_cache():
+    DEPTH_CACHE.clear()
+    _ROOT_RUNTIME_IDS.clear()
+
+def clear_child_count_cache():
+    CHILD_COUNT_CACHE.clear()
+
+def clear_pattern_cache():
+    PATTERN_CACHE.clear()
+
+def _root_runtime_id(uia_instance):
+    runtime_id = _ROOT_RUNTIME_IDS.get(id(uia_instance))
+    if runtime_id is None:
+        runtime_id = element_runtime_id(uia_instance.GetRootElement())
+        _ROOT_RUNTIME_IDS[id(uia_instance)] = runtime_id
+    return runtime_id
+
+def _get_rel_level(ctx):
+    """
+    Depth below the desktop root. Walks up with the tree walker until it reaches the root,
+    the top of the tree or an ancestor whose depth is in DEPTH_CACHE; every element on the
+    way is cached (for DEPTH_CACHE_TTL seconds), so siblings and descendants of a visited
+    element cost one hop.
+    """
+    root_id = _root_runtime_id(ctx.uia)
+    walker_id = id(ctx.tree_walker)
+    now = time.monotonic()
+    chain = []
+    current = ctx.com
+    runtime_id = element_runtime_id(current)
+    base = None
+    while True:
+        if runtime_id is not None:
+            if runtime_id == root_id:
+                base = 0
+                break
+            known = DEPTH_CACHE.get((walker_id, runtime_id))
+            if known is not None and now - known[1] < DEPTH_CACHE_TTL:
+                base = known[0]
+                break
+        chain.append(runtime_id)
+        if len(chain) > 50:
+            logger.warning("Reached max depth (50) when calculating rel_level.")
+            return len(chain)
+        current = ctx.tree_walker.GetParentElement(current)
+        if not current:
+            # The topmost element reached counts as depth 0.
+            base = -1
+            break
+        runtime_id = element_runtime_id(current)
+    for hops, ancestor_id in enumerate(reversed(chain), start=1):
+        if ancestor_id is not None:
+            _remember_depth(ctx.tree_walker, ancestor_id, base + hops)
+    return base + len(chain)
+
+def _count_children(ctx):
+    """Counts the raw-view children (like pywinauto's children()) without building wrappers."""
+    try:
+        found = ctx.com.FindAll(UIA.TreeScope_Children, ctx.uia.CreateTrueCondition())
+        return found.Length if found else 0
+    except comtypes.COMError:
+        walker = ctx.uia.RawViewWalker
+        count = 0
+        child = walker.GetFirstChildElement(ctx.com)
+        while child:
+            count += 1
+            child = walker.GetNextSiblingElement(child)
+        return count
+
+def _get_child_count(ctx):
+    """
+    rel_child_count. With a UIA element the children are only counted (one FindAll,
+    no wrappers) and the count is reused for CHILD_COUNT_TTL seconds; other elements
+    fall back to len(children()).
+    """
+    if not ctx.com or not ctx.uia:
+        return len(ctx.element.children())
+    runtime_id = element_runtime_id(ctx.com)
+    now = time.monotonic()
+    if runtime_id is not None:
+        entry = CHILD_COUNT_CACHE.get(runtime_id)
+        if entry is not None and now - entry[1] < CHILD_COUNT_TTL:
+            return entry[0]
+    count = _count_children(ctx)
+    if runtime_id is not None:
+        CHILD_COUNT_CACHE[runtime_id] = (count, now)
+        CHILD_COUNT_CACHE.move_to_end(runtime_id)
+        if len(CHILD_COUNT_CACHE) > CHILD_COUNT_CACHE_SIZE:
+            CHILD_COUNT_CACHE.popitem(last=False)
+    return count
+
+def get_pattern(com_element, pattern_id, interface):
+    """
+    The element's pattern interface, or None if it does not support the pattern. Both
+    answers are remembered per RuntimeId in PATTERN_CACHE for PATTERN_CACHE_TTL seconds,
+    so a pattern is asked for (and QueryInterface'd) once per element and search instead
+    of on every read.
+    """
+    runtime_id = element_runtime_id(com_element)
+    now = time.monotonic()
+    entry = PATTERN_CACHE.get(runtime_id) if runtime_id is not None else None
+    if entry is not None and now - entry[0] >= PATTERN_CACHE_TTL:
+        del PATTERN_CACHE[runtime_id]
+        entry = None
+    if entry is not None and pattern_id in entry[1]:
+        PATTERN_CACHE.move_to_end(runtime_id)
+        return entry[1][pattern_id]
+    pattern = com_element.GetCurrentPattern(pattern_id)
+    pattern = pattern.QueryInterface(interface) if pattern else None
+    if runtime_id is not None:
+        if entry is None:
+            entry = PATTERN_CACHE[runtime_id] = (now, {})
+        entry[1][pattern_id] = pattern
+        PATTERN_CACHE.move_to_end(runtime_id)
+        while PATTERN_CACHE:
+            oldest = next(iter(PATTERN_CACHE.values()))
+            if len(PATTERN_CACHE) <= PATTERN_CACHE_SIZE and now - oldest[0] < PATTERN_CACHE_TTL:
+                break
+            PATTERN_CACHE.popitem(last=False)
+    return pattern
+
+def forget_patterns(com_element):
+    """Drops the cached patterns of one element (e.g. after a read through them failed)."""
+    runtime_id = element_runtime_id(com_element)
+    if runtime_id is not None:
+        PATTERN_CACHE.pop(runtime_id, None)
+
+def _pattern_getter(pattern_id, interface, read):
+    def getter(ctx):
+        pattern = get_pattern(ctx.com, pattern_id, interface)
+        if pattern is None:
+            return None
+        try:
+            return read(pattern)
+        except comtypes.COMError:
+            # A cached interface of an element that is gone (or whose RuntimeId was reused).
+            forget_patterns(ctx.com)
+            raise
+    return getter
+
+def _element_array_names(elements):
+    """The names of the elements of an IUIAutomationElementArray (empty list for None)."""
+    if not elements:
+        return []
+    return [elements.GetElement(i).CurrentName for i in range(elements.Length)]
+
+_HANDLE, _UIA_COM = ('handle',), ('com', 'uia')
+for _key, _getter, _cost, _cacheable, _requires in [
+    ("pwa_title", lambda ctx: ctx.element.window_text(), COST_UIA_PROPERTY, True, ()),
+    ("pwa_auto_id", lambda ctx: ctx.element.automation_id(), COST_UIA_PROPERTY, True, ()),
+    ("pwa_control_type", lambda ctx: ctx.element.control_type(), COST_UIA_PROPERTY, True, ()),
+    ("pwa_class_name", lambda ctx: ctx.element.class_name(), COST_UIA_PROPERTY, True, ()),
+    ("pwa_framework_id", _uia_current('FrameworkId', 'framework_id'), COST_UIA_PROPERTY, True, ()),
+    ("win32_handle", lambda ctx: ctx.handle, COST_UIA_PROPERTY, True, _HANDLE),
+    ("win32_styles", lambda ctx: win32gui.GetWindowLong(ctx.handle, win32con.GWL_STYLE), COST_WIN32_CALL, True, _HANDLE),
+    ("win32_extended_styles", lambda ctx: win32gui.GetWindowLong(ctx.handle, win32con.GWL_EXSTYLE), COST_WIN32_CALL, True, _HANDLE),
+    ("state_is_visible", lambda ctx: ctx.element.is_visible(), COST_UIA_PROPERTY, True, ()),
+    ("state_is_enabled", lambda ctx: ctx.element.is_enabled(), COST_UIA_PROPERTY, True, ()),
+    ("state_is_active", lambda ctx: ctx.element.is_active(), COST_TREE_WALK, False, ()),
+    ("state_is_minimized", lambda ctx: ctx.element.is_minimized(), COST_PATTERN_QUERY, True, ()),
+    ("state_is_maximized", lambda ctx: ctx.element.is_maximized(), COST_PATTERN_QUERY, True, ()),
+    ("state_is_focusable", _uia_current('IsKeyboardFocusable', 'is_focusable', bool), COST_UIA_PROPERTY, True, ()),
+    ("state_is_password", _uia_current('IsPassword', 'is_password', bool), COST_UIA_PROPERTY, True, ()),
+    ("state_is_offscreen", _uia_current('IsOffscreen', 'is_offscreen', bool), COST_UIA_PROPERTY, True, ()),
+    ("state_is_content_element", _uia_current('IsContentElement', 'is_content_element', bool), COST_UIA_PROPERTY, True, ()),
+    ("state_is_control_element", _uia_current('IsControlElement', 'is_control_element', bool), COST_UIA_PROPERTY, True, ()),
+    ("geo_bounding_rect_tuple", _get_bounding_rect, COST_UIA_PROPERTY, True, ()),
+    ("geo_center_point", _get_center_point, COST_UIA_PROPERTY, True, ()),
+    ("proc_pid", lambda ctx: ctx.element.process_id(), COST_UIA_PROPERTY, True, ()),
+    ("proc_thread_id", lambda ctx: win32process.GetWindowThreadProcessId(ctx.handle)[0], COST_WIN32_CALL, True, _HANDLE),
+    ("proc_name", _process_field('proc_name'), COST_PROCESS_LOOKUP, True, ()),
+    ("proc_path", _process_field('proc_path'), COST_PROCESS_LOOKUP, True, ()),
+    ("proc_cmdline", _process_field('proc_cmdline'), COST_PROCESS_LOOKUP, True, ()),
+    ("proc_create_time", _process_field('proc_create_time'), COST_PROCESS_LOOKUP, True, ()),
+    ("proc_username", _process_field('proc_username'), COST_PROCESS_LOOKUP, True, ()),
+    ("rel_level", _get_rel_level, COST_TREE_WALK, True, ('com', 'uia', 'tree_walker')),
+    ("rel_parent_handle", lambda ctx: win32gui.GetParent(ctx.handle), COST_WIN32_CALL, True, _HANDLE),
+    ("rel_parent_title", _get_parent_title, COST_TREE_WALK, True, ()),
+    ("rel_labeled_by", _get_labeled_by, COST_WIN32_CALL, True, ()),
+    ("rel_child_count", _get_child_count, COST_TREE_WALK, True, ()),
+    # Pattern reads are the live state of a control (its value, toggle, selection, or its
+    # grid position after a sort), so none is memoized per search; the interfaces they
+    # read through are cached in PATTERN_CACHE instead.
+    ("uia_value", _pattern_getter(UIA.UIA_ValuePatternId, UIA.IUIAutomationValuePattern,
+                                  lambda p: p.CurrentValue), COST_PATTERN_QUERY, False, _UIA_COM),
+    ("uia_toggle_state", _pattern_getter(UIA.UIA_TogglePatternId, UIA.IUIAutomationTogglePattern,
+                                         lambda p: p.CurrentToggleState.name), COST_PATTERN_QUERY, False, _UIA_COM),
+    ("uia_expand_state", _pattern_getter(UIA.UIA_ExpandCollapsePatternId, UIA.IUIAutomationExpandCollapsePattern,
+                                         lambda p: p.CurrentExpandCollapseState.name), COST_PATTERN_QUERY, False, _UIA_COM),
+    ("uia_selection_items", _pattern_getter(UIA.UIA_SelectionPatternId, UIA.IUIAutomationSelectionPattern,
+                                            lambda p: _element_array_names(p.GetCurrentSelection())), COST_PATTERN_QUERY, False, _UIA_COM),
+    ("uia_range_value_info", _pattern_getter(UIA.UIA_RangeValuePatternId, UIA.IUIAutomationRangeValuePattern,
+                                             lambda p: {'Min': p.CurrentMinimum, 'Max': p.CurrentMaximum, 'Value': p.CurrentValue}),
+     COST_PATTERN_QUERY, False, _UIA_COM),
+    ("uia_grid_cell_info", _pattern_getter(UIA.UIA_GridItemPatternId, UIA.IUIAutomationGridItemPattern,
+                                           lambda p: {'Row': p.CurrentRow, 'Col': p.CurrentColumn,
+                                                      'RowSpan': p.CurrentRowSpan, 'ColSpan': p.CurrentColumnSpan}),
+     COST_PATTERN_QUERY, False, _UIA_COM),
+    ("uia_table_row_headers", _pattern_getter(UIA.UIA_TableItemPatternId, UIA.IUIAutomationTableItemPattern,
+                                              lambda p: _element_array_names(p.GetCurrentRowHeaderItems())), COST_PATTERN_QUERY, False, _UIA_COM),
+]:
+    register_property(_key, _getter, PARAMETER_DEFINITIONS[_key], _cost, _cacheable, _requires)
+del _key, _getter, _cost, _cacheable, _requires
+
+def get_property_value(pwa_element, key, uia_instance=None, tree_walker=None):
+    """
+    Central function to get the value of a property from a pywinauto element.
+    Dispatches to the registered PropertyProvider; unknown keys return None.
+    """
+    provider = PROPERTY_PROVIDERS.get(key) or PROPERTY_PROVIDERS.get(key.lower())
+    if provider is None:
+        return None
+    return provider.read(pwa_element, uia_instance, tree_walker)
+
+def _has_value(value):
+    return bool(value) or value is False or value == 0
+
+def profile_fields(profile=None, fields=None):
+    """
+    Returns the property keys to load: 'fields' if given, else the keys of the named
+    profile in PROPERTY_PROFILES ('full' or None = every registered property).
+    """
+    if fields is not None:
+        return list(fields)
+    if profile is None:
+        profile = 'full'
+    if profile not in PROPERTY_PROFILES:
+        raise ValueError(f"Unknown property profile '{profile}'. Known: {sorted(PROPERTY_PROFILES)}")
+    keys = PROPERTY_PROFILES[profile]
+    return list(PROPERTY_PROVIDERS) if keys is None else list(keys)
+
+class LazyProperties(dict):
+    """
+    What get_all_properties() returns: a plain dict of the properties loaded so far, which
+    can load the others from the element on demand (load(key), load_all()). 'fields' holds
+    every key read so far, including those that had no value.
+    """
+    def __init__(self, pwa_element, cache):
+        super().__init__()
+        self.element = pwa_element
+        self.cache = cache
+        self.fields = set()
+
+    def load(self, key):
+        """Fetches one property (if not loaded yet), stores it if it has a value and returns it."""
+        if key in self:
+            return self[key]
+        self.fields.add(key)
+        value = self.cache.get(self.element, key)
+        if _has_value(value):
+            self[key] = value
+        return value
+
+    def load_all(self):
+        """Loads every registered property not loaded yet. Returns self."""
+        for key in list(PROPERTY_PROVIDERS):
+            if key not in self:
+                self.load(key)
+        return self
+
+def get_all_properties(pwa_element, uia_instance=None, tree_walker=None, cache=None, profile=None, fields=None):
+    """
+    Returns the properties of an element that have a value, as a LazyProperties dict.
+    Only the keys of 'fields' (or of the named 'profile', see PROPERTY_PROFILES) are read
+    now; the default is every property. If a PropertyCache is given (e.g. primed by a
+    backend prefetch), values are read through it. An empty title or class name is
+    re-read from the wrapper (window_text() also covers text controls) unless the cache
+    was primed with it.
+    """
+    keys = profile_fields(profile, fields)
+    cache = cache if cache is not None else PropertyCache(uia_instance, tree_walker)
+    all_props = LazyProperties(pwa_element, cache)
+    for key in keys:
+        all_props.load(key)
+    if 'pwa_title' in keys and 'pwa_title' not in all_props and not cache.is_primed(pwa_element, 'pwa_title'):
         try: all_props['pwa_title'] = pwa_element.window_text()
         except Exception: pass
-    if 'pwa_class_name' not in all_props:
+    if 'pwa_class_name' in keys and 'pwa_class_name' not in all_props and not cache.is_primed(pwa_element, 'pwa_class_name'):
         try: all_props['pwa_class_name'] = pwa_element.class_name()
         except Exception: pass
     return all_props
@@ -322,106 +876,1045 @@ def get_top_level_window(pwa_element):
     except (AttributeError, RuntimeError):
         return None
 
+def row_value(row, key):
+    """
+    Reads a property of a scanned row (a property dict, e.g. from get_all_properties):
+    its stored value, None if the scan read the key without finding a value, or, for a
+    LazyProperties row, the value loaded on demand for a key the scan did not read.
+    """
+    if key in row:
+        return row[key]
+    if isinstance(row, LazyProperties) and key not in row.fields:
+        return row.load(key)
+    return None
+
+class PropertyCache:
+    """
+    Short-lived memo of property values keyed by (element identity, key). One instance
+    is shared by everything that reads properties during a single search, so each
+    cross-process property is fetched at most once per element.
+    """
+    def __init__(self, uia_instance=None, tree_walker=None):
+        self.uia = uia_instance
+        self.tree_walker = tree_walker
+        # id(element) -> (element, {key: value}, {primed keys}); the element is kept so its
+        # id stays unique.
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _values_for(self, pwa_element):
+        entry = self._entries.get(id(pwa_element))
+        if entry is None:
+            entry = (pwa_element, {}, set())
+            self._entries[id(pwa_element)] = entry
+        return entry[1]
+
+    def get(self, pwa_element, key):
+        if isinstance(pwa_element, dict):
+            # A scanned row (see snapshot_index) answers from its own values.
+            return row_value(pwa_element, key)
+        values = self._values_for(pwa_element)
+        if key in values:
+            self.hits += 1
+            return values[key]
+        self.misses += 1
+        provider = get_property_provider(key)
+        if provider is None:
+            return None
+        value = provider.read(pwa_element, self.uia, self.tree_walker)
+        if provider.cacheable:
+            values[key] = value
+        return value
+
+    def prime(self, pwa_element, values):
+        """Stores already-known values (e.g. from a scan) so they are never fetched."""
+        self._values_for(pwa_element).update(values)
+        self._entries[id(pwa_element)][2].update(values)
+
+    def is_primed(self, pwa_element, key):
+        """True if the value of key was primed (e.g. prefetched) rather than read live."""
+        entry = self._entries.get(id(pwa_element))
+        return entry is not None and key in entry[2]
+
+    def stats(self):
+        return {'fetched': self.misses, 'saved': self.hits}
+
+# ======================================================================
+#                      SPEC COMPILATION (PLAN CACHE)
+# ======================================================================
+
+def _freeze_spec_value(value):
+    """Converts a spec value into a hashable equivalent (lists -> tuples, dicts -> item tuples)."""
+    if isinstance(value, dict):
+        return ('__dict__',) + tuple((k, _freeze_spec_value(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_freeze_spec_value(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return ('__set__', frozenset(_freeze_spec_value(v) for v in value))
+    return value
+
+def spec_cache_key(spec):
+    """
+    Returns a hashable key for a spec dictionary (or a path spec list). Key order is
+    preserved because selector order is significant.
+    """
+    key = _freeze_spec_value(spec if isinstance(spec, list) else dict(spec or {}))
+    try:
+        hash(key)
+    except TypeError:
+        key = repr(key)
+    return key
+
+def _is_operator_syntax(criteria):
+    if not isinstance(criteria, tuple) or not criteria:
+        return False
+    op = str(criteria[0]).lower()
+    if len(criteria) == 3:
+        return op in FUZZY_OPERATORS
+    return len(criteria) == 2 and op in VALID_OPERATORS
+
+def fuzzy_target(criteria):
+    """Returns (text, threshold) of a 'fuzzy' criteria, or None if it is not one."""
+    if not _is_operator_syntax(criteria) or str(criteria[0]).lower() not in FUZZY_OPERATORS:
+        return None
+    threshold = criteria[2] if len(criteria) == 3 else FUZZY_DEFAULT_THRESHOLD
+    try:
+        threshold = float(threshold)
+    except (ValueError, TypeError):
+        threshold = FUZZY_DEFAULT_THRESHOLD
+    return str(criteria[1]), threshold
+
+def fuzzy_score(actual_value, criteria):
+    """The similarity of a value to a 'fuzzy' criteria's text (0.0 if either is missing)."""
+    target = fuzzy_target(criteria)
+    if target is None or actual_value is None:
+        return 0.0
+    return text_index.similarity(actual_value, target[0])
+
+def _compile_string_test(op, target_value):
+    """Builds the string comparison for a STRING_OPERATORS criteria, with targets prepared once."""
+    str_target = str(target_value)
+    lower_target = str_target.lower()
+    if op == 'equals': return lambda s: s == str_target
+    if op == 'iequals': return lambda s: s.lower() == lower_target
+    if op == 'contains': return lambda s: str_target in s
+    if op == 'icontains': return lambda s: lower_target in s.lower()
+    if op == 'in':
+        if isinstance(target_value, (list, tuple, set, frozenset)):
+            try:
+                target_set = frozenset(target_value)
+                return lambda s: s in target_set
+            except TypeError:
+                pass
+        return lambda s: s in target_value
+    if op == 'regex':
+        pattern = re.compile(str_target)
+        return lambda s: pattern.search(s) is not None
+    if op == 'not_equals': return lambda s: s != str_target
+    if op == 'not_iequals': return lambda s: s.lower() != lower_target
+    if op == 'not_contains': return lambda s: str_target not in s
+    if op == 'not_icontains': return lambda s: lower_target not in s.lower()
+    return lambda s: False
+
+def _compile_numeric_test(op, target_value):
+    """Builds the numeric comparison for a NUMERIC_OPERATORS criteria, with the target coerced once."""
+    try:
+        num_target = float(target_value)
+    except (ValueError, TypeError):
+        return lambda n: False
+    if op == '>': return lambda n: n > num_target
+    if op == '>=': return lambda n: n >= num_target
+    if op == '<': return lambda n: n < num_target
+    if op == '<=': return lambda n: n <= num_target
+    return lambda n: False
+
+def _compile_geometry_test(op, target_value):
+    """Builds the test for a GEOMETRY_OPERATORS criteria on a rect (or point) value."""
+    if op == 'contains_point':
+        try:
+            x, y = target_value
+        except (ValueError, TypeError):
+            return lambda rect: False
+        return lambda rect: spatial_index.rect_contains_point(rect, x, y)
+    region = spatial_index.as_rect(target_value)
+    if region is None:
+        return lambda rect: False
+    if op == 'within': return lambda rect: spatial_index.rect_contains(region, rect)
+    if op == 'intersects': return lambda rect: spatial_index.rect_intersects(rect, region)
+    return lambda rect: False
+
+def relation_target(target_value):
+    """
+    Splits the target of a RELATION_OPERATORS criteria into (anchor_spec, max_distance).
+    The target is an anchor spec dict, or an (anchor_spec, max_distance) pair.
+    Returns (None, None) if it is neither.
+    """
+    if isinstance(target_value, dict):
+        return target_value, None
+    if isinstance(target_value, (tuple, list)) and len(target_value) == 2 and isinstance(target_value[0], dict):
+        distance = target_value[1]
+        if distance is None or (isinstance(distance, (int, float)) and not isinstance(distance, bool)):
+            return target_value[0], distance
+    return None, None
+
+def compile_criteria(criteria, anchor_rects=None):
+    """
+    Compiles one filter criteria (a plain value or an (operator, target) tuple) into a
+    predicate taking the actual property value. Semantics match ElementFinder._check_condition.
+
+    A relation criteria can only be judged against its anchors: with anchor_rects (the
+    anchors' bounding rects) each value is compared to every anchor, without them the
+    predicate matches nothing. ElementFinder resolves relations with an index instead.
+    """
+    if not _is_operator_syntax(criteria):
+        return lambda actual_value: actual_value == criteria
+
+    op, target_value = str(criteria[0]).lower(), criteria[1]
+    if op in FUZZY_OPERATORS:
+        text, threshold = fuzzy_target(criteria)
+        if threshold > 1:
+            # Similarity never exceeds 1 (1 itself means the same trigram set).
+            return lambda actual_value: False
+        query = text_index.trigrams(text)
+        low, high = text_index.size_bounds(len(query), threshold)
+        def fuzzy_predicate(actual_value):
+            if actual_value is None: return False
+            grams = text_index.trigrams(actual_value)
+            return low <= len(grams) <= high and text_index.dice(query, grams) >= threshold
+        return fuzzy_predicate
+    if op in STRING_OPERATORS:
+        test = _compile_string_test(op, target_value)
+        def string_predicate(actual_value):
+            if actual_value is None: return False
+            return test(str(actual_value))
+        return string_predicate
+    if op in NUMERIC_OPERATORS:
+        test = _compile_numeric_test(op, target_value)
+        def numeric_predicate(actual_value):
+            if actual_value is None: return False
+            try:
+                return test(float(actual_value))
+            except (ValueError, TypeError):
+                return False
+        return numeric_predicate
+    if op in GEOMETRY_OPERATORS:
+        test = _compile_geometry_test(op, target_value)
+        def geometry_predicate(actual_value):
+            rect = spatial_index.as_rect(actual_value)
+            return rect is not None and test(rect)
+        return geometry_predicate
+    if op in RELATION_OPERATORS:
+        anchor_spec, max_distance = relation_target(target_value)
+        if anchor_spec is None or not anchor_rects:
+            return lambda actual_value: False
+        anchors = [rect for rect in (spatial_index.as_rect(a) for a in anchor_rects) if rect is not None]
+        def relation_predicate(actual_value):
+            rect = spatial_index.as_rect(actual_value)
+            return rect is not None and any(spatial_index.relation_holds(op, rect, a, max_distance) for a in anchors)
+        return relation_predicate
+    return lambda actual_value: False
+
+class FilterStep:
+    """
+    One compiled filter of a plan: the property key, its raw criteria and the predicate.
+    Also records how many candidates it has seen and kept, so the planner can learn
+    its selectivity across runs.
+    """
+    def __init__(self, key, criteria):
+        self.key = key
+        self.criteria = criteria
+        self.test = compile_criteria(criteria)
+        self.cost_class = property_cost_class(key)
+        self.evaluated = 0
+        self.passed = 0
+        self.relation = None
+        self.anchor_spec = self.max_distance = None
+        self.fuzzy = fuzzy_target(criteria)
+        if _is_operator_syntax(criteria) and str(criteria[0]).lower() in RELATION_OPERATORS:
+            self.relation = str(criteria[0]).lower()
+            self.anchor_spec, self.max_distance = relation_target(criteria[1])
+
+    @property
+    def pass_rate(self):
+        """Observed fraction of candidates kept (smoothed, 0.5 before any observation)."""
+        return (self.passed + 1) / (self.evaluated + 2)
+
+    @property
+    def rank(self):
+        """Expected cost per candidate removed; lower ranks run first."""
+        return FILTER_COST_WEIGHTS[self.cost_class] / max(1.0 - self.pass_rate, 0.01)
+
+    def record(self, evaluated, passed):
+        self.evaluated += evaluated
+        self.passed += passed
+
+    def matches(self, elem, actual_value):
+        return self.test(actual_value)
+
+    def __repr__(self):
+        return f"FilterStep({self.key!r}, {self.criteria!r})"
+
+class BoundRelationStep:
+    """
+    A relation FilterStep bound to one search: 'allowed' holds the ids of the candidates
+    the SpatialIndex found in the relation to an anchor. Statistics go to the plan's step.
+    """
+    def __init__(self, step, allowed, anchor_rects):
+        self.step = step
+        self.key = step.key
+        self.criteria = step.criteria
+        self.cost_class = step.cost_class
+        self.allowed = allowed
+        self.anchor_rects = anchor_rects
+        self.test = compile_criteria(step.criteria, anchor_rects)
+
+    def record(self, evaluated, passed):
+        self.step.record(evaluated, passed)
+
+    def matches(self, elem, actual_value):
+        return id(elem) in self.allowed
+
+    def __repr__(self):
+        return f"BoundRelationStep({self.key!r}, {self.criteria!r}, {len(self.allowed)} allowed)"
+
+class CompiledSpec:
+    """
+    A reusable matching plan for a window/element spec: filter criteria are compiled into
+    predicates and selectors are split out. Built by compile_spec() and cached.
+    """
+    def __init__(self, spec):
+        self.spec = dict(spec or {})
+        self.filters = [FilterStep(k, v) for k, v in self.spec.items() if k not in SORTING_KEYS]
+        self.selectors = {k: v for k, v in self.spec.items() if k in SORTING_KEYS}
+        self.relations = [step for step in self.filters if step.relation]
+
+    @property
+    def filter_spec(self):
+        return {step.key: step.criteria for step in self.filters}
+
+    def ordered_filters(self):
+        """
+        Returns the filters in execution order: cheapest cost class and most selective
+        first. Ties keep spec order. Filters are a conjunction, so the order never
+        changes the result, only how many properties are fetched.
+        """
+        return sorted(self.filters, key=lambda step: (step.rank, step.cost_class))
+
+    def split_pushdown(self, backend):
+        """
+        Splits the filters into a backend condition and the residual FilterSteps that
+        must still run in Python. Only equality criteria on the backend's PUSHDOWN_KEYS
+        are pushed: a plain value, ('equals', str) or ('in', [str, ...]) (as an Or), plus
+        'fuzzy' criteria on its FUZZY_KEYS.
+        Returns (condition or None, residual_filters in execution order).
+        """
+        conditions = []
+        residual = []
+        for step in self.ordered_filters():
+            condition = self._pushdown_condition(step, backend)
+            if condition is None:
+                residual.append(step)
+                continue
+            conditions.append(condition)
+            if not backend.is_exact(step.key):
+                residual.append(step)
+        if not conditions:
+            return None, residual
+        return finder_backends.and_condition(*conditions), residual
+
+    @staticmethod
+    def _pushdown_condition(step, backend):
+        key, criteria = step.key, step.criteria
+        if step.fuzzy:
+            return finder_backends.fuzzy_condition(key, *step.fuzzy) if key in backend.FUZZY_KEYS else None
+        expected_type = bool if key.startswith('state_') else str
+        if _is_operator_syntax(criteria):
+            op, target = str(criteria[0]).lower(), criteria[1]
+            if op == 'equals' and expected_type is str and isinstance(target, str):
+                values = [target]
+            elif op == 'in' and expected_type is str and isinstance(target, (list, tuple, set, frozenset)) \
+                    and target and all(isinstance(v, str) for v in target):
+                values = list(target)
+            else:
+                return None
+        elif type(criteria) is expected_type:
+            values = [criteria]
+        else:
+            return None
+        if not all(backend.can_push_down(key, v) for v in values):
+            return None
+        return finder_backends.or_condition(*[finder_backends.property_condition(key, v) for v in values])
+
+    def property_keys(self, filters=None):
+        """Returns the property keys the given filters (default: all) and the selectors read."""
+        keys = [step.key for step in (self.filters if filters is None else filters)]
+        keys.extend(SELECTOR_PROPERTY_KEYS[k] for k in self.selectors if k in SELECTOR_PROPERTY_KEYS)
+        for step in self.relations:
+            if step.anchor_spec is not None:
+                keys.append('geo_bounding_rect_tuple')
+                keys.extend(compile_spec(step.anchor_spec).property_keys())
+        return list(OrderedDict.fromkeys(keys))
+
+    def stop_after(self, limit=None):
+        """
+        Returns how many filter matches a search needs before it can stop, or None if
+        every candidate must be seen. 'sort_by_scan_order: N' (N > 0) needs N matches;
+        any other selector needs the full list; without selectors the caller's limit applies.
+        """
+        if 'sort_by_scan_order' in self.selectors:
+            index = self.selectors['sort_by_scan_order']
+            return index if isinstance(index, int) and index > 0 else None
+        if self.selectors:
+            return None
+        return limit
+
+    def __repr__(self):
+        return f"CompiledSpec({self.spec!r})"
+
+def compile_spec(spec):
+    """
+    Returns the CompiledSpec for a spec, reusing a cached plan when the same spec was
+    compiled before. The cache is bounded to SPEC_PLAN_CACHE_SIZE plans (LRU).
+    """
+    if isinstance(spec, CompiledSpec):
+        return spec
+    key = spec_cache_key(spec)
+    plan = SPEC_PLAN_CACHE.get(key)
+    if plan is not None:
+        SPEC_PLAN_CACHE.move_to_end(key)
+        return plan
+    plan = CompiledSpec(spec)
+    SPEC_PLAN_CACHE[key] = plan
+    if len(SPEC_PLAN_CACHE) > SPEC_PLAN_CACHE_SIZE:
+        SPEC_PLAN_CACHE.popitem(last=False)
+    return plan
+
+def is_path_spec(spec):
+    """True if spec is a path spec: a list of steps instead of a single spec dict."""
+    return isinstance(spec, list)
+
+class PathStep:
+    """One step of a CompiledPath: the axis ('child' or 'descendant') and its CompiledSpec."""
+    def __init__(self, axis, plan):
+        self.axis = axis
+        self.plan = plan
+
+    def __repr__(self):
+        return f"PathStep({self.axis!r}, {self.plan.spec!r})"
+
+class CompiledPath:
+    """
+    A compiled path spec, e.g. [{'pwa_auto_id': 'loginPanel'}, ('child', {'pwa_control_type': 'Edit'})].
+    Each step is a spec dict (descendant axis) or an (axis, spec) pair with an axis from
+    PATH_AXES. Raises ValueError for a malformed path.
+    """
+    def __init__(self, path):
+        if not path:
+            raise ValueError("A path spec needs at least one step.")
+        self.steps = []
+        for raw_step in path:
+            if isinstance(raw_step, dict):
+                axis, step_spec = 'descendant', raw_step
+            elif isinstance(raw_step, (tuple, list)) and len(raw_step) == 2 and isinstance(raw_step[1], dict):
+                axis, step_spec = str(raw_step[0]).lower(), raw_step[1]
+            else:
+                raise ValueError(f"Invalid path step {raw_step!r}: expected a spec dict or an (axis, spec) pair.")
+            if axis not in PATH_AXES:
+                raise ValueError(f"Invalid path axis '{axis}'. Valid axes: {PATH_AXES}")
+            self.steps.append(PathStep(axis, compile_spec(step_spec)))
+
+    def prunable(self, index):
+        """
+        True if the walk for step 'index' may skip the subtree of each element it matches.
+        That holds when the next step searches descendants (the matched element's own
+        descendant search already covers any nested match) and the step has no selectors
+        or relations (which would need every match).
+        """
+        step = self.steps[index]
+        return (index + 1 < len(self.steps) and self.steps[index + 1].axis == 'descendant'
+                and not step.plan.selectors and not step.plan.relations)
+
+    def __repr__(self):
+        return f"CompiledPath({self.steps!r})"
+
+def compile_path(path):
+    """Returns the CompiledPath for a path spec, cached alongside the spec plans."""
+    if isinstance(path, CompiledPath):
+        return path
+    key = ('__path__', spec_cache_key(path))
+    compiled = SPEC_PLAN_CACHE.get(key)
+    if compiled is not None:
+        SPEC_PLAN_CACHE.move_to_end(key)
+        return compiled
+    compiled = CompiledPath(path)
+    SPEC_PLAN_CACHE[key] = compiled
+    if len(SPEC_PLAN_CACHE) > SPEC_PLAN_CACHE_SIZE:
+        SPEC_PLAN_CACHE.popitem(last=False)
+    return compiled
+
 # ======================================================================
 #                      CENTRAL ELEMENT FINDER CLASS
 # ======================================================================
 
+class _Descending:
+    """Inverts the ordering of a non-numeric sort value (e.g. a creation time string)."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+class SearchScope:
+    """
+    A candidate pool made of the descendants of 'root'. Calling it streams the
+    descendants like any other search_pool, but it also tells the ElementFinder where
+    the search is rooted so criteria can be pushed down to the backend.
+    """
+    def __init__(self, finder, root):
+        self.finder = finder
+        self.root = root
+
+    def __call__(self):
+        return self.finder.iter_descendants(self.root)
+
 class ElementFinder:
-    def __init__(self, uia_instance, tree_walker, log_callback=None):
+    """
+    Finds elements matching a spec in a pool of candidates.
+
+    Logging protocol: log_callback(level, message) receives the diagnostics. An optional
+    log_wants(level) -> bool (or a 'wants' attribute on the callback) tells the finder
+    which levels will actually be consumed; per-candidate lines (level 'DEBUG') are only
+    built when wanted. Without a callback nothing is built at all.
+    """
+    def __init__(self, uia_instance, tree_walker, log_callback=None, log_wants=None, backend=None, pushdown=True, prefetch=True):
         def dummy_log(level, message): pass
         self.log = log_callback if callable(log_callback) else dummy_log
+        if callable(log_wants):
+            self.wants = log_wants
+        elif callable(getattr(log_callback, 'wants', None)):
+            self.wants = log_callback.wants
+        elif callable(log_callback):
+            self.wants = lambda level: True
+        else:
+            self.wants = lambda level: False
         self.uia = uia_instance
         self.tree_walker = tree_walker
+        if backend is None and uia_instance is not None:
+            backend = finder_backends.UIABackend(uia_instance)
+        self.backend = backend
+        self.pushdown = pushdown
+        self.prefetch = prefetch
+        # Cumulative property fetch counters across all searches of this finder.
+        self.property_stats = {'fetched': 0, 'saved': 0}
+        self.last_property_stats = {'fetched': 0, 'saved': 0}
+
+    def new_property_cache(self):
+        return PropertyCache(self.uia, self.tree_walker)
+
+    def _record_property_stats(self, cache):
+        self.last_property_stats = cache.stats()
+        for name, count in self.last_property_stats.items():
+            self.property_stats[name] += count
+        self.log('DEBUG', f"Property fetches: {cache.misses} fetched, {cache.hits} saved by cache.")
 
-    def find(self, search_pool, spec):
+    def find(self, search_pool, spec, limit=None):
+        """
+        Returns the candidates from search_pool() that match the spec.
+
+        search_pool may return a list or any iterable (e.g. iter_descendants()). Iterables,
+        and lists searched with a 'limit' or a positive 'sort_by_scan_order', are streamed
+        one candidate at a time through the filter chain and the walk stops as soon as
+        enough matches are found. 'limit' is the most matches the caller cares about
+        (e.g. 2 for an existence/uniqueness check).
+
+        A SearchScope pool (see scope()) lets the backend do part of the work: equality
+        criteria are pushed down and, unless the search only wants the first match, the
+        properties the plan reads are prefetched with the candidates in one call.
+
+        A path spec (a list of steps, see find_path()) is resolved step by step instead.
+        """
+        if is_path_spec(spec):
+            return self.find_path(search_pool, spec, limit)
         self.log('DEBUG', f"Starting search with spec: {spec}")
+        plan = compile_spec(spec)
+        stop_after = plan.stop_after(limit)
+        filters = plan.ordered_filters()
+        cache = self.new_property_cache()
+        try:
+            try:
+                if isinstance(search_pool, SearchScope) and self.backend:
+                    candidates, filters = self._scope_candidates(search_pool, plan, stop_after, cache)
+                else:
+                    candidates = search_pool()
+            except Exception as e:
+                self.log('ERROR', f"Error getting initial list of candidates: {e}")
+                return []
+            return self._match(candidates, plan, filters, cache, stop_after)
+        finally:
+            self._record_property_stats(cache)
+
+    def _match(self, candidates, plan, filters, cache, stop_after):
+        """Runs a plan's (residual) filters and selectors over the candidates."""
+        anchors = None
+        if plan.relations:
+            try:
+                candidates = list(candidates)
+                filters, anchors = self._bind_relations(candidates, filters, cache)
+            except Exception as e:
+                self.log('ERROR', f"Error resolving relation anchors: {e}")
+                return []
+        if isinstance(candidates, (list, tuple)) and stop_after is None:
+            self.log('DEBUG', f"Found {len(candidates)} initial candidates.")
+            if not candidates: return []
+            return self._run_plan(list(candidates), filters, plan.selectors, cache, anchors)
+        return self._run_streaming(candidates, filters, plan.selectors, cache, stop_after, anchors)
+
+    def matches(self, element, spec):
+        """
+        True if one element passes every filter of a spec. Selectors are ignored, so this
+        re-checks an earlier match (e.g. a cached resolution) rather than choosing one.
+        """
+        plan = compile_spec(spec)
+        cache = self.new_property_cache()
+        try:
+            return self._passes_filters(element, plan.ordered_filters(), cache)
+        finally:
+            self._record_property_stats(cache)
+
+    def find_path(self, search_pool, path, limit=None):
+        """
+        Resolves a path spec: a list of steps, each a spec dict (descendant axis) or an
+        (axis, spec) pair with axis 'child' or 'descendant', e.g.
+        [{'pwa_auto_id': 'loginPanel'}, ('descendant', {'pwa_control_type': 'Edit'})].
+
+        Each step is matched below every element the previous step matched (selectors pick
+        per parent); the first step is matched below the scope's root, or over the whole
+        pool when search_pool is not a SearchScope. Only the subtrees the path leads into
+        are walked: a 'child' step reads one level, a pushable step is one backend query,
+        and an intermediate step without selectors does not search below its own matches
+        (the next step does). Results are de-duplicated and in walk order; 'limit' works
+        as in find().
+        """
+        self.log('DEBUG', f"Starting path search with spec: {path}")
+        try:
+            compiled = compile_path(path)
+        except ValueError as e:
+            self.log('ERROR', str(e))
+            return []
+        cache = self.new_property_cache()
+        try:
+            if isinstance(search_pool, SearchScope):
+                contexts, first = [search_pool.root], 0
+            else:
+                step = compiled.steps[0]
+                stop_after = step.plan.stop_after(limit if len(compiled.steps) == 1 else None)
+                try:
+                    candidates = search_pool()
+                except Exception as e:
+                    self.log('ERROR', f"Error getting initial list of candidates: {e}")
+                    return []
+                contexts, first = self._match(candidates, step.plan, step.plan.ordered_filters(), cache, stop_after), 1
+            for index in range(first, len(compiled.steps)):
+                if not contexts:
+                    break
+                step = compiled.steps[index]
+                last = index == len(compiled.steps) - 1
+                stop_after = step.plan.stop_after(limit if last else None)
+                self.log('FILTER', f"Path step {index + 1} ({step.axis}): {step.plan.spec} below {len(contexts)} element(s)")
+                matches, seen = [], set()
+                for context in contexts:
+                    for elem in self._step_matches(context, step, cache, stop_after, compiled.prunable(index)):
+                        if id(elem) not in seen:
+                            seen.add(id(elem))
+                            matches.append(elem)
+                    if last and limit and not step.plan.selectors and len(matches) >= limit:
+                        break
+                contexts = matches
+            self.log('INFO', f"Path search matched {len(contexts)} element(s).")
+            return contexts
+        finally:
+            self._record_property_stats(cache)
+
+    def _step_matches(self, context, step, cache, stop_after, prune):
+        """The matches of one path step below one context element."""
+        plan = step.plan
+        if step.axis == 'child':
+            try:
+                children = list(self.iter_children(context))
+            except Exception as e:
+                self.log('ERROR', f"Error getting children: {e}")
+                return []
+            return self._match(children, plan, plan.ordered_filters(), cache, stop_after)
+        if prune and not self._pushes_down(plan):
+            try:
+                return list(self._walk_pruned(context, plan.ordered_filters(), cache))
+            except Exception as e:
+                self.log('ERROR', f"Error while walking the tree: {e}")
+                return []
+        scope = self.scope(context)
         try:
-            candidates = search_pool()
+            if self.backend:
+                candidates, filters = self._scope_candidates(scope, plan, stop_after, cache)
+            else:
+                candidates, filters = scope(), plan.ordered_filters()
         except Exception as e:
             self.log('ERROR', f"Error getting initial list of candidates: {e}")
             return []
-        self.log('DEBUG', f"Found {len(candidates)} initial candidates.")
-        if not candidates: return []
-        filter_spec, selector_spec = self._split_spec(spec)
-        if filter_spec:
+        return self._match(candidates, plan, filters, cache, stop_after)
+
+    def _pushes_down(self, plan):
+        """True if a descendant search for the plan would be pushed down to the backend."""
+        return bool(self.backend and self.pushdown and not plan.relations
+                    and plan.split_pushdown(self.backend)[0] is not None)
+
+    def _walk_pruned(self, root, filters, cache):
+        """
+        Yields the descendants of root matching the filters, in pre-order, without
+        descending into a matched element.
+        """
+        verbose = self.wants('DEBUG')
+        stack = [iter(self.iter_children(root))]
+        while stack:
+            elem = next(stack[-1], None)
+            if elem is None:
+                stack.pop()
+                continue
+            if self._passes_filters(elem, filters, cache, verbose):
+                yield elem
+            else:
+                stack.append(iter(self.iter_children(elem)))
+
+    def find_many(self, search_pool, specs, limit=None):
+        """
+        Resolves several specs ({name: spec}) with a single pass over search_pool().
+        Returns {name: [matching elements]}, each list exactly as find() would return it.
+
+        Every candidate is checked against all specs that still need matches, sharing one
+        PropertyCache, and the walk stops once every spec has enough matches (see find()
+        for 'limit' and early stopping). On a SearchScope, push-down is used when every
+        spec has a pushable criterion (the conditions are OR-ed), and the union of the
+        properties all specs read is prefetched when the pass has to be exhaustive.
+
+        What this saves over one find() per spec is the walk (one instead of one per spec;
+        on UIA each step is a cross-process call) and the reads of properties that several
+        specs share. Keys only one spec reads are still fetched per candidate. Path specs do
+        not join the pass: each is resolved with find_path() on its own.
+        """
+        path_names = [name for name, spec in specs.items() if is_path_spec(spec)]
+        if path_names:
+            others = {name: spec for name, spec in specs.items() if name not in path_names}
+            found = self.find_many(search_pool, others, limit) if others else {}
+            found.update({name: self.find_path(search_pool, specs[name], limit) for name in path_names})
+            return {name: found[name] for name in specs}
+        self.log('DEBUG', f"Starting multi-spec search for: {list(specs)}")
+        plans = {name: compile_spec(spec) for name, spec in specs.items()}
+        stops = {name: plan.stop_after(limit) for name, plan in plans.items()}
+        filters = {name: plan.ordered_filters() for name, plan in plans.items()}
+        matches = {name: [] for name in plans}
+        anchors = {name: None for name in plans}
+        if not plans:
+            return matches
+        cache = self.new_property_cache()
+        try:
+            try:
+                if isinstance(search_pool, SearchScope) and self.backend:
+                    candidates = self._shared_scope_candidates(search_pool, plans, stops, cache)
+                else:
+                    candidates = search_pool()
+                if any(plan.relations for plan in plans.values()):
+                    candidates = list(candidates)
+                    for name, plan in plans.items():
+                        if plan.relations:
+                            filters[name], anchors[name] = self._bind_relations(candidates, filters[name], cache)
+            except Exception as e:
+                self.log('ERROR', f"Error getting initial list of candidates: {e}")
+                return {name: [] for name in plans}
+            verbose = self.wants('DEBUG')
+            pending = [name for name in plans]
+            scanned = 0
+            try:
+                for elem in candidates:
+                    scanned += 1
+                    for name in list(pending):
+                        if self._passes_filters(elem, filters[name], cache, verbose):
+                            matches[name].append(elem)
+                            if stops[name] and len(matches[name]) >= stops[name]:
+                                pending.remove(name)
+                    if not pending:
+                        break
+            except Exception as e:
+                self.log('ERROR', f"Error while streaming candidates: {e}")
+                return {name: [] for name in plans}
+            self.log('INFO', f"Streamed {scanned} candidates for {len(plans)} specs{' (stopped early)' if not pending else ''}.")
+            for name, plan in plans.items():
+                if matches[name] and plan.selectors:
+                    matches[name] = self._apply_selectors(matches[name], plan.selectors, cache, anchors[name])
+                self.log('DEBUG', f"Spec '{name}': {len(matches[name])} match(es).")
+            return matches
+        finally:
+            self._record_property_stats(cache)
+
+    def _shared_scope_candidates(self, scope, plans, stops, cache):
+        """Backend candidates for find_many(); the counterpart of _scope_candidates()."""
+        condition = None
+        has_relations = any(plan.relations for plan in plans.values())
+        if self.pushdown and not has_relations:
+            conditions = [plan.split_pushdown(self.backend)[0] for plan in plans.values()]
+            if all(c is not None for c in conditions):
+                condition = finder_backends.or_condition(*conditions)
+                self.log('DEBUG', f"Pushing down to '{self.backend.name}' backend: {condition}")
+        streams = all(self._streams(plan, stops[name]) for name, plan in plans.items())
+        if self.prefetch and (condition is not None or has_relations or not streams):
+            keys = OrderedDict()
+            for plan in plans.values():
+                keys.update((k, None) for k in plan.property_keys() if k in self.backend.PREFETCH_KEYS)
+            if keys or condition is None:
+                self.log('DEBUG', f"Prefetching {list(keys)} from '{self.backend.name}' backend.")
+                prefetched = self.backend.prefetch(scope.root, list(keys), condition)
+                for element, values in prefetched:
+                    cache.prime(element, values)
+                return [element for element, _ in prefetched]
+        if condition is not None:
+            return self.backend.find_all(scope.root, condition)
+        return scope()
+
+    @staticmethod
+    def _streams(plan, stop_after):
+        """
+        True if a search on a SearchScope should walk the tree lazily: a first-match
+        search (stop_after == 1) or one picking the Nth match by 'sort_by_scan_order'.
+        Other limits (e.g. the 2 of a uniqueness check) only stop early when the element
+        is ambiguous; in the common case the whole scope is seen, and a walk costs two
+        cross-process calls per node where the bulk query is one call.
+        """
+        return stop_after == 1 or (stop_after is not None and 'sort_by_scan_order' in plan.selectors)
+
+    def scope(self, root):
+        """Returns a SearchScope over the descendants of root (enables push-down)."""
+        return SearchScope(self, root)
+
+    def _scope_candidates(self, scope, plan, stop_after, cache):
+        """
+        Gets the candidates of a SearchScope from the backend. Returns the candidates and
+        the residual filters still to run in Python.
+
+        - The push-down-safe part of the plan runs as one backend query (if enabled).
+        - A first-match search (see _streams()) walks the tree lazily so it can stop early.
+        - Any other search is one bulk call: the properties the residual filters and
+          selectors read are prefetched with the candidates and primed into the cache.
+
+        A plan with relation operators needs the whole scope (its anchors are found in the
+        same pool), so it is never pushed down and always prefetched.
+        """
+        if self.pushdown and not plan.relations:
+            condition, residual = plan.split_pushdown(self.backend)
+        else:
+            condition, residual = None, plan.ordered_filters()
+        if condition is not None:
+            self.log('DEBUG', f"Pushing down to '{self.backend.name}' backend: {condition}")
+        if condition is None and not plan.relations and self._streams(plan, stop_after):
+            return scope(), residual
+        if condition is not None and stop_after == 1 and not residual:
+            first = self.backend.find_first(scope.root, condition)
+            return ([first] if first is not None else []), residual
+        keys = [k for k in plan.property_keys(residual) if k in self.backend.PREFETCH_KEYS]
+        if self.prefetch and (keys or condition is None):
+            if self.wants('DEBUG') and 'pwa_title' in self.backend.PREFETCH_KEYS and 'pwa_title' not in keys:
+                keys.append('pwa_title')
+            self.log('DEBUG', f"Prefetching {keys} from '{self.backend.name}' backend.")
+            prefetched = self.backend.prefetch(scope.root, keys, condition)
+            for element, values in prefetched:
+                cache.prime(element, values)
+            return [element for element, _ in prefetched], residual
+        if condition is None:
+            return scope(), residual
+        return self.backend.find_all(scope.root, condition), residual
+
+    def iter_descendants(self, root):
+        """
+        Lazily yields the descendants of a pywinauto element in the same pre-order as
+        root.descendants(), creating each wrapper only when the consumer asks for it.
+        """
+        if self.backend is None:
+            return iter(root.descendants())
+        return self.backend.iter_descendants(root)
+
+    def iter_children(self, root):
+        """Yields the direct children of a pywinauto element, in the order of root.children()."""
+        if self.backend is None:
+            return iter(root.children())
+        return self.backend.iter_children(root)
+
+    def _bind_relations(self, candidates, filters, cache):
+        """
+        Resolves the relation steps among the filters against the candidate pool. Each
+        anchor spec is matched in the same pool, then one SpatialIndex per property key
+        answers which candidates stand in the relation to any anchor (the anchors
+        themselves never match). Returns (filters with the relation steps bound, the rects
+        of all anchors) for the rest of the search.
+        """
+        indexes = {}
+        bound = []
+        anchor_rects = []
+        for step in filters:
+            if not getattr(step, 'relation', None):
+                bound.append(step)
+                continue
+            anchors = self._resolve_anchors(candidates, step.anchor_spec, cache) if step.anchor_spec is not None else []
+            rects = [rect for rect in (cache.get(a, 'geo_bounding_rect_tuple') for a in anchors) if rect]
+            self.log('FILTER', f"Relation '{step.relation}': {len(rects)} anchor(s) for {step.anchor_spec!r}")
+            if step.key not in indexes:
+                indexes[step.key] = spatial_index.SpatialIndex((elem, cache.get(elem, step.key)) for elem in candidates)
+            allowed = set()
+            for rect in rects:
+                allowed.update(id(elem) for elem in indexes[step.key].related(step.relation, rect, step.max_distance))
+            allowed.difference_update(id(a) for a in anchors)
+            bound.append(BoundRelationStep(step, allowed, rects))
+            anchor_rects.extend(rects)
+        return bound, anchor_rects
+
+    def _resolve_anchors(self, candidates, anchor_spec, cache):
+        """Finds the anchors of a relation: the candidates matching anchor_spec."""
+        plan = compile_spec(anchor_spec)
+        filters, anchors = plan.ordered_filters(), None
+        if plan.relations:
+            filters, anchors = self._bind_relations(candidates, filters, cache)
+        return self._run_plan(list(candidates), filters, plan.selectors, cache, anchors)
+
+    def _run_streaming(self, candidates, filters, selectors, cache, stop_after, anchors=None):
+        verbose = self.wants('DEBUG')
+        matches = []
+        scanned = 0
+        stopped_early = False
+        try:
+            for elem in candidates:
+                scanned += 1
+                if self._passes_filters(elem, filters, cache, verbose):
+                    matches.append(elem)
+                    if stop_after and len(matches) >= stop_after:
+                        stopped_early = True
+                        break
+        except Exception as e:
+            self.log('ERROR', f"Error while streaming candidates: {e}")
+            return []
+        self.log('INFO', f"Streamed {scanned} candidates, {len(matches)} matched{' (stopped early)' if stopped_early else ''}.")
+        if not matches:
+            self.log('INFO', "No candidates left after filtering.")
+            return []
+        if selectors:
+            self.log('INFO', f"Applying selectors to {len(matches)} candidates...")
+            matches = self._apply_selectors(matches, selectors, cache, anchors)
+            if not matches:
+                self.log('INFO', "No candidates left after selecting.")
+                return []
+        return matches
+
+    def _passes_filters(self, elem, filters, cache, verbose=False):
+        for step in filters:
+            actual_value = cache.get(elem, step.key)
+            matches = step.matches(elem, actual_value)
+            step.record(1, 1 if matches else 0)
+            if verbose:
+                if matches:
+                    self.log('DEBUG', [("[KEEP] ", 'KEEP'), (f"'{cache.get(elem, 'pwa_title')}' because '{step.key}' with value '{actual_value}' matches.", 'DEBUG')])
+                else:
+                    self.log('DEBUG', [("[DISCARD] ", 'DISCARD'), (f"'{cache.get(elem, 'pwa_title')}' because '{step.key}' with value '{actual_value}' does not match.", 'DEBUG')])
+            if not matches:
+                return False
+        return True
+
+    def _run_plan(self, candidates, filters, selectors, cache, anchors=None):
+        if filters:
             self.log('INFO', f"Applying filters to {len(candidates)} candidates...")
-            candidates = self._apply_filters(candidates, filter_spec)
+            candidates = self._apply_filters(candidates, filters, cache)
             if not candidates:
                 self.log('INFO', "No candidates left after filtering.")
                 return []
             self.log('SUCCESS', f"Remaining {len(candidates)} candidates after filtering.")
-        if selector_spec:
+        if selectors:
             self.log('INFO', f"Applying selectors to {len(candidates)} candidates...")
-            candidates = self._apply_selectors(candidates, selector_spec)
+            candidates = self._apply_selectors(candidates, selectors, cache, anchors)
             if not candidates:
                 self.log('INFO', "No candidates left after selecting.")
                 return []
         return candidates
 
     def _split_spec(self, spec):
-        filter_spec = {k: v for k, v in spec.items() if k not in SORTING_KEYS}
-        selector_spec = {k: v for k, v in spec.items() if k in SORTING_KEYS}
-        return filter_spec, selector_spec
+        plan = compile_spec(spec)
+        return plan.filter_spec, dict(plan.selectors)
 
-    def _apply_filters(self, elements, spec):
-        if not spec: return elements
+    def _apply_filters(self, elements, filters, cache=None):
+        """Applies compiled FilterSteps (or a raw filter spec dict) to the elements."""
+        if not filters: return elements
+        cache = cache or self.new_property_cache()
+        if isinstance(filters, dict):
+            filters = [FilterStep(k, v) for k, v in filters.items()]
         current_elements = list(elements)
-        for key, criteria in spec.items():
-            self.log('FILTER', f"Filtering by: {{'{key}': {repr(criteria)}}}")
+        for step in filters:
+            key = step.key
+            self.log('FILTER', f"Filtering by: {{'{key}': {repr(step.criteria)}}}")
             initial_count = len(current_elements)
-            kept_elements = []
-            for elem in current_elements:
-                actual_value = get_property_value(elem, key, self.uia, self.tree_walker)
-                matches = self._check_condition(actual_value, criteria)
-                log_msg_parts = []
-                if matches:
-                    log_msg_parts.append(("[KEEP] ", 'KEEP'))
-                    log_msg_parts.append((f"'{elem.window_text()}' because '{key}' with value '{actual_value}' matches.", 'DEBUG'))
-                else:
-                    log_msg_parts.append(("[DISCARD] ", 'DISCARD'))
-                    log_msg_parts.append((f"'{elem.window_text()}' because '{key}' with value '{actual_value}' does not match.", 'DEBUG'))
-                self.log('DEBUG', log_msg_parts)
-                if matches: kept_elements.append(elem)
+            test = step.matches
+            if not self.wants('DEBUG'):
+                kept_elements = [elem for elem in current_elements if test(elem, cache.get(elem, key))]
+            else:
+                kept_elements = []
+                for elem in current_elements:
+                    actual_value = cache.get(elem, key)
+                    matches = test(elem, actual_value)
+                    log_msg_parts = []
+                    if matches:
+                        log_msg_parts.append(("[KEEP] ", 'KEEP'))
+                        log_msg_parts.append((f"'{cache.get(elem, 'pwa_title')}' because '{key}' with value '{actual_value}' matches.", 'DEBUG'))
+                    else:
+                        log_msg_parts.append(("[DISCARD] ", 'DISCARD'))
+                        log_msg_parts.append((f"'{cache.get(elem, 'pwa_title')}' because '{key}' with value '{actual_value}' does not match.", 'DEBUG'))
+                    self.log('DEBUG', log_msg_parts)
+                    if matches: kept_elements.append(elem)
+            step.record(initial_count, len(kept_elements))
             self.log('INFO', f"  -> Result: Kept {len(kept_elements)}/{initial_count} candidates.")
             if not kept_elements: return []
             current_elements = kept_elements
         return current_elements
 
-    def _check_condition(self, actual_value, criteria):
-        is_operator_syntax = (isinstance(criteria, tuple) and 
-                              len(criteria) == 2 and 
-                              str(criteria[0]).lower() in VALID_OPERATORS)
-        if is_operator_syntax:
-            operator, target_value = criteria
-            op = str(operator).lower()
-            if actual_value is None: return False
-            if op in STRING_OPERATORS:
-                str_actual, str_target = str(actual_value), str(target_value)
-                if op == 'equals': return str_actual == str_target
-                if op == 'iequals': return str_actual.lower() == str_target.lower()
-                if op == 'contains': return str_target in str_actual
-                if op == 'icontains': return str_target.lower() in str_actual.lower()
-                if op == 'in': return str_actual in target_value
-                if op == 'regex': return re.search(str_target, str_actual) is not None
-                if op == 'not_equals': return str_actual != str_target
-                if op == 'not_iequals': return str_actual.lower() != str_target.lower()
-                if op == 'not_contains': return str_target not in str_actual
-                if op == 'not_icontains': return str_target.lower() not in str_actual.lower()
-            if op in NUMERIC_OPERATORS:
-                try:
-                    num_actual, num_target = float(actual_value), float(target_value)
-                    if op == '>': return num_actual > num_target
-                    if op == '>=': return num_actual >= num_target
-                    if op == '<': return num_actual < num_target
-                    if op == '<=': return num_actual <= num_target
-                except (ValueError, TypeError): return False
-        else:
-            return actual_value == criteria
-        return False
+    def _check_condition(self, actual_value, criteria, anchor_rects=None):
+        """
+        Checks one value against one criteria. A relation criteria needs the anchors'
+        rects (anchor_rects); find() resolves relations through a SpatialIndex instead.
+        """
+        return compile_criteria(criteria, anchor_rects)(actual_value)
+
+    def _apply_selectors(self, candidates, selectors, cache=None, anchors=None):
+        """
+        Picks one candidate according to the selectors. Ordering rules:
+
+        - 'sort_by_scan_order: N' wins over everything: the Nth candidate in scan order
+          (N > 0), or a Python index from the end (N < 0).
+        - The other 'sort_by_*' keys sort the candidates, in spec order: the first key is
+          the primary key, each later key only breaks ties of the keys before it. The sign
+          of each value sets its direction (positive ascending, negative descending), so
+          'sort_by_y_pos: 1, sort_by_x_pos: -1' means "top row, rightmost first".
+          Remaining ties keep scan order, and elements without a value always sort last.
+        - The magnitude of the primary key's value is the 1-based position to select in
+          that order: 'sort_by_width: -1' is the widest, 'sort_by_width: -2' the second widest.
+        - 'sort_by_anchor_distance' sorts by the edge-to-edge distance to the nearest of
+          the anchors (rects) resolved for the spec's relation operators.
+        - 'z_order_index: i', if given, replaces that position with a raw Python index into
+          the sorted list (or into scan order when there are no sort keys).
 
-    def _apply_selectors(self, candidates, selectors):
+        Each candidate's sort values are fetched once (through the cache) and decorated
+        into one composite key; a single position is selected with min()/heapq (O(n)
+        for the first, O(n log k) for the kth) instead of sorting the whole list.
+        """
         if not candidates: return []
-        
+        cache = cache or self.new_property_cache()
+
         # The 'sort_by_scan_order' is the most direct and efficient selector.
         # It uses the natural order of the filtered list.
         if 'sort_by_scan_order' in selectors:
@@ -430,49 +1923,96 @@ class ElementFinder:
             final_index = index - 1 if index > 0 else index
             try:
                 selected = candidates[final_index]
-                self.log('SUCCESS', f"Selected candidate by scan order: '{selected.window_text()}'")
+                self.log('SUCCESS', f"Selected candidate by scan order: '{cache.get(selected, 'pwa_title')}'")
                 return [selected]
             except IndexError:
                 self.log('ERROR', f"Index selection={final_index} is out of range for {len(candidates)} candidates.")
                 return []
 
-        # For other sorting keys, sort the list before selecting.
-        sorted_candidates = list(candidates)
-        for key in [k for k in selectors if k != 'z_order_index']:
-            index = selectors[key]
-            self.log('FILTER', f"Sorting by: '{key}' (Order: {'Descending' if index < 0 else 'Ascending'})")
-            sort_key_func = self._get_sort_key_function(key)
-            if sort_key_func:
-                sorted_candidates.sort(key=lambda e: (sort_key_func(e) is None, sort_key_func(e)), reverse=(index < 0))
-        
-        final_index = 0
+        sort_keys = []
+        primary_value = None
+        for key, value in selectors.items():
+            if key == 'z_order_index':
+                continue
+            sort_key_func = self._get_sort_key_function(key, cache, anchors)
+            if sort_key_func is None:
+                continue
+            if not isinstance(value, int) or isinstance(value, bool):
+                self.log('ERROR', f"Selector '{key}' needs an integer value, got {value!r}.")
+                return []
+            self.log('FILTER', f"Sorting by: '{key}' (Order: {'Descending' if value < 0 else 'Ascending'})")
+            sort_keys.append((sort_key_func, value < 0))
+            if primary_value is None:
+                primary_value = value
+
         if 'z_order_index' in selectors:
             final_index = selectors['z_order_index']
-        elif selectors:
-            last_selector_key = list(selectors.keys())[-1]
-            final_index = selectors[last_selector_key]
-            final_index = final_index - 1 if final_index > 0 else final_index
-        
-        self.log('FILTER', f"Selecting item at final index: {final_index}")
-        try:
-            selected = sorted_candidates[final_index]
-            self.log('SUCCESS', f"Selected candidate after sorting: '{selected.window_text()}'")
-            return [selected]
-        except IndexError:
-            self.log('ERROR', f"Index selection={final_index} is out of range for {len(sorted_candidates)} candidates.")
-            return []
+            if sort_keys:
+                decorated = sorted(self._decorate_candidates(candidates, sort_keys))
+                ordered = [candidates[d[-1]] for d in decorated]
+            else:
+                ordered = candidates
+            self.log('FILTER', f"Selecting item at final index: {final_index}")
+            try:
+                selected = ordered[final_index]
+            except IndexError:
+                self.log('ERROR', f"Index selection={final_index} is out of range for {len(ordered)} candidates.")
+                return []
+        else:
+            if not sort_keys:
+                return [candidates[0]]
+            position = max(abs(primary_value), 1)
+            self.log('FILTER', f"Selecting item at position: {position}")
+            if position > len(candidates):
+                self.log('ERROR', f"Position {position} is out of range for {len(candidates)} candidates.")
+                return []
+            decorated = self._decorate_candidates(candidates, sort_keys)
+            chosen = min(decorated) if position == 1 else heapq.nsmallest(position, decorated)[-1]
+            selected = candidates[chosen[-1]]
+        self.log('SUCCESS', f"Selected candidate after sorting: '{cache.get(selected, 'pwa_title')}'")
+        return [selected]
+
+    @staticmethod
+    def _decorate_candidates(candidates, sort_keys):
+        """
+        Builds one composite key per candidate: a (missing, value) pair per sort key,
+        inverted for descending keys, then the scan position as the final tie-breaker.
+        """
+        decorated = []
+        for position, elem in enumerate(candidates):
+            composite = []
+            for sort_key_func, descending in sort_keys:
+                value = sort_key_func(elem)
+                if value is None:
+                    composite.append((True, 0))
+                elif not descending:
+                    composite.append((False, value))
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    composite.append((False, -value))
+                else:
+                    composite.append((False, _Descending(value)))
+            composite.append(position)
+            decorated.append(tuple(composite))
+        return decorated
 
-    def _get_sort_key_function(self, key):
+    def _get_sort_key_function(self, key, cache=None, anchors=None):
+        get_value = cache.get if cache else get_property_value
+        if key == 'sort_by_anchor_distance':
+            def anchor_distance(elem):
+                rect = spatial_index.as_rect(get_value(elem, 'geo_bounding_rect_tuple'))
+                if rect is None or not anchors: return None
+                return min(spatial_index.rect_distance(rect, a) for a in anchors)
+            return anchor_distance
         if key == 'sort_by_creation_time':
-            return lambda e: get_property_value(e, 'proc_create_time') or datetime.min.strftime('%Y-%m-%d %H:%M:%S')
+            return lambda e: get_value(e, 'proc_create_time')
         if key == 'sort_by_title_length':
-            return lambda e: len(get_property_value(e, 'pwa_title') or '')
+            return lambda e: len(get_value(e, 'pwa_title') or '')
         if key == 'sort_by_child_count':
-            return lambda e: get_property_value(e, 'rel_child_count') or 0
+            return lambda e: get_value(e, 'rel_child_count')
         if key in ['sort_by_y_pos', 'sort_by_x_pos', 'sort_by_width', 'sort_by_height']:
             def get_rect_prop(elem, prop_key):
-                rect = get_property_value(elem, 'geo_bounding_rect_tuple')
-                if not rect: return 0
+                rect = get_value(elem, 'geo_bounding_rect_tuple')
+                if not rect: return None
                 if prop_key == 'sort_by_y_pos': return rect[1]
                 if prop_key == 'sort_by_x_pos': return rect[0]
                 if prop_key == 'sort_by_width': return rect[2] - rect[0]
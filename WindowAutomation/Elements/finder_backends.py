@@ -0,0 +1,452 @@
+# finder_backends.py
+# Backends used by core_logic.ElementFinder to walk and query a UI tree.
+# UIABackend talks to UI Automation; InMemoryBackend runs the same queries over a tree of
+# InMemoryElement objects, so push-down and pure-Python evaluation can be compared offline.
+# Both can also prefetch properties in bulk (UIA cache requests) for a whole result set or subtree.
+
+import logging
+
+# --- Required Libraries ---
+try:
+    import comtypes
+    from comtypes.gen import UIAutomationClient as UIA
+    from pywinauto import uia_defines
+    from pywinauto.uia_element_info import UIAElementInfo
+    from pywinauto.controls.uiawrapper import UIAWrapper
+except ImportError as e:
+    print(f"Error importing libraries: {e}")
+    print("Suggestion: pip install comtypes pywinauto")
+    exit()
+
+logger = logging.getLogger(__name__)
+
+# ======================================================================
+#                      BACKEND-NEUTRAL CONDITIONS
+# ======================================================================
+# A condition is a plain tuple so every backend can translate or evaluate it:
+#   ('property', key, value)   -> the spec property 'key' equals 'value'
+#   ('and', (cond, cond, ...)) -> all sub-conditions match
+#   ('or', (cond, cond, ...))  -> any sub-condition matches
+#   ('fuzzy', key, text, threshold) -> trigram similarity of 'key' to 'text' reaches threshold
+#                                      (only sent to backends listing the key in FUZZY_KEYS)
+
+def property_condition(key, value):
+    return ('property', key, value)
+
+def fuzzy_condition(key, text, threshold):
+    return ('fuzzy', key, text, threshold)
+
+def and_condition(*conditions):
+    return conditions[0] if len(conditions) == 1 else ('and', tuple(conditions))
+
+def or_condition(*conditions):
+    return conditions[0] if len(conditions) == 1 else ('or', tuple(conditions))
+
+# ======================================================================
+#                      BACKEND INTERFACE
+# ======================================================================
+
+class FinderBackend:
+    """
+    Interface between the ElementFinder and a UI tree.
+
+    PUSHDOWN_KEYS lists the spec keys whose equality can be evaluated by the backend
+    itself. A pushed-down key is 'exact' when the backend result is identical to the
+    Python evaluation; non-exact keys only narrow the pool and are re-checked in Python.
+    """
+    name = 'base'
+    PUSHDOWN_KEYS = frozenset()
+    INEXACT_PUSHDOWN_KEYS = frozenset()
+    FUZZY_KEYS = frozenset()  # Keys the backend can evaluate 'fuzzy' conditions on.
+
+    def iter_descendants(self, root):
+        """Yields the descendants of root in document (pre-)order."""
+        raise NotImplementedError
+
+    def iter_children(self, root):
+        """Yields the direct children of root in document order."""
+        return iter(root.children())
+
+    def find_all(self, root, condition):
+        """Returns the descendants of root matching condition, in document order."""
+        raise NotImplementedError
+
+    def find_first(self, root, condition):
+        """Returns the first descendant of root matching condition, or None."""
+        matches = self.find_all(root, condition)
+        return matches[0] if matches else None
+
+    def can_push_down(self, key, value):
+        return key in self.PUSHDOWN_KEYS
+
+    def is_exact(self, key):
+        return key not in self.INEXACT_PUSHDOWN_KEYS
+
+    # --- Bulk property prefetch ---
+    PREFETCH_KEYS = frozenset()
+
+    def prefetch(self, root, keys, condition=None):
+        """
+        Returns [(element, {key: value}), ...] for the descendants of root matching
+        condition (all descendants if None), with the requested keys fetched in bulk.
+        Keys the backend cannot serve (or cannot serve exactly for an element) are left
+        out of that element's dict and must be read normally.
+        """
+        raise NotImplementedError
+
+    def prefetch_subtree(self, root, keys, max_depth=None):
+        """
+        Returns the control-view subtree of root (root included) as PrefetchedNodes in
+        pre-order, with the requested keys fetched in bulk.
+        """
+        raise NotImplementedError
+
+class PrefetchedNode:
+    """One element of a prefetched subtree: the element, its cached values and its position."""
+    def __init__(self, element, values, level, parent=None):
+        self.element = element
+        self.values = values
+        self.level = level
+        self.parent = parent
+
+# ======================================================================
+#                      UI AUTOMATION BACKEND
+# ======================================================================
+
+_NOT_CACHED = object()
+_CONTROL_TYPE_NAMES = {v: k for k, v in uia_defines.IUIA().known_control_types.items()}
+
+def _rect_tuple(rect):
+    return (rect.left, rect.top, rect.right, rect.bottom)
+
+def _rect_center(rect):
+    # Same rounding as pywinauto's RECT.mid_point().
+    return (rect.left + int(float(rect.right - rect.left) / 2.), rect.top + int(float(rect.bottom - rect.top) / 2.))
+
+class UIABackend(FinderBackend):
+    """Runs searches through UI Automation (raw view walker, FindAll/FindFirst)."""
+    name = 'uia'
+    # Only keys whose live provider reads the very UIA property the condition tests, so a
+    # pushed-down search and a Python-evaluated one of the same spec always agree.
+    PUSHDOWN_KEYS = frozenset({'pwa_auto_id', 'pwa_control_type', 'pwa_class_name', 'pwa_title'})
+    # window_text() returns the TextPattern text (not the Name) for text controls, so a
+    # Name condition alone could drop real matches; see _translate().
+    INEXACT_PUSHDOWN_KEYS = frozenset({'pwa_title'})
+
+    _PROPERTY_IDS = {
+        'pwa_auto_id': UIA.UIA_AutomationIdPropertyId,
+        'pwa_control_type': UIA.UIA_ControlTypePropertyId,
+        'pwa_class_name': UIA.UIA_ClassNamePropertyId,
+        'pwa_title': UIA.UIA_NamePropertyId,
+    }
+
+    # Spec key -> (UIA property ids to cache, reader of the cached value). A reader may
+    # return _NOT_CACHED when the cached value would not match the live property.
+    _PREFETCH = {
+        'pwa_title': ((UIA.UIA_NamePropertyId, UIA.UIA_ClassNamePropertyId, UIA.UIA_IsTextPatternAvailablePropertyId),
+                      lambda c: _NOT_CACHED if (c.CachedIsTextPatternAvailable and c.CachedClassName) else c.CachedName),
+        'pwa_auto_id': ((UIA.UIA_AutomationIdPropertyId,), lambda c: c.CachedAutomationId),
+        'pwa_class_name': ((UIA.UIA_ClassNamePropertyId,), lambda c: c.CachedClassName),
+        'pwa_framework_id': ((UIA.UIA_FrameworkIdPropertyId,), lambda c: c.CachedFrameworkId),
+        'pwa_control_type': ((UIA.UIA_ControlTypePropertyId,), lambda c: _CONTROL_TYPE_NAMES.get(c.CachedControlType, _NOT_CACHED)),
+        'win32_handle': ((UIA.UIA_NativeWindowHandlePropertyId,), lambda c: c.CachedNativeWindowHandle or None),
+        'state_is_enabled': ((UIA.UIA_IsEnabledPropertyId,), lambda c: bool(c.CachedIsEnabled)),
+        'state_is_offscreen': ((UIA.UIA_IsOffscreenPropertyId,), lambda c: bool(c.CachedIsOffscreen)),
+        'state_is_focusable': ((UIA.UIA_IsKeyboardFocusablePropertyId,), lambda c: bool(c.CachedIsKeyboardFocusable)),
+        'state_is_password': ((UIA.UIA_IsPasswordPropertyId,), lambda c: bool(c.CachedIsPassword)),
+        'state_is_content_element': ((UIA.UIA_IsContentElementPropertyId,), lambda c: bool(c.CachedIsContentElement)),
+        'state_is_control_element': ((UIA.UIA_IsControlElementPropertyId,), lambda c: bool(c.CachedIsControlElement)),
+        'geo_bounding_rect_tuple': ((UIA.UIA_BoundingRectanglePropertyId,), lambda c: _rect_tuple(c.CachedBoundingRectangle)),
+        'geo_center_point': ((UIA.UIA_BoundingRectanglePropertyId,), lambda c: _rect_center(c.CachedBoundingRectangle)),
+        'proc_pid': ((UIA.UIA_ProcessIdPropertyId,), lambda c: c.CachedProcessId),
+    }
+    PREFETCH_KEYS = frozenset(_PREFETCH)
+
+    def __init__(self, uia_instance):
+        self.uia = uia_instance
+        self._control_type_ids = uia_defines.IUIA().known_control_types
+
+    @staticmethod
+    def _com(element):
+        return getattr(getattr(element, 'element_info', None), 'element', None)
+
+    @staticmethod
+    def wrap(com_element):
+        return UIAWrapper(UIAElementInfo(com_element))
+
+    def can_push_down(self, key, value):
+        if key not in self.PUSHDOWN_KEYS:
+            return False
+        if key == 'pwa_control_type':
+            return value in self._control_type_ids
+        return True
+
+    def iter_descendants(self, root):
+        com_root = self._com(root)
+        if com_root is None:
+            yield from root.descendants()
+            return
+        walker = self.uia.RawViewWalker
+        parents = []
+        try:
+            node = walker.GetFirstChildElement(com_root)
+            while node:
+                yield self.wrap(node)
+                first_child = walker.GetFirstChildElement(node)
+                if first_child:
+                    parents.append(node)
+                    node = first_child
+                    continue
+                while node:
+                    sibling = walker.GetNextSiblingElement(node)
+                    if sibling:
+                        node = sibling
+                        break
+                    node = parents.pop() if parents else None
+        except comtypes.COMError as e:
+            logger.debug(f"Tree walk interrupted: {e}")
+
+    def iter_children(self, root):
+        com_root = self._com(root)
+        if com_root is None:
+            yield from root.children()
+            return
+        walker = self.uia.RawViewWalker
+        try:
+            node = walker.GetFirstChildElement(com_root)
+            while node:
+                yield self.wrap(node)
+                node = walker.GetNextSiblingElement(node)
+        except comtypes.COMError as e:
+            logger.debug(f"Child walk interrupted: {e}")
+
+    def _translate(self, condition):
+        kind = condition[0]
+        if kind == 'property':
+            _, key, value = condition
+            if key == 'pwa_control_type':
+                value = self._control_type_ids[value]
+            native = self.uia.CreatePropertyCondition(self._PROPERTY_IDS[key], value)
+            if key == 'pwa_title':
+                text_controls = self.uia.CreatePropertyCondition(UIA.UIA_IsTextPatternAvailablePropertyId, True)
+                native = self.uia.CreateOrCondition(native, text_controls)
+            return native
+        parts = [self._translate(c) for c in condition[1]]
+        combine = self.uia.CreateAndCondition if kind == 'and' else self.uia.CreateOrCondition
+        native = parts[0]
+        for part in parts[1:]:
+            native = combine(native, part)
+        return native
+
+    def find_all(self, root, condition):
+        com_root = self._com(root)
+        found = com_root.FindAll(UIA.TreeScope_Descendants, self._translate(condition))
+        if not found:
+            return []
+        return [self.wrap(found.GetElement(i)) for i in range(found.Length)]
+
+    def find_first(self, root, condition):
+        com_root = self._com(root)
+        found = com_root.FindFirst(UIA.TreeScope_Descendants, self._translate(condition))
+        return self.wrap(found) if found else None
+
+    def _cache_request(self, keys, tree_filter, tree_scope):
+        request = self.uia.CreateCacheRequest()
+        property_ids = set()
+        for key in keys:
+            property_ids.update(self._PREFETCH[key][0])
+        for property_id in property_ids:
+            request.AddProperty(property_id)
+        request.TreeFilter = tree_filter
+        request.TreeScope = tree_scope
+        return request
+
+    def _read_cached(self, com_element, keys):
+        values = {}
+        for key in keys:
+            try:
+                value = self._PREFETCH[key][1](com_element)
+            except (comtypes.COMError, AttributeError):
+                continue
+            if value is not _NOT_CACHED:
+                values[key] = value
+        return values
+
+    def prefetch(self, root, keys, condition=None):
+        keys = [k for k in keys if k in self.PREFETCH_KEYS]
+        request = self._cache_request(keys, self.uia.RawViewCondition, UIA.TreeScope_Element)
+        native_condition = self._translate(condition) if condition else self.uia.CreateTrueCondition()
+        found = self._com(root).FindAllBuildCache(UIA.TreeScope_Descendants, native_condition, request)
+        if not found:
+            return []
+        results = []
+        for i in range(found.Length):
+            com_element = found.GetElement(i)
+            results.append((self.wrap(com_element), self._read_cached(com_element, keys)))
+        return results
+
+    def prefetch_subtree(self, root, keys, max_depth=None):
+        keys = [k for k in keys if k in self.PREFETCH_KEYS]
+        request = self._cache_request(keys, self.uia.ControlViewCondition, UIA.TreeScope_Subtree)
+        cached_root = self._com(root).BuildUpdatedCache(request)
+        nodes = []
+        stack = [(cached_root, 0, None)]
+        while stack:
+            com_element, level, parent = stack.pop()
+            node = PrefetchedNode(self.wrap(com_element), self._read_cached(com_element, keys), level, parent)
+            nodes.append(node)
+            if max_depth is not None and level >= max_depth:
+                continue
+            try:
+                children = com_element.GetCachedChildren()
+            except comtypes.COMError:
+                children = None
+            if children:
+                for i in reversed(range(children.Length)):
+                    stack.append((children.GetElement(i), level + 1, node))
+        return nodes
+
+# ======================================================================
+#                      IN-MEMORY BACKEND (FAKE TREE)
+# ======================================================================
+
+class _InMemoryRect:
+    def __init__(self, left, top, right, bottom):
+        self.left, self.top, self.right, self.bottom = left, top, right, bottom
+
+    def width(self): return self.right - self.left
+    def height(self): return self.bottom - self.top
+
+    def mid_point(self):
+        class _Point: pass
+        point = _Point()
+        point.x, point.y = (self.left + self.right) // 2, (self.top + self.bottom) // 2
+        return point
+
+class InMemoryElement:
+    """
+    A fake UI element holding its properties in a dict keyed by spec keys
+    (e.g. {'pwa_title': 'OK', 'pwa_control_type': 'Button'}). It answers the same
+    wrapper calls core_logic.get_property_value makes on pywinauto elements and
+    counts them in InMemoryElement.call_count.
+    """
+    call_count = 0
+    # Values returned when a property is missing, matching what pywinauto returns.
+    DEFAULTS = {'pwa_title': '', 'pwa_auto_id': '', 'pwa_class_name': '', 'pwa_framework_id': '',
+                'state_is_enabled': True, 'state_is_visible': True, 'proc_pid': 0,
+                'geo_bounding_rect_tuple': (0, 0, 0, 0)}
+
+    def __init__(self, properties=None, children=None):
+        self.properties = dict(properties or {})
+        self.handle = self.properties.get('win32_handle', 0)
+        self.element_info = None
+        self._parent = None
+        self._children = []
+        for child in children or []:
+            self.add_child(child)
+
+    def add_child(self, child):
+        child._parent = self
+        self._children.append(child)
+        return child
+
+    def peek(self, key):
+        """Returns a property value without counting it as a call."""
+        return self.properties.get(key, self.DEFAULTS.get(key))
+
+    def _read(self, key):
+        InMemoryElement.call_count += 1
+        return self.peek(key)
+
+    def window_text(self): return self._read('pwa_title')
+    def automation_id(self): return self._read('pwa_auto_id')
+    def control_type(self): return self._read('pwa_control_type')
+    def class_name(self): return self._read('pwa_class_name')
+    def framework_id(self): return self._read('pwa_framework_id')
+    def is_enabled(self): return self._read('state_is_enabled')
+    def is_visible(self): return self._read('state_is_visible')
+    def process_id(self): return self._read('proc_pid')
+
+    def rectangle(self):
+        return _InMemoryRect(*self._read('geo_bounding_rect_tuple'))
+
+    def parent(self):
+        InMemoryElement.call_count += 1
+        return self._parent
+
+    def children(self):
+        InMemoryElement.call_count += 1
+        return list(self._children)
+
+    def descendants(self):
+        InMemoryElement.call_count += 1
+        return list(self._iter_subtree())
+
+    def _iter_subtree(self):
+        for child in self._children:
+            yield child
+            yield from child._iter_subtree()
+
+    def __repr__(self):
+        return f"InMemoryElement({self.properties.get('pwa_control_type')!r}, {self.properties.get('pwa_title')!r})"
+
+class InMemoryBackend(FinderBackend):
+    """
+    Evaluates searches over an InMemoryElement tree. All push-downs are exact, and a
+    prefetch counts as a single call in InMemoryElement.call_count (one round trip).
+    """
+    name = 'memory'
+    PUSHDOWN_KEYS = UIABackend.PUSHDOWN_KEYS
+    PREFETCH_KEYS = frozenset(InMemoryElement.DEFAULTS) | {'pwa_control_type', 'rel_child_count'}
+
+    def __init__(self):
+        self.walks = 0         # Walks started by iter_descendants() / iter_children().
+        self.nodes_walked = 0  # Elements they yielded (each one a cross-process step on UIA).
+
+    def _counted_walk(self, nodes):
+        self.walks += 1
+        for node in nodes:
+            self.nodes_walked += 1
+            yield node
+
+    def iter_descendants(self, root):
+        return self._counted_walk(root._iter_subtree())
+
+    def iter_children(self, root):
+        return self._counted_walk(iter(root._children))
+
+    def _matches(self, element, condition):
+        kind = condition[0]
+        if kind == 'property':
+            _, key, value = condition
+            return element.peek(key) == value
+        if kind == 'and':
+            return all(self._matches(element, c) for c in condition[1])
+        return any(self._matches(element, c) for c in condition[1])
+
+    def find_all(self, root, condition):
+        return [e for e in root._iter_subtree() if self._matches(e, condition)]
+
+    def _values(self, element, keys):
+        values = {key: element.peek(key) for key in keys if key in self.PREFETCH_KEYS}
+        if 'rel_child_count' in values:
+            values['rel_child_count'] = len(element._children)
+        return values
+
+    def prefetch(self, root, keys, condition=None):
+        InMemoryElement.call_count += 1
+        elements = self.find_all(root, condition) if condition else root._iter_subtree()
+        return [(e, self._values(e, keys)) for e in elements]
+
+    def prefetch_subtree(self, root, keys, max_depth=None):
+        InMemoryElement.call_count += 1
+        nodes = []
+        stack = [(root, 0, None)]
+        while stack:
+            element, level, parent = stack.pop()
+            node = PrefetchedNode(element, self._values(element, keys), level, parent)
+            nodes.append(node)
+            if max_depth is None or level < max_depth:
+                for child in reversed(element._children):
+                    stack.append((child, level + 1, node))
+        return nodes
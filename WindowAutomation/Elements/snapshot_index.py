@@ -0,0 +1,209 @@
+# snapshot_index.py
+# An in-memory index over the rows of a scanned window (the property dicts returned by
+# FullScanner.get_all_elements_from_window), so specs can be evaluated again and again
+# without touching the live UI. Equality criteria on the indexed keys resolve through hash
+# indexes (intersected per spec) and 'fuzzy' criteria through trigram indexes built on first
+# use; every other criteria is checked on the snapshot rows.
+
+from collections import defaultdict
+
+# --- Shared Logic Import ---
+try:
+    from . import core_logic
+    from . import finder_backends
+    from . import text_index
+except ImportError:
+    import core_logic
+    import finder_backends
+    import text_index
+
+# ======================================================================
+#                      SNAPSHOT INDEX
+# ======================================================================
+
+INDEXED_KEYS = ('pwa_auto_id', 'pwa_title', 'pwa_control_type', 'pwa_class_name')
+
+class SnapshotIndex:
+    """
+    Hash indexes (value -> row positions) on INDEXED_KEYS plus the tree structure of a
+    list of scanned rows. The rows are expected in scan (pre-)order; the tree is rebuilt
+    from their 'rel_level' values, or from 'sys_parent_id' for rows without a level.
+
+    A scan starts with the window itself; when there is a single top-level row it is the
+    'root' and searches cover its descendants, exactly like a live search in the window.
+    find() runs an ElementFinder over the rows and returns matching rows; lookup() is
+    the plain equality shortcut.
+    """
+    def __init__(self, rows, indexed_keys=INDEXED_KEYS):
+        self.rows = list(rows)
+        self._index = {key: defaultdict(list) for key in indexed_keys}
+        self._trigram_indexes = {}  # key -> TrigramIndex over row positions, built on first use
+        self._positions = {id(row): position for position, row in enumerate(self.rows)}
+        self._children = defaultdict(list)  # parent position (None = top level) -> positions
+        by_unique_id = {row.get('sys_unique_id'): position for position, row in enumerate(self.rows)}
+        open_ancestors = []
+        for position, row in enumerate(self.rows):
+            for key, index in self._index.items():
+                value = core_logic.row_value(row, key)
+                if value is None:
+                    continue
+                try:
+                    index[value].append(position)
+                except TypeError:
+                    pass
+            level = row.get('rel_level')
+            if level is None:
+                parent = by_unique_id.get(row.get('sys_parent_id'))
+            else:
+                while open_ancestors and self.rows[open_ancestors[-1]]['rel_level'] >= level:
+                    open_ancestors.pop()
+                parent = open_ancestors[-1] if open_ancestors else None
+                open_ancestors.append(position)
+            self._children[parent].append(position)
+        top_level = self._children.get(None, ())
+        self.root = self.rows[top_level[0]] if len(top_level) == 1 else self
+        self._number_tree(top_level)
+        self.backend = SnapshotBackend(self)
+
+    def _number_tree(self, top_level):
+        """
+        Numbers the rows in tree pre-order: _rank[p] is the row's number and _end[p] the
+        number after its last descendant, so a subtree is one slice of _order.
+        """
+        self._order, self._rank, self._end = [], {}, {}
+        for top in top_level:
+            self._rank[top] = len(self._order)
+            self._order.append(top)
+            stack = [(top, iter(self._children.get(top, ())))]
+            while stack:
+                position, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    self._end[position] = len(self._order)
+                    continue
+                self._rank[child] = len(self._order)
+                self._order.append(child)
+                stack.append((child, iter(self._children.get(child, ()))))
+
+    def in_subtree(self, position, row):
+        """True if the row at 'position' is a descendant of 'row' (or row is the snapshot)."""
+        if row is self:
+            return True
+        root = self._positions.get(id(row))
+        rank = self._rank.get(position)
+        return root in self._rank and rank is not None and self._rank[root] < rank < self._end[root]
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def indexed_keys(self):
+        return tuple(self._index)
+
+    # --- Index lookups ---
+    def positions(self, condition):
+        """The set of row positions matching a backend condition (see finder_backends)."""
+        kind = condition[0]
+        if kind == 'property':
+            _, key, value = condition
+            try:
+                return set(self._index[key].get(value, ()))
+            except TypeError:
+                return set()
+        if kind == 'fuzzy':
+            _, key, text, threshold = condition
+            return {position for _, position in self.trigram_index(key).search(text, threshold)}
+        sets = [self.positions(c) for c in condition[1]]
+        if kind == 'and':
+            sets.sort(key=len)
+            result = sets[0]
+            for other in sets[1:]:
+                if not result:
+                    break
+                result = result & other
+            return result
+        return set().union(*sets)
+
+    def trigram_index(self, key):
+        """The TrigramIndex (items are row positions) over one key, built on first use."""
+        index = self._trigram_indexes.get(key)
+        if index is None:
+            index = text_index.TrigramIndex((position, core_logic.row_value(row, key)) for position, row in enumerate(self.rows))
+            self._trigram_indexes[key] = index
+        return index
+
+    def lookup(self, spec):
+        """
+        The rows whose values equal every (key, value) of a plain equality spec, in scan
+        order. Indexed keys are intersected first; any other key is compared per row.
+        """
+        indexed = [finder_backends.property_condition(k, v) for k, v in spec.items() if k in self._index]
+        others = [(k, v) for k, v in spec.items() if k not in self._index]
+        if indexed:
+            candidates = sorted(self.positions(finder_backends.and_condition(*indexed)))
+        else:
+            candidates = range(len(self.rows))
+        return [self.rows[p] for p in candidates
+                if all(core_logic.row_value(self.rows[p], k) == v for k, v in others)]
+
+    # --- Tree structure ---
+    def children(self, row):
+        """The direct children of a row (the top-level rows for the snapshot itself)."""
+        parent = None if row is self else self._positions.get(id(row))
+        if row is not self and parent is None:
+            return []
+        return [self.rows[p] for p in self._children.get(parent, ())]
+
+    def subtree(self, row):
+        """The descendants of a row (every row for the snapshot itself), in scan order."""
+        if row is self:
+            return list(self.rows)
+        position = self._positions.get(id(row))
+        if position not in self._rank:
+            return []
+        return [self.rows[p] for p in self._order[self._rank[position] + 1:self._end[position]]]
+
+    # --- Finder ---
+    def finder(self, log_callback=None, **kwargs):
+        """An ElementFinder whose searches run over this snapshot (see find())."""
+        return core_logic.ElementFinder(None, None, log_callback=log_callback, backend=self.backend, **kwargs)
+
+    def find(self, spec, limit=None, log_callback=None):
+        """
+        Runs a spec (or path spec) below the snapshot's root and returns the matching
+        rows. Equality criteria on the indexed keys are pushed down to the hash indexes.
+        """
+        finder = self.finder(log_callback)
+        return finder.find(finder.scope(self.root), spec, limit=limit)
+
+class SnapshotBackend(finder_backends.FinderBackend):
+    """
+    Finder backend over a SnapshotIndex. The search root is the snapshot itself (all
+    rows) or one of its rows (its subtree). Pushed-down conditions are answered from the
+    hash and trigram indexes and are exact; rows carry their own values, so nothing is
+    prefetched.
+    """
+    name = 'snapshot'
+    PUSHDOWN_KEYS = frozenset(INDEXED_KEYS)
+    FUZZY_KEYS = frozenset(INDEXED_KEYS)
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def can_push_down(self, key, value):
+        return key in self.snapshot._index
+
+    def iter_descendants(self, root):
+        return iter(self.snapshot.subtree(root))
+
+    def iter_children(self, root):
+        return iter(self.snapshot.children(root))
+
+    def find_all(self, root, condition):
+        positions = [p for p in self.snapshot.positions(condition) if self.snapshot.in_subtree(p, root)]
+        return [self.snapshot.rows[p] for p in sorted(positions)]
+
+    def prefetch(self, root, keys, condition=None):
+        rows = self.find_all(root, condition) if condition else self.snapshot.subtree(root)
+        return [(row, {}) for row in rows]
@@ -0,0 +1,276 @@
+# spatial_index.py
+# A uniform-grid spatial index over element rectangles (Left, Top, Right, Bottom), plus the
+# plain geometry helpers shared by the index and the geometry operators in core_logic.
+# Used for point hit-testing (scanner drill-down), region queries, nearest-element lookups and
+# the anchor relations (right_of, below, near, inside...) of the ElementFinder.
+
+import heapq
+import math
+
+# ======================================================================
+#                      GEOMETRY HELPERS
+# ======================================================================
+
+def as_rect(value):
+    """Normalizes a (l, t, r, b) rect or an (x, y) point to a rect tuple, or None."""
+    if value is None:
+        return None
+    try:
+        if len(value) == 4:
+            return tuple(value)
+        if len(value) == 2:
+            x, y = value
+            return (x, y, x, y)
+    except TypeError:
+        pass
+    return None
+
+def rect_contains_point(rect, x, y):
+    return rect[0] <= x <= rect[2] and rect[1] <= y <= rect[3]
+
+def rect_contains(outer, inner):
+    """True if 'inner' lies completely inside 'outer' (edges included)."""
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+def rect_intersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def rect_center(rect):
+    return ((rect[0] + rect[2]) / 2.0, (rect[1] + rect[3]) / 2.0)
+
+def point_rect_distance(x, y, rect):
+    """Distance from a point to the nearest edge of a rect (0 if the point is inside)."""
+    dx = max(rect[0] - x, 0, x - rect[2])
+    dy = max(rect[1] - y, 0, y - rect[3])
+    return math.hypot(dx, dy)
+
+def rect_area(rect):
+    return max(rect[2] - rect[0], 0) * max(rect[3] - rect[1], 0)
+
+def rect_distance(a, b):
+    """Edge-to-edge distance between two rects (0 if they touch or overlap)."""
+    dx = max(b[0] - a[2], 0, a[0] - b[2])
+    dy = max(b[1] - a[3], 0, a[1] - b[3])
+    return math.hypot(dx, dy)
+
+# ======================================================================
+#                      ANCHOR RELATIONS
+# ======================================================================
+
+RELATIONS = ('right_of', 'left_of', 'below', 'above', 'near', 'inside')
+EDGE_TOLERANCE = 4   # Pixels a rect may overlap its anchor and still count as beside it.
+NEAR_DISTANCE = 50   # Default reach of 'near' when no distance is given.
+
+def relation_gap(relation, rect, anchor):
+    """
+    The gap between rect and anchor if rect stands in the relation to the anchor, else None.
+    'right_of'/'left_of' need the rects to share a row (vertical overlap), 'below'/'above'
+    a column; 'inside' means completely inside the anchor (gap 0); 'near' always holds
+    and the gap is the edge-to-edge distance.
+    """
+    same_row = rect[1] < anchor[3] and rect[3] > anchor[1]
+    same_column = rect[0] < anchor[2] and rect[2] > anchor[0]
+    if relation == 'right_of':
+        return max(rect[0] - anchor[2], 0) if same_row and rect[0] >= anchor[2] - EDGE_TOLERANCE else None
+    if relation == 'left_of':
+        return max(anchor[0] - rect[2], 0) if same_row and rect[2] <= anchor[0] + EDGE_TOLERANCE else None
+    if relation == 'below':
+        return max(rect[1] - anchor[3], 0) if same_column and rect[1] >= anchor[3] - EDGE_TOLERANCE else None
+    if relation == 'above':
+        return max(anchor[1] - rect[3], 0) if same_column and rect[3] <= anchor[1] + EDGE_TOLERANCE else None
+    if relation == 'inside':
+        return 0 if rect_contains(anchor, rect) else None
+    if relation == 'near':
+        return rect_distance(rect, anchor)
+    return None
+
+def relation_holds(relation, rect, anchor, max_distance=None):
+    """True if rect stands in the relation to anchor, within max_distance when given."""
+    gap = relation_gap(relation, rect, anchor)
+    if gap is None:
+        return False
+    if max_distance is None and relation == 'near':
+        max_distance = NEAR_DISTANCE
+    return max_distance is None or gap <= max_distance
+
+# ======================================================================
+#                      UNIFORM GRID INDEX
+# ======================================================================
+
+class SpatialIndex:
+    """
+    Uniform grid over (item, rect) pairs. Each rect is registered in every cell it
+    overlaps; rects covering more than LARGE_ITEM_CELLS cells (e.g. a window-sized pane)
+    go to a short list that is checked directly instead. Query results keep insertion
+    order (scan order for a scanned tree) unless stated otherwise.
+    """
+    LARGE_ITEM_CELLS = 64
+
+    def __init__(self, items=(), cell_size=None):
+        items = [(item, as_rect(rect)) for item, rect in items]
+        items = [(item, rect) for item, rect in items if rect is not None]
+        self.cell_size = cell_size or self._pick_cell_size([rect for _, rect in items])
+        self._items = []
+        self._rects = []
+        self._cells = {}
+        self._large = []
+        self.extent = None
+        for item, rect in items:
+            self.insert(item, rect)
+
+    @staticmethod
+    def _pick_cell_size(rects):
+        """About twice the median element size, so a typical element touches 1-4 cells."""
+        if not rects:
+            return 64
+        sizes = sorted(max(r[2] - r[0], r[3] - r[1]) for r in rects)
+        return max(16, int(sizes[len(sizes) // 2] * 2))
+
+    @classmethod
+    def from_rows(cls, rows, rect_key='geo_bounding_rect_tuple', cell_size=None):
+        """Builds an index over scanned property dicts; the rows themselves are the items."""
+        return cls(((row, row.get(rect_key)) for row in rows), cell_size)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return (int(rect[0] // size), int(rect[1] // size), int(rect[2] // size), int(rect[3] // size))
+
+    def insert(self, item, rect):
+        rect = as_rect(rect)
+        if rect is None:
+            return
+        index = len(self._items)
+        self._items.append(item)
+        self._rects.append(rect)
+        if self.extent is None:
+            self.extent = rect
+        else:
+            e = self.extent
+            self.extent = (min(e[0], rect[0]), min(e[1], rect[1]), max(e[2], rect[2]), max(e[3], rect[3]))
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > self.LARGE_ITEM_CELLS:
+            self._large.append(index)
+            return
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self._cells.setdefault((cx, cy), []).append(index)
+
+    def _candidates(self, rect):
+        """Indexes of items that may overlap rect, in insertion order."""
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        found = set(self._large)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                found.update(self._cells.get((cx, cy), ()))
+        return sorted(found)
+
+    def _select(self, rect, test):
+        return [self._items[i] for i in self._candidates(rect) if test(self._rects[i])]
+
+    # --- Queries ---
+    def at_point(self, x, y, innermost_first=False):
+        """Items whose rect contains the point. innermost_first sorts by area (smallest first)."""
+        indexes = [i for i in self._candidates((x, y, x, y)) if rect_contains_point(self._rects[i], x, y)]
+        if innermost_first:
+            indexes.sort(key=lambda i: rect_area(self._rects[i]))
+        return [self._items[i] for i in indexes]
+
+    def containing(self, rect):
+        """Items whose rect completely contains the given rect."""
+        rect = as_rect(rect)
+        return self._select(rect, lambda r: rect_contains(r, rect))
+
+    def within(self, rect):
+        """Items whose rect lies completely inside the given rect."""
+        rect = as_rect(rect)
+        return self._select(rect, lambda r: rect_contains(rect, r))
+
+    def intersecting(self, rect):
+        """Items whose rect overlaps the given rect (touching edges count)."""
+        rect = as_rect(rect)
+        return self._select(rect, lambda r: rect_intersects(r, rect))
+
+    def related(self, relation, anchor, max_distance=None):
+        """
+        Items standing in one of the RELATIONS to the anchor rect (see relation_holds).
+        Only the cells of the strip or area the relation can reach are searched.
+        """
+        anchor = as_rect(anchor)
+        if anchor is None or self.extent is None:
+            return []
+        reach = max_distance
+        if reach is None and relation == 'near':
+            reach = NEAR_DISTANCE
+        tol = EDGE_TOLERANCE
+        e = self.extent
+        if relation == 'right_of':
+            region = (anchor[2] - tol, anchor[1], e[2] if reach is None else anchor[2] + reach, anchor[3])
+        elif relation == 'left_of':
+            region = (e[0] if reach is None else anchor[0] - reach, anchor[1], anchor[0] + tol, anchor[3])
+        elif relation == 'below':
+            region = (anchor[0], anchor[3] - tol, anchor[2], e[3] if reach is None else anchor[3] + reach)
+        elif relation == 'above':
+            region = (anchor[0], e[1] if reach is None else anchor[1] - reach, anchor[2], anchor[1] + tol)
+        elif relation == 'near':
+            region = (anchor[0] - reach, anchor[1] - reach, anchor[2] + reach, anchor[3] + reach)
+        elif relation == 'inside':
+            region = anchor
+        else:
+            return []
+        return self._select(region, lambda r: relation_holds(relation, r, anchor, max_distance))
+
+    def nearest(self, x, y, k=1, max_distance=None):
+        """
+        The k items closest to the point (distance to the rect's edge, 0 if inside), as
+        (distance, item) pairs sorted by distance, ties in insertion order. Searches ring
+        after ring of cells around the point and stops once no closer item can exist.
+        """
+        if not self._items or k <= 0:
+            return []
+        size = self.cell_size
+        best = []  # max-heap of (-distance, -index)
+        seen = set()
+
+        def consider(i):
+            if i in seen:
+                return
+            seen.add(i)
+            distance = point_rect_distance(x, y, self._rects[i])
+            if max_distance is not None and distance > max_distance:
+                return
+            entry = (-distance, -i)
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+        for i in self._large:
+            consider(i)
+        px, py = int(x // size), int(y // size)
+        if self._cells:
+            xs = [c[0] for c in self._cells]
+            ys = [c[1] for c in self._cells]
+            max_ring = max(abs(px - min(xs)), abs(px - max(xs)), abs(py - min(ys)), abs(py - max(ys)))
+        else:
+            max_ring = -1
+        ring = 0
+        while ring <= max_ring:
+            for cx in range(px - ring, px + ring + 1):
+                for cy in (py - ring, py + ring) if ring else (py,):
+                    for i in self._cells.get((cx, cy), ()):
+                        consider(i)
+            for cy in range(py - ring + 1, py + ring):
+                for cx in (px - ring, px + ring) if ring else ():
+                    for i in self._cells.get((cx, cy), ()):
+                        consider(i)
+            # Anything in ring+1 or beyond is at least ring * cell_size away.
+            reach = ring * size
+            if len(best) == k and -best[0][0] <= reach:
+                break
+            if max_distance is not None and reach > max_distance:
+                break
+            ring += 1
+        return [(-d, self._items[-i]) for d, i in sorted(best, reverse=True)]
@@ -0,0 +1,66 @@
+# conftest.py
+# Shared setup of the Elements unit tests. The modules are imported flat (like the tools
+# do when run from this folder), and the tests only use the pure-Python parts: the
+# in-memory and snapshot backends, the indexes, the caches and the simulated event source.
+# The modules still import pywin32/comtypes/pywinauto at load time (and exit() without
+# them), so the tests are skipped where those are not installed. The element() factory and
+# the login window fixture are shared by the finder, index and controller tests.
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ELEMENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ELEMENTS_DIR not in sys.path:
+    sys.path.insert(0, ELEMENTS_DIR)
+
+REQUIRED_MODULES = ('psutil', 'win32gui', 'win32process', 'win32con', 'comtypes', 'pywinauto')
+CONTROLLER_MODULES = ('win32api', 'pyperclip', 'pynput', 'tkinter')
+
+def _missing(names):
+    return [name for name in names if importlib.util.find_spec(name) is None]
+
+collect_ignore_glob = []
+if _missing(REQUIRED_MODULES):
+    collect_ignore_glob.append('test_*.py')
+elif _missing(CONTROLLER_MODULES):
+    collect_ignore_glob.append('test_controller.py')
+
+# ======================================================================
+#                      SHARED FIXTURES
+# ======================================================================
+
+@pytest.fixture
+def element_class():
+    """The class element() builds; test modules override it (test_controller needs RuntimeIds)."""
+    from finder_backends import InMemoryElement
+    return InMemoryElement
+
+@pytest.fixture
+def element(element_class):
+    """A factory for in-memory element trees: element(control_type, title, rect, children, **properties)."""
+    def make(control_type, title='', rect=(0, 0, 0, 0), children=(), **properties):
+        properties.update({'pwa_control_type': control_type, 'pwa_title': title, 'geo_bounding_rect_tuple': rect})
+        return element_class(properties, list(children))
+    return make
+
+@pytest.fixture
+def window(element):
+    """A window with a login panel (two labelled edits, OK/Cancel), a search panel and a status bar."""
+    return element('Window', 'Main', (0, 0, 800, 600), children=[
+        element('Pane', '', (0, 0, 400, 300), pwa_auto_id='loginPanel', children=[
+            element('Text', 'User', (10, 10, 60, 30)),
+            element('Edit', '', (70, 10, 200, 30), pwa_auto_id='user'),
+            element('Text', 'Password', (10, 40, 60, 60)),
+            element('Edit', '', (70, 40, 200, 60), pwa_auto_id='pass'),
+            element('Button', 'OK', (70, 80, 130, 100), pwa_auto_id='ok'),
+            element('Button', 'Cancel', (140, 80, 200, 100), pwa_auto_id='cancel'),
+        ]),
+        element('Pane', '', (400, 0, 800, 300), pwa_auto_id='searchPanel', children=[
+            element('Edit', '', (410, 10, 700, 30), pwa_auto_id='query'),
+            element('Button', 'Search', (710, 10, 790, 30), pwa_auto_id='search'),
+        ]),
+        element('StatusBar', 'Ready', (0, 580, 800, 600)),
+    ])
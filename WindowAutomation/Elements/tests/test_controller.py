@@ -0,0 +1,330 @@
+# test_controller.py
+# UIController resolution over an in-memory desktop: Deadline/BackoffPolicy, the
+# ResolutionCache and the window/element caches (reuse and revalidation), and the
+# event-driven waits with a SimulatedEventSource.
+
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import comtypes.client
+import pytest
+
+import core_controller
+import core_logic
+import ui_events
+from core_controller import BackoffPolicy, Deadline, ResolutionCache
+from finder_backends import InMemoryBackend, InMemoryElement
+
+# ======================================================================
+#                      FIXTURES
+# ======================================================================
+
+class LiveElement(InMemoryElement):
+    """An InMemoryElement with a UIA RuntimeId, so the element cache can confirm it."""
+    def GetRuntimeId(self):
+        return (42, id(self))
+
+@pytest.fixture
+def element_class():
+    return LiveElement
+
+class FakeDesktop:
+    def __init__(self, windows):
+        self._windows = windows
+        self.scans = 0
+
+    def windows(self):
+        self.scans += 1
+        return list(self._windows)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def login(element):
+    return element('Window', 'Login', win32_handle=101, children=[
+        element('Edit', '', pwa_auto_id='user'),
+        element('Edit', '', pwa_auto_id='pass'),
+        element('Button', 'OK', pwa_auto_id='ok'),
+    ])
+
+@pytest.fixture
+def main_window(element):
+    return element('Window', 'Main', win32_handle=102, children=[element('Button', 'Close', pwa_auto_id='close')])
+
+@pytest.fixture
+def open_handles(monkeypatch):
+    handles = {101, 102}
+    monkeypatch.setattr(core_controller.win32gui, 'IsWindow', lambda handle: handle in handles)
+    return handles
+
+@pytest.fixture
+def make_controller(monkeypatch, login, main_window, open_handles):
+    monkeypatch.setattr(comtypes.client, 'CreateObject', lambda clsid: SimpleNamespace(ControlViewWalker=None))
+    monkeypatch.setattr(core_controller, 'Desktop', lambda backend: FakeDesktop([login, main_window]))
+    def make(**kwargs):
+        controller = core_controller.UIController(**kwargs)
+        controller.finder = core_logic.ElementFinder(None, None, backend=InMemoryBackend())
+        return controller
+    return make
+
+@pytest.fixture
+def controller(make_controller):
+    return make_controller()
+
+def find_window(controller, spec, timeout=0):
+    return controller._find_window(spec, Deadline(timeout), BackoffPolicy.fixed(0.01))
+
+def find_element(controller, window, spec, timeout=0):
+    return controller._find_element_in_window(window, spec, Deadline(timeout), BackoffPolicy.fixed(0.01))
+
+# ======================================================================
+#                      DEADLINE AND BACKOFF
+# ======================================================================
+
+def test_deadline_counts_down_on_its_clock():
+    clock = FakeClock()
+    deadline = Deadline(2.0, clock=clock)
+    assert deadline.remaining() == 2.0 and not deadline.expired()
+    clock.now += 1.5
+    assert deadline.remaining() == pytest.approx(0.5)
+    clock.now += 1.0
+    assert deadline.remaining() == 0.0 and deadline.expired()
+    assert Deadline(-1, clock=clock).expired()
+
+def test_backoff_grows_to_the_cap():
+    schedule = BackoffPolicy(initial=0.05, factor=2.0, max_delay=0.3, jitter=0).schedule(Deadline(60))
+    assert [schedule.next_delay() for _ in range(5)] == pytest.approx([0.05, 0.1, 0.2, 0.3, 0.3])
+    assert schedule.attempts == 5
+
+def test_backoff_never_waits_past_the_deadline():
+    clock = FakeClock()
+    schedule = BackoffPolicy(initial=1.0, jitter=0).schedule(Deadline(0.4, clock=clock))
+    assert schedule.next_delay() == pytest.approx(0.4)
+    clock.now += 1
+    assert schedule.next_delay() == 0.0
+
+def test_backoff_jitter_stays_in_bounds():
+    policy = BackoffPolicy(initial=1.0, factor=1.0, max_delay=10.0, jitter=0.2, rng=random.Random(1))
+    schedule = policy.schedule(Deadline(60))
+    delays = [schedule.next_delay() for _ in range(50)]
+    assert all(0.8 <= d <= 1.2 for d in delays)
+    assert len(set(delays)) > 1
+
+def test_fixed_policy_repeats_the_interval():
+    schedule = BackoffPolicy.fixed(0.5).schedule(Deadline(60))
+    assert [schedule.next_delay() for _ in range(3)] == [0.5, 0.5, 0.5]
+
+def test_default_policy_is_capped_at_the_default_retry_interval(make_controller):
+    assert make_controller().retry_policy.max_delay == core_controller.DEFAULT_CONTROLLER_CONFIG['default_retry_interval']
+    schedule = make_controller(default_retry_interval=0.15).retry_policy.schedule(Deadline(60))
+    assert max(schedule.next_delay() for _ in range(10)) <= 0.15
+    policy = BackoffPolicy.fixed(1.0)
+    assert make_controller(retry_policy=policy, default_retry_interval=0.15).retry_policy is policy
+
+def test_explicit_retry_interval_overrides_the_policy(controller):
+    assert controller._retry_policy(None) is controller.retry_policy
+    assert controller._retry_policy(0.2).schedule(Deadline(60)).next_delay() == 0.2
+
+# ======================================================================
+#                      RESOLUTION CACHE
+# ======================================================================
+
+def test_resolution_cache_counts_hits_misses_and_invalidations():
+    cache = ResolutionCache()
+    assert cache.lookup('a', lambda e: True) is None
+    cache.store('a', {'value': 1})
+    assert cache.lookup('a', lambda e: True) == {'value': 1}
+    assert cache.lookup('a', lambda e: False) is None
+    assert len(cache) == 0
+    assert cache.stats == {'hits': 1, 'misses': 2, 'invalidations': 1}
+
+def test_resolution_cache_drops_entries_whose_check_raises():
+    cache = ResolutionCache()
+    cache.store('a', {})
+    assert cache.lookup('a', lambda e: 1 / 0) is None
+    assert cache.stats['invalidations'] == 1
+
+def test_resolution_cache_is_lru_bounded():
+    cache = ResolutionCache(max_size=2)
+    cache.store('a', 1)
+    cache.store('b', 2)
+    cache.lookup('a', lambda e: True)
+    cache.store('c', 3)
+    assert cache.lookup('b', lambda e: True) is None
+    assert cache.lookup('a', lambda e: True) == 1
+
+def test_resolution_cache_invalidate_where():
+    cache = ResolutionCache()
+    for key in [(1, 'a'), (1, 'b'), (2, 'a')]:
+        cache.store(key, {})
+    assert cache.invalidate_where(lambda key, entry: key[0] == 1) == 2
+    assert len(cache) == 1
+
+# ======================================================================
+#                      WINDOW AND ELEMENT CACHES
+# ======================================================================
+
+def test_window_is_reused_without_scanning_the_desktop(controller, login):
+    assert find_window(controller, {'pwa_title': 'Login'}) is login
+    assert find_window(controller, {'pwa_title': 'Login'}) is login
+    assert controller.desktop.scans == 1
+    assert controller.cache_stats()['window']['hits'] == 1
+
+def test_window_cache_revalidates_filters(controller, login):
+    find_window(controller, {'pwa_title': 'Login'})
+    login.properties['pwa_title'] = 'Login - expired'
+    with pytest.raises(core_controller.WindowNotFoundError):
+        find_window(controller, {'pwa_title': 'Login'})
+    assert controller.cache_stats()['window']['invalidations'] == 1
+    assert controller.desktop.scans == 2
+
+def test_closed_window_is_dropped(controller, login, open_handles):
+    find_window(controller, {'pwa_title': 'Login'})
+    open_handles.discard(101)
+    find_window(controller, {'pwa_title': 'Login'})
+    assert controller.cache_stats()['window']['invalidations'] == 1
+    assert controller.desktop.scans == 2
+
+def test_specs_with_selectors_are_not_cached(controller, main_window):
+    spec = {'pwa_control_type': 'Window', 'sort_by_scan_order': -1}
+    assert find_window(controller, spec) is main_window
+    assert find_window(controller, spec) is main_window
+    assert controller.desktop.scans == 2
+    assert len(controller.window_cache) == 0
+
+def test_cache_can_be_disabled(make_controller):
+    controller = make_controller(resolution_cache=False)
+    find_window(controller, {'pwa_title': 'Login'})
+    find_window(controller, {'pwa_title': 'Login'})
+    assert controller.desktop.scans == 2
+
+def test_uniqueness_checks_do_not_answer_from_the_window_cache(controller, login, element):
+    find_window(controller, {'pwa_title': 'Login'})
+    controller.desktop._windows.append(element('Window', 'Login', win32_handle=103))
+    assert find_window(controller, {'pwa_title': 'Login'}) is login
+    with pytest.raises(core_controller.AmbiguousElementError):
+        controller._find_window({'pwa_title': 'Login'}, Deadline(0), BackoffPolicy.fixed(0.01), max_matches=2)
+    assert not controller.check_exists({'pwa_title': 'Login'}, timeout=0)
+    assert controller.get_next_state({'login': {'window_spec': {'pwa_title': 'Login'}}}, timeout=0.05) is None
+
+def test_uniqueness_checks_remember_the_window(controller, login):
+    assert controller.check_exists({'pwa_title': 'Login'}, timeout=0)
+    assert find_window(controller, {'pwa_title': 'Login'}) is login
+    assert controller.desktop.scans == 1
+
+def test_element_is_reused_and_revalidated(controller, login):
+    ok = login._children[2]
+    assert find_element(controller, login, {'pwa_title': 'OK'}) is ok
+    assert find_element(controller, login, {'pwa_title': 'OK'}) is ok
+    assert controller.cache_stats()['element']['hits'] == 1
+    ok.properties['pwa_title'] = 'Sign in'
+    with pytest.raises(core_controller.ElementNotFoundFromWindowError):
+        find_element(controller, login, {'pwa_title': 'OK'})
+    assert controller.cache_stats()['element']['invalidations'] == 1
+
+def test_identity_specs_are_confirmed_by_runtime_id(controller, login):
+    find_element(controller, login, {'pwa_auto_id': 'ok'})
+    InMemoryElement.call_count = 0
+    assert find_element(controller, login, {'pwa_auto_id': 'ok'}) is login._children[2]
+    assert InMemoryElement.call_count == 0
+
+def test_uniqueness_checks_do_not_answer_from_the_element_cache(controller, login, element):
+    ok = find_element(controller, login, {'pwa_auto_id': 'ok'})
+    login.add_child(element('Button', 'OK', pwa_auto_id='ok'))
+    assert find_element(controller, login, {'pwa_auto_id': 'ok'}) is ok
+    with pytest.raises(core_controller.AmbiguousElementError):
+        controller._find_element_in_window(login, {'pwa_auto_id': 'ok'}, Deadline(0), BackoffPolicy.fixed(0.01), max_matches=2)
+    assert not controller.check_exists({'pwa_title': 'Login'}, {'pwa_auto_id': 'ok'}, timeout=0)
+    cases = {'login': {'window_spec': {'pwa_title': 'Login'}, 'element_spec': {'pwa_auto_id': 'ok'}}}
+    assert controller.get_next_state(cases, timeout=0.05) is None
+
+def test_get_next_state_remembers_what_it_found(controller, login):
+    cases = {'login': {'window_spec': {'pwa_title': 'Login'}, 'element_spec': {'pwa_auto_id': 'ok'}}}
+    assert controller.get_next_state(cases, timeout=0.05) == 'login'
+    assert find_element(controller, login, {'pwa_auto_id': 'ok'}) is login._children[2]
+    assert controller.cache_stats()['element']['hits'] == 1
+
+def test_structure_change_drops_the_window_elements(controller, login, main_window):
+    find_element(controller, login, {'pwa_auto_id': 'ok'})
+    find_element(controller, main_window, {'pwa_auto_id': 'close'})
+    assert controller.notify_structure_changed(101) == 1
+    assert len(controller.element_cache) == 1
+    assert controller.notify_structure_changed() == 1
+    assert len(controller.element_cache) == 0
+
+def test_structure_change_drops_the_cached_patterns(controller):
+    core_logic.PATTERN_CACHE[(42, 1)] = (time.monotonic(), {1: None})
+    controller.notify_structure_changed(101)
+    assert len(core_logic.PATTERN_CACHE) == 0
+
+# ======================================================================
+#                      EVENT-DRIVEN WAITS
+# ======================================================================
+
+@pytest.fixture
+def events():
+    return ui_events.SimulatedEventSource()
+
+@pytest.fixture
+def event_controller(make_controller, events):
+    return make_controller(wait_mode='events', event_source=events, event_fallback_interval=5.0)
+
+def test_wait_wakes_up_on_an_event(event_controller, events, login, element):
+    def add_cancel():
+        login.add_child(element('Button', 'Cancel', pwa_auto_id='cancel'))
+        events.emit(ui_events.STRUCTURE_CHANGED, window=101)
+    start = time.monotonic()
+    threading.Timer(0.2, add_cancel).start()
+    found = find_element(event_controller, login, {'pwa_auto_id': 'cancel'}, timeout=4)
+    assert found.peek('pwa_title') == 'Cancel'
+    assert time.monotonic() - start < 2.0
+    assert events.subscriber_count == 0
+
+def test_irrelevant_property_changes_do_not_wake_the_wait(event_controller, events, login):
+    waiter = event_controller._waiter(login, [{'pwa_auto_id': 'cancel'}])
+    with waiter:
+        assert waiter.wait(0)
+        events.emit(ui_events.PROPERTY_CHANGED, 'state_is_enabled')
+        assert not waiter.wait(0.05)
+        events.emit(ui_events.PROPERTY_CHANGED, 'pwa_auto_id')
+        assert waiter.wait(0.05)
+
+def test_get_next_state_returns_the_case_that_appears(event_controller, events, element):
+    cases = {'login': {'window_spec': {'pwa_title': 'Login'}, 'element_spec': {'pwa_auto_id': 'cancel'}},
+             'error': {'window_spec': {'pwa_title': 'Error'}}}
+    def open_error():
+        event_controller.desktop._windows.append(element('Window', 'Error', win32_handle=103))
+        events.emit(ui_events.WINDOW_OPENED)
+    threading.Timer(0.2, open_error).start()
+    start = time.monotonic()
+    assert event_controller.get_next_state(cases, timeout=4) == 'error'
+    assert time.monotonic() - start < 2.0
+
+def test_desktop_level_waits_keep_the_retry_schedule(event_controller, login, element):
+    cases = {'login': {'window_spec': {'pwa_title': 'Login'}, 'element_spec': {'pwa_auto_id': 'cancel'}}}
+    threading.Timer(0.2, lambda: login.add_child(element('Button', 'Cancel', pwa_auto_id='cancel'))).start()
+    start = time.monotonic()
+    assert event_controller.get_next_state(cases, timeout=4, retry_interval=0.1) == 'login'
+    assert time.monotonic() - start < 1.0
+
+def test_structure_change_events_invalidate_the_window_elements(event_controller, events, login, main_window):
+    find_element(event_controller, login, {'pwa_auto_id': 'ok'})
+    find_element(event_controller, main_window, {'pwa_auto_id': 'close'})
+    with event_controller._waiter(login, [{'pwa_auto_id': 'ok'}]) as waiter:
+        waiter.wait(0)
+        events.emit(ui_events.STRUCTURE_CHANGED, window=101)
+        assert len(event_controller.element_cache) == 1
+        events.emit(ui_events.STRUCTURE_CHANGED)
+        assert len(event_controller.element_cache) == 1
+    assert event_controller.cache_stats()['element']['invalidations'] == 1
+
+def test_polling_mode_needs_no_event_source(controller):
+    assert controller.event_source is None
+    assert isinstance(controller._waiter(None, [{'pwa_title': 'Login'}]), ui_events.PollingWaiter)
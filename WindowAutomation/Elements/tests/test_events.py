@@ -0,0 +1,134 @@
+# test_events.py
+# ui_events: SimulatedEventSource delivery and the EventWaiter/PollingWaiter contracts.
+
+import threading
+import time
+
+import ui_events
+
+def test_simulated_source_delivers_to_every_subscriber():
+    source = ui_events.SimulatedEventSource()
+    received = []
+    first = source.subscribe(received.append)
+    source.subscribe(received.append)
+    event = source.emit(ui_events.STRUCTURE_CHANGED, window=7)
+    assert received == [event, event]
+    source.unsubscribe(first)
+    source.emit(ui_events.WINDOW_OPENED)
+    assert len(received) == 3
+    assert source.subscriber_count == 1
+
+def test_event_keys_are_normalized():
+    assert ui_events.UIEvent(ui_events.PROPERTY_CHANGED, 'pwa_title').keys == ('pwa_title',)
+    assert ui_events.UIEvent(ui_events.PROPERTY_CHANGED, None).keys == ()
+
+def test_first_wait_subscribes_and_returns_at_once():
+    source = ui_events.SimulatedEventSource()
+    with ui_events.EventWaiter(source) as waiter:
+        assert source.subscriber_count == 0
+        assert waiter.wait(5)
+        assert source.subscriber_count == 1
+    assert source.subscriber_count == 0
+
+def test_wait_times_out_without_events():
+    source = ui_events.SimulatedEventSource()
+    with ui_events.EventWaiter(source) as waiter:
+        waiter.wait(0)
+        start = time.monotonic()
+        assert not waiter.wait(0.1)
+        assert time.monotonic() - start >= 0.09
+
+def test_wait_returns_when_an_event_arrives():
+    source = ui_events.SimulatedEventSource()
+    with ui_events.EventWaiter(source) as waiter:
+        waiter.wait(0)
+        source.emit_later(0.05, ui_events.WINDOW_OPENED)
+        start = time.monotonic()
+        assert waiter.wait(5)
+        assert time.monotonic() - start < 1
+        assert waiter.events == 1
+
+def test_an_event_before_the_wait_is_not_lost():
+    source = ui_events.SimulatedEventSource()
+    with ui_events.EventWaiter(source) as waiter:
+        waiter.wait(0)
+        source.emit(ui_events.STRUCTURE_CHANGED)
+        assert waiter.wait(0)
+        assert not waiter.wait(0)
+
+def test_property_changes_only_count_for_watched_keys():
+    source = ui_events.SimulatedEventSource()
+    seen = []
+    with ui_events.EventWaiter(source, watch_keys={'pwa_title'}, on_event=seen.append) as waiter:
+        waiter.wait(0)
+        source.emit(ui_events.PROPERTY_CHANGED, 'state_is_enabled')
+        assert not waiter.wait(0)
+        source.emit(ui_events.PROPERTY_CHANGED, ['state_is_enabled', 'pwa_title'])
+        assert waiter.wait(0)
+    assert len(seen) == 2
+
+def test_failed_subscription_falls_back_to_polling():
+    class BrokenSource(ui_events.SimulatedEventSource):
+        def subscribe(self, callback, root=None, property_keys=None):
+            raise RuntimeError("no UIA")
+    with ui_events.EventWaiter(BrokenSource()) as waiter:
+        assert not waiter.wait(0.01)
+
+def test_property_event_ids_are_distinct():
+    ids = ui_events.property_event_ids(['state_is_offscreen', 'state_is_visible', 'pwa_title', 'proc_name'])
+    assert len(ids) == len(set(ids)) == 2
+
+def test_polling_waiter_sleeps():
+    start = time.monotonic()
+    with ui_events.PollingWaiter() as waiter:
+        assert not waiter.wait(0.05)
+    assert time.monotonic() - start >= 0.04
+
+class ComNode:
+    def __init__(self, handle=0, parent=None, gone=False):
+        self.handle, self.parent, self.gone = handle, parent, gone
+
+    @property
+    def CurrentNativeWindowHandle(self):
+        if self.gone:
+            raise ui_events.comtypes.COMError(-2147220991, 'Element not available', None)
+        return self.handle
+
+class Walker:
+    def GetParentElement(self, node):
+        return node.parent
+
+def test_top_level_handle_walks_up_to_a_native_handle(monkeypatch):
+    roots = {11: 10, 10: 10}
+    monkeypatch.setattr(ui_events.win32gui, 'GetAncestor', lambda handle, flag: roots.get(handle, 0))
+    uia = type('Uia', (), {'ControlViewWalker': Walker()})()
+    child_window = ComNode(11, ComNode(10))
+    assert ui_events.top_level_handle(uia, ComNode(0, ComNode(0, child_window))) == 10
+    assert ui_events.top_level_handle(uia, ComNode(0)) is None
+    assert ui_events.top_level_handle(uia, ComNode(gone=True)) is None
+
+def test_structure_changes_carry_the_window():
+    received = []
+    handler = ui_events._StructureChangedEventHandler(received.append, lambda sender: sender.handle)
+    handler.HandleStructureChangedEvent(ComNode(42), 0, None)
+    broken = ui_events._StructureChangedEventHandler(received.append, lambda sender: 1 / 0)
+    broken.HandleStructureChangedEvent(ComNode(42), 0, None)
+    assert [(e.kind, e.window) for e in received] == [(ui_events.STRUCTURE_CHANGED, 42), (ui_events.STRUCTURE_CHANGED, None)]
+
+def test_uia_waits_pump_com_messages(monkeypatch):
+    signal = threading.Event()
+    pumped = []
+    def pump(timeout):
+        pumped.append(timeout)
+        if len(pumped) == 3:
+            signal.set()  # A handler called from the message loop.
+    monkeypatch.setattr(ui_events.comtypes.client, 'PumpEvents', pump)
+    source = ui_events.UIAEventSource(None)
+    assert source.wait_for(signal, 10)
+    assert len(pumped) == 3 and max(pumped) <= source.PUMP_SLICE
+
+def test_uia_wait_times_out_while_pumping(monkeypatch):
+    monkeypatch.setattr(ui_events.comtypes.client, 'PumpEvents', time.sleep)
+    start = time.monotonic()
+    assert not ui_events.UIAEventSource(None).wait_for(threading.Event(), 0.12)
+    assert 0.1 <= time.monotonic() - start < 1
@@ -0,0 +1,313 @@
+# test_finder.py
+# ElementFinder over an InMemoryElement tree: plan caching and filter order, early stop,
+# push-down/prefetch against plain Python evaluation, selectors, relations, path specs
+# and find_many().
+
+import pytest
+
+import core_logic
+from finder_backends import InMemoryBackend, InMemoryElement
+
+# ======================================================================
+#                      FIXTURES
+# ======================================================================
+
+@pytest.fixture
+def finder():
+    return core_logic.ElementFinder(None, None, backend=InMemoryBackend())
+
+def ids(elements):
+    return [e.peek('pwa_auto_id') or e.peek('pwa_title') for e in elements]
+
+# ======================================================================
+#                      PLANS
+# ======================================================================
+
+def test_compile_spec_reuses_the_plan_of_an_equal_spec():
+    spec = {'pwa_control_type': 'Button', 'pwa_title': ('in', ['OK', 'Cancel'])}
+    plan = core_logic.compile_spec(spec)
+    assert core_logic.compile_spec(dict(spec)) is plan
+    assert core_logic.compile_spec({'pwa_control_type': 'Button', 'pwa_title': ('in', ['OK'])}) is not plan
+    assert core_logic.compile_spec(plan) is plan
+
+def test_plan_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(core_logic, 'SPEC_PLAN_CACHE_SIZE', 2)
+    core_logic.SPEC_PLAN_CACHE.clear()
+    first = core_logic.compile_spec({'pwa_title': 'a'})
+    core_logic.compile_spec({'pwa_title': 'b'})
+    core_logic.compile_spec({'pwa_title': 'c'})
+    assert len(core_logic.SPEC_PLAN_CACHE) == 2
+    assert core_logic.compile_spec({'pwa_title': 'a'}) is not first
+
+def test_plan_splits_filters_and_selectors():
+    plan = core_logic.CompiledSpec({'pwa_control_type': 'Button', 'sort_by_x_pos': 1})
+    assert plan.filter_spec == {'pwa_control_type': 'Button'}
+    assert plan.selectors == {'sort_by_x_pos': 1}
+
+def test_ordered_filters_put_cheap_filters_first():
+    plan = core_logic.CompiledSpec({'rel_child_count': ('>', 0), 'pwa_title': 'OK'})
+    assert [step.key for step in plan.ordered_filters()] == ['pwa_title', 'rel_child_count']
+
+def test_ordered_filters_learn_selectivity_within_a_cost_class():
+    plan = core_logic.CompiledSpec({'pwa_control_type': 'Button', 'pwa_auto_id': 'ok'})
+    assert [step.key for step in plan.ordered_filters()] == ['pwa_control_type', 'pwa_auto_id']
+    control_type, auto_id = plan.filters
+    control_type.record(100, 40)
+    auto_id.record(100, 1)
+    assert [step.key for step in plan.ordered_filters()] == ['pwa_auto_id', 'pwa_control_type']
+
+def test_find_records_filter_statistics(window):
+    finder = core_logic.ElementFinder(None, None)
+    spec = {'pwa_control_type': 'Edit', 'pwa_auto_id': 'pass'}
+    finder.find(lambda: window.descendants(), spec)
+    first = core_logic.compile_spec(spec).ordered_filters()[0]
+    assert first.evaluated == 11
+
+# ======================================================================
+#                      EARLY STOP
+# ======================================================================
+
+def counting_pool(elements, seen):
+    def pool():
+        for elem in elements:
+            seen.append(elem)
+            yield elem
+    return pool
+
+def test_limit_stops_the_walk_after_enough_matches(window):
+    finder = core_logic.ElementFinder(None, None)
+    seen = []
+    found = finder.find(counting_pool(window.descendants(), seen), {'pwa_control_type': 'Edit'}, limit=1)
+    assert ids(found) == ['user']
+    assert len(seen) == 3
+
+def test_scan_order_selector_stops_after_the_nth_match(window):
+    finder = core_logic.ElementFinder(None, None)
+    seen = []
+    found = finder.find(counting_pool(window.descendants(), seen), {'pwa_control_type': 'Edit', 'sort_by_scan_order': 2})
+    assert ids(found) == ['pass']
+    assert len(seen) == 5
+
+def test_other_selectors_see_every_candidate(window):
+    finder = core_logic.ElementFinder(None, None)
+    seen = []
+    found = finder.find(counting_pool(window.descendants(), seen), {'pwa_control_type': 'Edit', 'sort_by_width': -1}, limit=1)
+    assert ids(found) == ['query']
+    assert len(seen) == 11
+
+def test_stop_after():
+    assert core_logic.CompiledSpec({'pwa_title': 'OK'}).stop_after(2) == 2
+    assert core_logic.CompiledSpec({'pwa_title': 'OK'}).stop_after() is None
+    assert core_logic.CompiledSpec({'sort_by_scan_order': 3}).stop_after(1) == 3
+    assert core_logic.CompiledSpec({'sort_by_scan_order': -1}).stop_after(1) is None
+    assert core_logic.CompiledSpec({'sort_by_y_pos': 1}).stop_after(1) is None
+
+# ======================================================================
+#                      PUSH-DOWN VS PYTHON EVALUATION
+# ======================================================================
+
+EQUIVALENCE_SPECS = [
+    {'pwa_control_type': 'Edit'},
+    {'pwa_control_type': 'Button', 'pwa_title': 'Cancel'},
+    {'pwa_title': ('in', ['OK', 'Search', 'Missing'])},
+    {'pwa_title': ('equals', 'Password'), 'pwa_control_type': 'Text'},
+    {'pwa_auto_id': 'query', 'state_is_enabled': True},
+    {'pwa_control_type': 'Button', 'geo_bounding_rect_tuple': ('within', (0, 0, 400, 300))},
+    {'pwa_control_type': 'Edit', 'sort_by_y_pos': -1},
+    {'pwa_title': ('icontains', 'o'), 'sort_by_scan_order': 2},
+    {'pwa_control_type': 'Edit', 'geo_bounding_rect_tuple': ('right_of', {'pwa_title': 'Password'})},
+    {'pwa_title': ('fuzzy', 'Pasword', 0.5)},
+    {'pwa_control_type': 'CheckBox'},
+]
+
+@pytest.mark.parametrize('spec', EQUIVALENCE_SPECS)
+@pytest.mark.parametrize('limit', [None, 1, 2])
+def test_pushdown_and_prefetch_match_python_evaluation(window, spec, limit):
+    python = core_logic.ElementFinder(None, None).find(lambda: window.descendants(), spec, limit=limit)
+    for pushdown in (True, False):
+        for prefetch in (True, False):
+            finder = core_logic.ElementFinder(None, None, backend=InMemoryBackend(), pushdown=pushdown, prefetch=prefetch)
+            assert finder.find(finder.scope(window), spec, limit=limit) == python, (pushdown, prefetch)
+
+def test_pushdown_only_sends_equality_on_pushdown_keys():
+    backend = InMemoryBackend()
+    plan = core_logic.CompiledSpec({'pwa_control_type': 'Edit', 'pwa_title': ('contains', 'x'), 'state_is_enabled': True})
+    condition, residual = plan.split_pushdown(backend)
+    assert condition == ('property', 'pwa_control_type', 'Edit')
+    assert sorted(step.key for step in residual) == ['pwa_title', 'state_is_enabled']
+
+def test_prefetch_is_one_call_for_an_exhaustive_search(window, finder):
+    InMemoryElement.call_count = 0
+    found = finder.find(finder.scope(window), {'pwa_control_type': 'Edit', 'state_is_enabled': True})
+    assert ids(found) == ['user', 'pass', 'query']
+    assert InMemoryElement.call_count == 1
+
+def test_uniqueness_check_is_one_call_without_push_down(window):
+    backend = InMemoryBackend()
+    finder = core_logic.ElementFinder(None, None, backend=backend)
+    InMemoryElement.call_count = 0
+    assert ids(finder.find(finder.scope(window), {'pwa_title': ('icontains', 'search')}, limit=2)) == ['search']
+    assert backend.walks == 0
+    assert InMemoryElement.call_count == 1
+
+def test_first_match_searches_walk_lazily(window):
+    backend = InMemoryBackend()
+    finder = core_logic.ElementFinder(None, None, backend=backend)
+    assert ids(finder.find(finder.scope(window), {'pwa_title': ('icontains', 'user')}, limit=1)) == ['User']
+    assert ids(finder.find(finder.scope(window), {'pwa_title': ('icontains', 's'), 'sort_by_scan_order': 2}, limit=2)) == ['Password']
+    assert (backend.walks, backend.nodes_walked) == (2, 6)
+
+def test_matches_ignores_selectors(window, finder):
+    ok = window.descendants()[5]
+    assert finder.matches(ok, {'pwa_control_type': 'Button', 'pwa_title': 'OK', 'sort_by_x_pos': -1})
+    assert not finder.matches(ok, {'pwa_title': 'Cancel'})
+
+# ======================================================================
+#                      SELECTORS
+# ======================================================================
+
+def test_sort_value_sign_sets_the_direction(window, finder):
+    edits = {'pwa_control_type': 'Edit'}
+    assert ids(finder.find(finder.scope(window), {**edits, 'sort_by_x_pos': 1})) == ['user']
+    assert ids(finder.find(finder.scope(window), {**edits, 'sort_by_x_pos': -1})) == ['query']
+
+def test_sort_value_magnitude_is_the_position(window, finder):
+    buttons = {'pwa_control_type': 'Button'}
+    assert ids(finder.find(finder.scope(window), {**buttons, 'sort_by_x_pos': 2})) == ['cancel']
+    assert ids(finder.find(finder.scope(window), {**buttons, 'sort_by_x_pos': -2})) == ['cancel']
+    assert finder.find(finder.scope(window), {**buttons, 'sort_by_x_pos': 4}) == []
+
+def test_later_sort_keys_break_ties(window, finder):
+    spec = {'pwa_control_type': 'Edit', 'sort_by_y_pos': 1, 'sort_by_x_pos': -1}
+    assert ids(finder.find(finder.scope(window), spec)) == ['query']
+    spec = {'pwa_control_type': 'Edit', 'sort_by_y_pos': 1, 'sort_by_x_pos': 1}
+    assert ids(finder.find(finder.scope(window), spec)) == ['user']
+
+def test_remaining_ties_keep_scan_order(window, finder):
+    spec = {'pwa_control_type': 'Button', 'sort_by_height': 1}
+    assert ids(finder.find(finder.scope(window), spec)) == ['ok']
+
+def test_scan_order_and_z_order_index(window, finder):
+    edits = {'pwa_control_type': 'Edit'}
+    assert ids(finder.find(finder.scope(window), {**edits, 'sort_by_scan_order': -1})) == ['query']
+    assert finder.find(finder.scope(window), {**edits, 'sort_by_scan_order': 4}) == []
+    assert ids(finder.find(finder.scope(window), {**edits, 'z_order_index': 1})) == ['pass']
+    assert ids(finder.find(finder.scope(window), {**edits, 'sort_by_width': -1, 'z_order_index': -1})) == ['pass']
+
+def test_missing_values_sort_last_in_both_directions():
+    rows = [{'pwa_title': 'no rect'}, {'pwa_title': 'low', 'geo_bounding_rect_tuple': (0, 50, 10, 60)},
+            {'pwa_title': 'high', 'geo_bounding_rect_tuple': (0, 10, 10, 20)}]
+    finder = core_logic.ElementFinder(None, None)
+    assert finder.find(lambda: rows, {'sort_by_y_pos': 1}) == [rows[2]]
+    assert finder.find(lambda: rows, {'sort_by_y_pos': -1}) == [rows[1]]
+    assert finder.find(lambda: rows, {'sort_by_y_pos': -3}) == [rows[0]]
+
+def test_selector_with_a_non_integer_value_matches_nothing(window, finder):
+    assert finder.find(finder.scope(window), {'pwa_control_type': 'Edit', 'sort_by_x_pos': 'left'}) == []
+
+# ======================================================================
+#                      RELATIONS
+# ======================================================================
+
+@pytest.mark.parametrize('relation, anchor, expected', [
+    ('right_of', {'pwa_title': 'Password'}, ['pass', 'searchPanel']),
+    ('left_of', {'pwa_auto_id': 'pass'}, ['Password']),
+    ('below', {'pwa_auto_id': 'user'}, ['pass', 'ok', 'cancel', 'Ready']),
+    ('above', {'pwa_auto_id': 'ok'}, ['user', 'pass']),
+    ('inside', {'pwa_auto_id': 'searchPanel'}, ['query', 'search']),
+    ('near', ({'pwa_auto_id': 'query'}, 10), ['loginPanel', 'searchPanel', 'search']),
+    ('near', ({'pwa_auto_id': 'query'}, 5), ['searchPanel']),
+])
+def test_relation_operators(window, finder, relation, anchor, expected):
+    found = finder.find(finder.scope(window), {'geo_bounding_rect_tuple': (relation, anchor)})
+    assert ids(found) == expected
+
+def test_relation_combines_with_other_filters(window, finder):
+    spec = {'pwa_control_type': 'Button', 'geo_bounding_rect_tuple': ('below', ({'pwa_auto_id': 'user'}, 60))}
+    assert ids(finder.find(finder.scope(window), spec)) == ['ok', 'cancel']
+    spec = {'pwa_control_type': 'Button', 'geo_bounding_rect_tuple': ('below', ({'pwa_auto_id': 'user'}, 10))}
+    assert finder.find(finder.scope(window), spec) == []
+
+def test_anchor_distance_selector(window, finder):
+    spec = {'pwa_control_type': 'Button', 'geo_bounding_rect_tuple': ('near', ({'pwa_auto_id': 'pass'}, 100)),
+            'sort_by_anchor_distance': 1}
+    assert ids(finder.find(finder.scope(window), spec)) == ['ok']
+
+def test_relation_without_an_anchor_matches_nothing(window, finder):
+    assert finder.find(finder.scope(window), {'geo_bounding_rect_tuple': ('right_of', {'pwa_title': 'Nope'})}) == []
+
+def test_spatial_predicates():
+    assert core_logic.compile_criteria(('contains_point', (5, 5)))((0, 0, 10, 10))
+    assert not core_logic.compile_criteria(('within', (0, 0, 10, 10)))((5, 5, 15, 15))
+    assert core_logic.compile_criteria(('intersects', (0, 0, 10, 10)))((5, 5, 15, 15))
+    assert not core_logic.compile_criteria(('intersects', (0, 0, 10, 10)))(None)
+
+# ======================================================================
+#                      PATH SPECS
+# ======================================================================
+
+def test_path_descendant_then_child(window, finder):
+    path = [{'pwa_auto_id': 'loginPanel'}, ('child', {'pwa_control_type': 'Edit'})]
+    assert ids(finder.find(finder.scope(window), path)) == ['user', 'pass']
+
+def test_path_child_axis_reads_one_level(window, finder):
+    assert finder.find(finder.scope(window), [('child', {'pwa_control_type': 'Edit'})]) == []
+    assert ids(finder.find(finder.scope(window), [('child', {'pwa_control_type': 'StatusBar'})])) == ['Ready']
+
+def test_path_selectors_pick_per_parent(window, finder):
+    path = [{'pwa_control_type': 'Pane'}, {'pwa_control_type': 'Edit', 'sort_by_scan_order': 1}]
+    assert ids(finder.find(finder.scope(window), path)) == ['user', 'query']
+
+def test_path_limit_and_plain_pools(window, finder):
+    path = [{'pwa_control_type': 'Pane'}, {'pwa_control_type': 'Button'}]
+    assert ids(finder.find(finder.scope(window), path, limit=1)) == ['ok']
+    assert ids(finder.find(lambda: window.descendants(), path)) == ['ok', 'cancel', 'search']
+
+def test_path_matches_python_evaluation_without_backend(window):
+    path = [{'pwa_auto_id': 'searchPanel'}, ('descendant', {'pwa_title': ('fuzzy', 'serch', 0.5)})]
+    with_backend = core_logic.ElementFinder(None, None, backend=InMemoryBackend())
+    without = core_logic.ElementFinder(None, None)
+    assert with_backend.find(with_backend.scope(window), path) == without.find(lambda: window.descendants(), path)
+
+def test_malformed_path():
+    with pytest.raises(ValueError):
+        core_logic.compile_path([])
+    with pytest.raises(ValueError):
+        core_logic.compile_path([('sibling', {'pwa_title': 'OK'})])
+    assert core_logic.ElementFinder(None, None).find(lambda: [], [('sibling', {})]) == []
+
+# ======================================================================
+#                      FIND MANY
+# ======================================================================
+
+FIND_MANY_SPECS = {
+    'user': {'pwa_auto_id': 'user'},
+    'buttons': {'pwa_control_type': 'Button'},
+    'rightmost': {'pwa_control_type': 'Edit', 'sort_by_x_pos': -1},
+    'missing': {'pwa_title': 'Nope'},
+    'path': [{'pwa_auto_id': 'searchPanel'}, ('child', {'pwa_control_type': 'Button'})],
+}
+
+@pytest.mark.parametrize('limit', [None, 2])
+def test_find_many_matches_find_per_spec(window, finder, limit):
+    found = finder.find_many(finder.scope(window), FIND_MANY_SPECS, limit=limit)
+    assert list(found) == list(FIND_MANY_SPECS)
+    for name, spec in FIND_MANY_SPECS.items():
+        assert found[name] == finder.find(finder.scope(window), spec, limit=limit), name
+
+def test_find_many_walks_the_tree_once(window):
+    specs = {name: spec for name, spec in FIND_MANY_SPECS.items() if name != 'path'}
+    backend = InMemoryBackend()
+    finder = core_logic.ElementFinder(None, None, backend=backend, pushdown=False, prefetch=False)
+    for spec in specs.values():
+        finder.find(finder.scope(window), spec)
+    assert (backend.walks, backend.nodes_walked) == (4, 44)
+    backend.walks = backend.nodes_walked = 0
+    finder.find_many(finder.scope(window), specs)
+    assert (backend.walks, backend.nodes_walked) == (1, 11)
+
+def test_find_many_resolves_path_specs_on_their_own(window):
+    backend = InMemoryBackend()
+    finder = core_logic.ElementFinder(None, None, backend=backend, pushdown=False, prefetch=False)
+    finder.find_many(finder.scope(window), FIND_MANY_SPECS)
+    assert backend.walks > 1
@@ -0,0 +1,183 @@
+# test_indexes.py
+# SnapshotIndex lookups and searches over scanned rows, fuzzy matching through the
+# TrigramIndex, and the SpatialIndex queries, each checked against a brute-force answer.
+
+import random
+
+import pytest
+
+import core_logic
+import spatial_index
+import text_index
+from snapshot_index import SnapshotIndex
+
+# ======================================================================
+#                      FIXTURES
+# ======================================================================
+
+def scan_rows(root):
+    """The rows a scan of root would produce: its properties plus rel_level, in pre-order."""
+    rows = []
+    stack = [(root, 0)]
+    while stack:
+        elem, level = stack.pop()
+        rows.append({**elem.properties, 'rel_level': level})
+        stack.extend((child, level + 1) for child in reversed(elem._children))
+    return rows
+
+@pytest.fixture
+def rows(window):
+    return scan_rows(window)
+
+@pytest.fixture
+def snapshot(rows):
+    return SnapshotIndex(rows)
+
+def titles(rows):
+    return [row.get('pwa_auto_id') or row.get('pwa_title') for row in rows]
+
+# ======================================================================
+#                      SNAPSHOT INDEX
+# ======================================================================
+
+def test_tree_is_rebuilt_from_levels(snapshot, rows):
+    assert snapshot.root is rows[0]
+    assert titles(snapshot.children(rows[0])) == ['loginPanel', 'searchPanel', 'Ready']
+    assert titles(snapshot.subtree(rows[8])) == ['query', 'search']
+    assert snapshot.children(rows[2]) == []
+
+def test_tree_is_rebuilt_from_parent_ids():
+    rows = [{'sys_unique_id': 1, 'pwa_title': 'Main'},
+            {'sys_unique_id': 2, 'sys_parent_id': 1, 'pwa_title': 'Panel'},
+            {'sys_unique_id': 3, 'sys_parent_id': 2, 'pwa_title': 'OK'},
+            {'sys_unique_id': 4, 'sys_parent_id': 1, 'pwa_title': 'Status'}]
+    snapshot = SnapshotIndex(rows)
+    assert snapshot.root is rows[0]
+    assert titles(snapshot.subtree(rows[1])) == ['OK']
+    assert titles(snapshot.children(rows[0])) == ['Panel', 'Status']
+
+def test_lookup_intersects_indexes_and_checks_other_keys(snapshot):
+    assert titles(snapshot.lookup({'pwa_control_type': 'Edit'})) == ['user', 'pass', 'query']
+    assert titles(snapshot.lookup({'pwa_control_type': 'Button', 'pwa_title': 'OK'})) == ['ok']
+    assert titles(snapshot.lookup({'pwa_control_type': 'Edit', 'geo_bounding_rect_tuple': (70, 40, 200, 60)})) == ['pass']
+    assert snapshot.lookup({'pwa_control_type': 'Edit', 'pwa_title': 'OK'}) == []
+
+def test_lookup_without_indexed_keys_scans_the_rows(snapshot):
+    assert titles(snapshot.lookup({'rel_level': 1})) == ['loginPanel', 'searchPanel', 'Ready']
+
+SNAPSHOT_SPECS = [
+    {'pwa_control_type': 'Edit'},
+    {'pwa_control_type': 'Button', 'pwa_title': ('in', ['OK', 'Search'])},
+    {'pwa_control_type': 'Edit', 'sort_by_x_pos': -1},
+    {'pwa_title': ('fuzzy', 'Pasword', 0.6)},
+    {'pwa_title': ('icontains', 'c')},
+    {'pwa_control_type': 'Edit', 'geo_bounding_rect_tuple': ('below', {'pwa_auto_id': 'user'})},
+]
+
+@pytest.mark.parametrize('spec', SNAPSHOT_SPECS)
+def test_snapshot_find_matches_a_plain_row_search(snapshot, rows, spec):
+    assert snapshot.find(spec) == core_logic.ElementFinder(None, None).find(lambda: rows[1:], spec)
+
+def test_snapshot_find_path(snapshot):
+    path = [{'pwa_auto_id': 'loginPanel'}, ('child', {'pwa_control_type': 'Button'})]
+    assert titles(snapshot.find(path)) == ['ok', 'cancel']
+
+def test_snapshot_find_below_a_row(snapshot, rows):
+    finder = snapshot.finder()
+    assert titles(finder.find(finder.scope(rows[8]), {'pwa_control_type': 'Edit'})) == ['query']
+
+# ======================================================================
+#                      FUZZY MATCHING
+# ======================================================================
+
+def test_similarity_ignores_case_and_spacing():
+    assert text_index.similarity('Teamcenter  Login', 'teamcenter login') == 1.0
+    assert text_index.similarity('Login', None) == 0.0
+    assert 0.0 < text_index.similarity('Teamcenter Login', 'Teamcenter Login 13.1') < 1.0
+
+def test_trigram_search_matches_brute_force():
+    rng = random.Random(7)
+    words = ['Login', 'Logout', 'Password', 'Passwort', 'User ID', 'Search', 'Settings', 'Cancel', 'OK']
+    texts = [' '.join(rng.sample(words, rng.randint(1, 3))) for _ in range(300)]
+    index = text_index.TrigramIndex(enumerate(texts))
+    for query in ('Login', 'Pasword', 'Search Settings', 'Cancle OK'):
+        for threshold in (0.3, 0.6, 0.9):
+            expected = sorted(i for i, text in enumerate(texts) if text_index.similarity(query, text) >= threshold)
+            assert sorted(i for _, i in index.search(query, threshold)) == expected, (query, threshold)
+
+@pytest.mark.parametrize('threshold', [0, -1])
+def test_trigram_search_without_threshold_returns_every_text(threshold):
+    index = text_index.TrigramIndex(enumerate(['Login', '', 'xyz', None]))
+    assert sorted(i for _, i in index.search('Password', threshold)) == [0, 1, 2]
+
+@pytest.mark.parametrize('threshold', [0, -0.5, 0.4, 1, 1.5, 2.0, 3])
+def test_snapshot_fuzzy_matches_python_for_any_threshold(threshold):
+    rows = [{'pwa_title': 'Main', 'rel_level': 0}, {'pwa_title': 'Password', 'rel_level': 1},
+            {'pwa_title': '', 'rel_level': 1}, {'pwa_title': 'xyz', 'rel_level': 1}, {'rel_level': 1}]
+    spec = {'pwa_title': ('fuzzy', 'Pasword', threshold)}
+    assert SnapshotIndex(rows).find(spec) == core_logic.ElementFinder(None, None).find(lambda: rows[1:], spec)
+
+def test_trigram_search_is_best_first():
+    index = text_index.TrigramIndex(enumerate(['Password', 'Passwort', 'Pass']))
+    scores = [score for score, _ in index.search('Password', 0.3)]
+    assert scores == sorted(scores, reverse=True)
+    assert index.search('Password', 0.3)[0] == (1.0, 0)
+
+def test_fuzzy_predicate_matches_similarity():
+    predicate = core_logic.compile_criteria(('fuzzy', 'Teamcenter Login', 0.7))
+    assert predicate('Teamcenter Login 13.1')
+    assert not predicate('Settings')
+    assert not predicate(None)
+
+def test_fuzzy_threshold_above_one_matches_nothing():
+    assert text_index.size_bounds(5, 2) == (float('inf'), 0)
+    for threshold in (1.5, 2, 3):
+        assert not core_logic.compile_criteria(('fuzzy', 'Login', threshold))('Login')
+    assert core_logic.compile_criteria(('fuzzy', 'Login', 1))('login')
+    assert not core_logic.compile_criteria(('fuzzy', 'Login', 1))('Logins')
+
+def test_fuzzy_default_threshold():
+    assert core_logic.fuzzy_target(('fuzzy', 'Login')) == ('Login', core_logic.FUZZY_DEFAULT_THRESHOLD)
+    assert core_logic.fuzzy_target(('fuzzy', 'Login', 'high')) == ('Login', core_logic.FUZZY_DEFAULT_THRESHOLD)
+    assert core_logic.fuzzy_target(('equals', 'Login')) is None
+
+# ======================================================================
+#                      SPATIAL INDEX
+# ======================================================================
+
+def random_rects(count, seed=3):
+    rng = random.Random(seed)
+    rects = []
+    for _ in range(count):
+        left, top = rng.randint(0, 1900), rng.randint(0, 1000)
+        rects.append((left, top, left + rng.randint(1, 300), top + rng.randint(1, 80)))
+    rects.append((0, 0, 1920, 1080))  # A window-sized item, kept in the large list.
+    return rects
+
+def test_spatial_queries_match_brute_force():
+    rects = random_rects(400)
+    index = spatial_index.SpatialIndex(enumerate(rects))
+    region = (300, 200, 900, 600)
+    assert index.within(region) == [i for i, r in enumerate(rects) if spatial_index.rect_contains(region, r)]
+    assert index.intersecting(region) == [i for i, r in enumerate(rects) if spatial_index.rect_intersects(r, region)]
+    assert index.containing((500, 500, 510, 510)) == [i for i, r in enumerate(rects) if spatial_index.rect_contains(r, (500, 500, 510, 510))]
+    assert index.at_point(640, 360) == [i for i, r in enumerate(rects) if spatial_index.rect_contains_point(r, 640, 360)]
+
+@pytest.mark.parametrize('relation', spatial_index.RELATIONS)
+@pytest.mark.parametrize('max_distance', [None, 40])
+def test_related_matches_relation_holds(relation, max_distance):
+    rects = random_rects(400)
+    index = spatial_index.SpatialIndex(enumerate(rects))
+    anchor = (800, 400, 900, 430)
+    expected = [i for i, r in enumerate(rects) if spatial_index.relation_holds(relation, r, anchor, max_distance)]
+    assert index.related(relation, anchor, max_distance) == expected
+
+def test_nearest_matches_brute_force():
+    rects = random_rects(400)[:-1]
+    index = spatial_index.SpatialIndex(enumerate(rects))
+    distances = sorted((spatial_index.point_rect_distance(1000, 500, r), i) for i, r in enumerate(rects))
+    assert index.nearest(1000, 500, k=5) == [(d, i) for d, i in distances[:5]]
+
+def test_at_point_innermost_first():
+    index = spatial_index.SpatialIndex([('window', (0, 0, 800, 600)), ('button', (10, 10, 50, 30)), ('pane', (0, 0, 400, 300))])
+    assert index.at_point(20, 20, innermost_first=True) == ['button', 'pane', 'window']
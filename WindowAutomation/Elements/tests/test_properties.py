@@ -0,0 +1,127 @@
+# test_properties.py
+# Property reads that keep or reuse state: the rel_level depth cache, the pattern cache
+# and the values get_all_properties() takes from a primed PropertyCache.
+
+import pytest
+
+import core_logic
+from finder_backends import InMemoryElement
+
+class ComNode:
+    """A UIA COM element stand-in: a RuntimeId and a parent."""
+    def __init__(self, runtime_id, parent=None):
+        self.runtime_id = runtime_id
+        self.parent = parent
+
+    def GetRuntimeId(self):
+        return [42, self.runtime_id]
+
+class CountingWalker:
+    def __init__(self):
+        self.hops = 0
+
+    def GetParentElement(self, node):
+        self.hops += 1
+        return node.parent
+
+class Uia:
+    def __init__(self, root):
+        self.root = root
+
+    def GetRootElement(self):
+        return self.root
+
+@pytest.fixture
+def tree():
+    core_logic.clear_depth_cache()
+    desktop = ComNode(0)
+    window = ComNode(1, desktop)
+    pane = ComNode(2, window)
+    return desktop, window, pane, ComNode(3, pane), ComNode(4, pane)
+
+def rel_level(node, uia, walker):
+    return core_logic.get_property_value(node, 'rel_level', uia, walker)
+
+def test_depth_is_walked_once_then_cached(tree):
+    desktop, window, pane, edit, button = tree
+    uia, walker = Uia(desktop), CountingWalker()
+    assert rel_level(edit, uia, walker) == 3
+    assert walker.hops == 3
+    assert rel_level(button, uia, walker) == 3
+    assert walker.hops == 4
+
+def test_cached_depths_expire(tree, monkeypatch):
+    desktop, window, pane, edit, button = tree
+    uia, walker = Uia(desktop), CountingWalker()
+    rel_level(edit, uia, walker)
+    monkeypatch.setattr(core_logic, 'DEPTH_CACHE_TTL', 0)
+    pane.parent = desktop  # Re-parented: a stale entry would still say depth 2.
+    assert rel_level(button, uia, walker) == 2
+    assert walker.hops == 5
+
+def test_recorded_depths_are_used(tree):
+    desktop, window, pane, edit, button = tree
+    uia, walker = Uia(desktop), CountingWalker()
+    core_logic.record_element_depth(pane, 2, walker)
+    assert rel_level(edit, uia, walker) == 3
+    assert walker.hops == 1
+
+def test_prefetched_empty_titles_are_not_read_again(element):
+    unnamed = element('Pane')
+    cache = core_logic.PropertyCache()
+    cache.prime(unnamed, {'pwa_title': '', 'pwa_class_name': ''})
+    InMemoryElement.call_count = 0
+    properties = core_logic.get_all_properties(unnamed, cache=cache, fields=['pwa_title', 'pwa_class_name'])
+    assert 'pwa_title' not in properties and 'pwa_class_name' not in properties
+    assert InMemoryElement.call_count == 0
+
+def test_titles_left_out_of_the_prefetch_are_read_live(element):
+    label = element('Text', '', pwa_class_name='Static')
+    label.window_text = lambda: 'Read from the text pattern'
+    cache = core_logic.PropertyCache()
+    cache.prime(label, {'pwa_class_name': 'Static'})
+    properties = core_logic.get_all_properties(label, cache=cache, fields=['pwa_title', 'pwa_class_name'])
+    assert properties['pwa_title'] == 'Read from the text pattern'
+
+class PatternNode(ComNode):
+    """A UIA COM element stand-in that supports some control patterns."""
+    def __init__(self, runtime_id, supported=()):
+        super().__init__(runtime_id)
+        self.supported = supported
+        self.queries = 0
+
+    def GetCurrentPattern(self, pattern_id):
+        self.queries += 1
+        return Pattern() if pattern_id in self.supported else None
+
+class Pattern:
+    def QueryInterface(self, interface):
+        return self
+
+@pytest.fixture
+def patterns():
+    core_logic.clear_pattern_cache()
+    yield
+    core_logic.clear_pattern_cache()
+
+def test_patterns_are_asked_for_once(patterns):
+    edit = PatternNode(7, supported=(1,))
+    first = core_logic.get_pattern(edit, 1, None)
+    assert core_logic.get_pattern(edit, 1, None) is first
+    assert core_logic.get_pattern(edit, 2, None) is None
+    assert core_logic.get_pattern(edit, 2, None) is None
+    assert edit.queries == 2
+
+def test_cached_patterns_expire(patterns, monkeypatch):
+    assert core_logic.get_pattern(PatternNode(7), 1, None) is None
+    reused = PatternNode(7, supported=(1,))  # A new element with the RuntimeId of a gone one.
+    assert core_logic.get_pattern(reused, 1, None) is None
+    monkeypatch.setattr(core_logic, 'PATTERN_CACHE_TTL', 0)
+    assert core_logic.get_pattern(reused, 1, None) is not None
+    core_logic.get_pattern(PatternNode(8), 1, None)
+    assert len(core_logic.PATTERN_CACHE) == 0  # Expired interfaces are released, not kept.
+
+def test_pattern_properties_are_never_memoized():
+    pattern_keys = [key for key in core_logic.PROPERTY_PROVIDERS if key.startswith('uia_')]
+    assert pattern_keys
+    assert not [key for key in pattern_keys if core_logic.PROPERTY_PROVIDERS[key].cacheable]
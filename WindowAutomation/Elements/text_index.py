@@ -0,0 +1,107 @@
+# text_index.py
+# Trigram similarity for fuzzy title matching, plus a trigram index over (item, text) pairs
+# so a fuzzy query only scores the items that can possibly reach the threshold.
+# Used by the 'fuzzy' operator of core_logic and the Debugger's score column.
+
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+# ======================================================================
+#                      TRIGRAM SIMILARITY
+# ======================================================================
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize(text):
+    """Lower-cases and collapses whitespace, so case and spacing never count as a difference."""
+    return _WHITESPACE.sub(' ', str(text)).strip().lower()
+
+def trigrams(text):
+    """The set of character trigrams of the normalized text, padded so short words still have some."""
+    return _trigrams(str(text))
+
+@lru_cache(maxsize=8192)
+def _trigrams(text):
+    # UI trees repeat the same titles a lot (and searches retry), so sets are memoized.
+    padded = f"  {normalize(text)} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def dice(a, b):
+    """Dice coefficient of two trigram sets: 1.0 for identical sets, 0.0 for disjoint ones."""
+    if not a and not b:
+        return 1.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+def similarity(text, other):
+    """Trigram similarity of two strings in [0, 1] (case and whitespace insensitive)."""
+    if text is None or other is None:
+        return 0.0
+    return dice(trigrams(text), trigrams(other))
+
+def size_bounds(size, threshold):
+    """
+    The trigram-set sizes another set must have to reach 'threshold' against a set of
+    'size': dice <= 2 * min / (size + other), so anything outside the bounds can be skipped.
+    A threshold above 1 can never be reached, so its bounds are empty.
+    """
+    if threshold <= 0:
+        return 0, float('inf')
+    if threshold > 1:
+        return float('inf'), 0
+    return size * threshold / (2.0 - threshold), size * (2.0 - threshold) / threshold
+
+# ======================================================================
+#                      TRIGRAM INDEX
+# ======================================================================
+
+class TrigramIndex:
+    """
+    Inverted index trigram -> item positions over (item, text) pairs. search() counts
+    shared trigrams through the posting lists, so only items sharing at least one
+    trigram (and with a compatible trigram count) are ever scored.
+    """
+    def __init__(self, items=()):
+        self._items = []
+        self._sizes = []
+        self._postings = defaultdict(list)
+        for item, text in items:
+            self.insert(item, text)
+
+    def __len__(self):
+        return len(self._items)
+
+    def insert(self, item, text):
+        if text is None:
+            return
+        grams = trigrams(text)
+        position = len(self._items)
+        self._items.append(item)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(position)
+
+    def search(self, query, threshold=0.8):
+        """
+        The items whose text scores at least 'threshold' against the query, as
+        (score, item) pairs, best first (ties in insertion order). A threshold <= 0 is
+        reached by every item, including those sharing no trigram with the query.
+        """
+        query_grams = trigrams(query)
+        low, high = size_bounds(len(query_grams), threshold)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] += 1
+        candidates = range(len(self._items)) if threshold <= 0 else shared
+        results = []
+        for position in candidates:
+            count = shared.get(position, 0)
+            size = self._sizes[position]
+            if size < low or size > high:
+                continue
+            score = 2.0 * count / (len(query_grams) + size)
+            if score >= threshold:
+                results.append((score, position))
+        results.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [(score, self._items[position]) for score, position in results]
@@ -1,6 +1,10 @@
 # tool_debugger.py
 # A standalone and embeddable tool for testing and debugging selectors.
 # Final version with all layout and import fixes, and spec receiving logic.
+# --- PERF: Detail lookups take a property profile/fields and read a selected window only once.
+# --- PERF: "Use snapshot" scans a window once and evaluates element specs against the
+# SnapshotIndex of that scan instead of the live UI.
+# --- Results of specs with a 'fuzzy' criteria show each match's similarity score.
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, font, messagebox
@@ -21,8 +25,9 @@ except ImportError as e:
 # --- Shared Logic Import ---
 try:
     import core_logic
+    from snapshot_index import SnapshotIndex
 except ImportError:
-    print("CRITICAL ERROR: 'core_logic.py' must be in the same directory.")
+    print("CRITICAL ERROR: 'core_logic.py' and 'snapshot_index.py' must be in the same directory.")
     sys.exit(1)
 
 # ======================================================================
@@ -41,10 +46,38 @@ class SelectorDebugger:
         self.finder = core_logic.ElementFinder(
             uia_instance=self.uia, tree_walker=self.tree_walker, log_callback=self.log
         )
-
-    def run_debug_session(self, window_spec, element_spec, on_complete_callback):
+        self.scanner = None
+        self.snapshots = {}  # window handle -> SnapshotIndex of its last scan
+
+    def get_snapshot(self, window, rescan=False):
+        """Returns the SnapshotIndex of a window, scanning it (with the Explorer's scanner) if needed."""
+        snapshot = None if rescan else self.snapshots.get(window.handle)
+        if snapshot is None:
+            if self.scanner is None:
+                from tool_explorer import FullScanner
+                self.scanner = FullScanner()
+            self.log('INFO', "Scanning window into a snapshot...")
+            snapshot = SnapshotIndex(self.scanner.get_all_elements_from_window(window))
+            self.snapshots[window.handle] = snapshot
+        self.log('INFO', f"Using snapshot of {len(snapshot)} elements (no live rescan).")
+        return snapshot
+
+    def fuzzy_scores(self, spec, items):
+        """
+        The similarity scores of the spec's 'fuzzy' criteria ({key: score} per item), or
+        None if the spec has none. For a path spec, the last step's criteria are scored.
+        """
+        if core_logic.is_path_spec(spec):
+            spec = spec[-1][1] if spec and isinstance(spec[-1], (tuple, list)) else (spec[-1] if spec else {})
+        fuzzy = {key: criteria for key, criteria in (spec or {}).items() if core_logic.fuzzy_target(criteria)}
+        if not fuzzy:
+            return None
+        return [{key: core_logic.fuzzy_score(core_logic.get_property_value(item, key, self.uia, self.tree_walker), criteria)
+                 for key, criteria in fuzzy.items()} for item in items]
+
+    def run_debug_session(self, window_spec, element_spec, on_complete_callback, use_snapshot=False):
         self.log('HEADER', "--- STARTING DEBUG SESSION ---")
-        result_bundle = {"results": [], "level": "element"}
+        result_bundle = {"results": [], "level": "element", "scores": None}
         try:
             self.log('INFO', "--- Step 1: Searching for WINDOW ---")
             windows = self.finder.find(lambda: self.desktop.windows(), window_spec)
@@ -54,16 +87,24 @@ class SelectorDebugger:
                 self.log('SUCCESS', f"Found 1 unique window: '{target_window.window_text()}'")
                 if element_spec:
                     self.log('INFO', "--- Step 2: Searching for ELEMENT inside window ---")
-                    elements = self.finder.find(lambda: target_window.descendants(), element_spec)
+                    if use_snapshot:
+                        rows = self.get_snapshot(target_window).find(element_spec, log_callback=self.log)
+                        elements = [row.element for row in rows]
+                    else:
+                        self.snapshots.pop(target_window.handle, None)
+                        elements = self.finder.find(lambda: target_window.descendants(), element_spec)
                     result_bundle["results"] = elements
                     result_bundle["level"] = "element"
+                    result_bundle["scores"] = self.fuzzy_scores(element_spec, elements)
                 else:
                     result_bundle["results"] = [target_window]
                     result_bundle["level"] = "window"
+                    result_bundle["scores"] = self.fuzzy_scores(window_spec, [target_window])
             elif len(windows) > 1:
                 self.log('ERROR', f"Found {len(windows)} ambiguous windows. Please refine window_spec.")
                 result_bundle["results"] = windows
                 result_bundle["level"] = "window"
+                result_bundle["scores"] = self.fuzzy_scores(window_spec, windows)
             else:
                 self.log('ERROR', "No window found matching the specified criteria.")
         except Exception as e:
@@ -73,9 +114,9 @@ class SelectorDebugger:
         self.log('HEADER', "--- DEBUG SESSION FINISHED ---")
         on_complete_callback(result_bundle)
             
-    def get_element_details(self, pwa_element):
-        self.log('DEBUG', "--- Getting full properties for selected item ---")
-        return core_logic.get_all_properties(pwa_element, self.uia, self.tree_walker)
+    def get_element_details(self, pwa_element, profile='full', fields=None):
+        self.log('DEBUG', f"--- Getting '{profile}' properties for selected item ---")
+        return core_logic.get_all_properties(pwa_element, self.uia, self.tree_walker, profile=profile, fields=fields)
 
 # ======================================================================
 #                       GUI CLASS (Embeddable Frame)
@@ -141,6 +182,8 @@ class DebuggerTab(ttk.Frame):
         self.get_spec_button.pack(side="left", padx=10)
         self.clear_button = ttk.Button(button_frame, text="Clear Log", command=self.clear_log)
         self.clear_button.pack(side="left", padx=10)
+        self.use_snapshot_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Use snapshot (scan once)", variable=self.use_snapshot_var).pack(side="left", padx=10)
         return frame
 
     def create_results_frame(self, parent):
@@ -215,7 +258,7 @@ class DebuggerTab(ttk.Frame):
             self.run_button.config(state="normal")
             self.update_status("Debugger: Error in spec.")
             return
-        self.test_thread = threading.Thread(target=self.debugger.run_debug_session, args=(win_spec, elem_spec, self.on_test_complete), daemon=True)
+        self.test_thread = threading.Thread(target=self.debugger.run_debug_session, args=(win_spec, elem_spec, self.on_test_complete, self.use_snapshot_var.get()), daemon=True)
         self.test_thread.start()
 
     def on_test_complete(self, result_bundle):
@@ -226,6 +269,9 @@ class DebuggerTab(ttk.Frame):
         self.found_items_map.clear()
         results = result_bundle.get("results", [])
         search_level = result_bundle.get("level", "element")
+        scores = result_bundle.get("scores")
+        score_keys = list(scores[0]) if scores else []
+        score_columns = [f"Score ({key})" for key in score_keys]
         
         if not results:
             self.update_status("Debugger: Test finished. No items found.")
@@ -239,15 +285,16 @@ class DebuggerTab(ttk.Frame):
 
         if search_level == 'window':
             self.results_labelframe.config(text="Found Windows")
-            self.configure_treeview_columns(['Title', 'Handle', 'Process Name'])
-            for win in results:
+            self.configure_treeview_columns(['Title', 'Handle', 'Process Name'] + score_columns)
+            for index, win in enumerate(results):
                 values = (win.window_text(), win.handle, core_logic.get_property_value(win, 'proc_name'))
+                values += tuple(f"{scores[index][key]:.2f}" for key in score_keys)
                 item_id = self.results_tree.insert("", "end", values=values)
                 self.found_items_map[item_id] = (win, 'window')
         elif search_level == 'element':
             self.results_labelframe.config(text="Found Elements")
-            self.configure_treeview_columns(['Title/Name', 'Control Type', 'Automation ID'])
-            for elem in results:
+            self.configure_treeview_columns(['Title/Name', 'Control Type', 'Automation ID'] + score_columns)
+            for index, elem in enumerate(results):
                 # <<< LOGIC MODIFIED HERE >>>
                 # Get each property individually to provide more specific error feedback.
                 try:
@@ -266,6 +313,7 @@ class DebuggerTab(ttk.Frame):
                     auto_id = "[Error: Failed to get ID]"
                 
                 values = (title, ctrl_type, auto_id)
+                values += tuple(f"{scores[index][key]:.2f}" for key in score_keys)
                 item_id = self.results_tree.insert("", "end", values=values)
                 self.found_items_map[item_id] = (elem, 'element')
 
@@ -335,7 +383,7 @@ class DebuggerTab(ttk.Frame):
             element_pwa = self.selected_item
             window_pwa = element_pwa.top_level_parent()
         window_info = self.debugger.get_element_details(window_pwa)
-        element_info = self.debugger.get_element_details(element_pwa)
+        element_info = window_info if element_pwa is window_pwa else self.debugger.get_element_details(element_pwa)
         cleaned_element_info = core_logic.clean_element_spec(window_info, element_info)
         
         def send_specs(win_spec, elem_spec):
@@ -1,7 +1,7 @@
 # tool_explorer.py
 # A standalone and embeddable tool for full window element scanning.
-# --- VERSION 7.1 (KeyError Fix): Corrected a critical bug where 'sys_unique_id' was not being
-# added to window properties, causing a crash when building smart specs for duplicate windows.
+# --- VERSION 7.5: A scanned window is kept as a SnapshotIndex, so building the optimal element
+# spec uses hash lookups instead of re-filtering every row for each candidate spec.
 
 import logging
 import re
@@ -29,20 +29,28 @@ except ImportError as e:
 # --- Shared Logic Import ---
 try:
     import core_logic
+    from finder_backends import UIABackend
+    from snapshot_index import SnapshotIndex
 except ImportError:
-    print("CRITICAL ERROR: 'core_logic.py' must be in the same directory.")
+    print("CRITICAL ERROR: 'core_logic.py', 'finder_backends.py' and 'snapshot_index.py' must be in the same directory.")
     sys.exit(1)
 
 # ======================================================================
 #                      SCANNER LOGIC CLASS (BACKEND)
 # ======================================================================
 class FullScanner:
-    def __init__(self):
+    def __init__(self, prefetch=True, window_profile='quick_spec', element_profile='explorer_columns'):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.desktop = Desktop(backend='uia')
+        self.prefetch = prefetch
+        # Property profiles (see core_logic.PROPERTY_PROFILES) loaded up front; the rows are
+        # LazyProperties, so anything else is fetched on demand (e.g. for the detail view).
+        self.window_profile = window_profile
+        self.element_profile = element_profile
         try:
             self.uia = comtypes.client.CreateObject(UIA.CUIAutomation)
             self.tree_walker = self.uia.ControlViewWalker
+            self.backend = UIABackend(self.uia)
         except (OSError, comtypes.COMError) as e:
             self.logger.critical(f"Fatal error initializing COM: {e}", exc_info=True)
             raise
@@ -50,11 +58,15 @@ class FullScanner:
     def get_all_windows(self):
         self.logger.info("Starting to scan all windows on the desktop...")
         windows = self.desktop.windows()
+        # One process_iter() pass instead of a psutil lookup per window.
+        proc_keys = [k for k in core_logic.profile_fields(self.window_profile) if k in core_logic.ProcessInfoCache.FIELDS]
+        if proc_keys:
+            core_logic.PROCESS_INFO_CACHE.prefetch(proc_keys)
         all_windows_data = []
         for win in windows:
             try:
                 if win.is_visible() and win.window_text():
-                    info = core_logic.get_all_properties(win, self.uia, self.tree_walker)
+                    info = core_logic.get_all_properties(win, self.uia, self.tree_walker, profile=self.window_profile)
                     info['pwa_object'] = win # Keep the object for later use
                     # FIX: Added the missing 'sys_unique_id' key to prevent KeyError
                     info['sys_unique_id'] = id(win.element_info.element)
@@ -64,24 +76,67 @@ class FullScanner:
         self.logger.info(f"Found {len(all_windows_data)} valid windows.")
         return all_windows_data
 
-    def get_all_elements_from_window(self, window_pwa_object):
+    def get_all_elements_from_window(self, window_pwa_object, fields=None):
         if not window_pwa_object:
             self.logger.error("Invalid window object provided.")
             return []
         window_title = window_pwa_object.window_text()
         self.logger.info(f"Starting deep scan for all elements in window: '{window_title}'")
+        fields = core_logic.profile_fields(self.element_profile, fields)
         all_elements_data = []
-        root_com_element = window_pwa_object.element_info.element
-        self._walk_element_tree(root_com_element, 0, all_elements_data)
+        # Depth of the window itself; every scanned element's rel_level follows from it.
+        window_depth = core_logic.get_property_value(window_pwa_object, 'rel_level', self.uia, self.tree_walker)
+        if self.prefetch:
+            try:
+                all_elements_data = self._scan_prefetched_tree(window_pwa_object, fields, window_depth)
+            except (comtypes.COMError, AttributeError) as e:
+                self.logger.warning(f"Prefetch scan failed, falling back to a live walk: {e}")
+                all_elements_data = []
+        if not all_elements_data:
+            root_com_element = window_pwa_object.element_info.element
+            self._walk_element_tree(root_com_element, 0, all_elements_data, fields=fields, window_depth=window_depth)
         self.logger.info(f"Scan complete. Collected {len(all_elements_data)} elements.")
         return all_elements_data
 
-    def _walk_element_tree(self, element_com, level, all_elements_data, max_depth=25):
+    def _known_depth(self, element, window_depth, level):
+        """Primes rel_level for an element 'level' steps below the window, if the window's depth is known."""
+        if window_depth is None:
+            return {}
+        depth = window_depth + level
+        core_logic.record_element_depth(element, depth, self.tree_walker)
+        return {'rel_level': depth}
+
+    def _scan_prefetched_tree(self, window_pwa_object, fields, window_depth=None, max_depth=25):
+        """
+        Same result as _walk_element_tree, but the control-view subtree and its cheap
+        properties come from a single cache request. Other properties are read live.
+        """
+        keys = [k for k in fields if k in self.backend.PREFETCH_KEYS]
+        nodes = self.backend.prefetch_subtree(window_pwa_object, keys, max_depth)
+        all_elements_data = []
+        for node in nodes:
+            cache = core_logic.PropertyCache(self.uia, self.tree_walker)
+            cache.prime(node.element, node.values)
+            cache.prime(node.element, self._known_depth(node.element, window_depth, node.level))
+            try:
+                element_data = core_logic.get_all_properties(node.element, self.uia, self.tree_walker, cache=cache, fields=fields)
+            except Exception as e:
+                self.logger.warning(f"Error reading element at level {node.level}: {e}")
+                continue
+            if element_data:
+                element_data['sys_unique_id'] = id(node.element.element_info.element)
+                element_data['sys_parent_id'] = id(node.parent.element.element_info.element) if node.parent else 0
+                all_elements_data.append(element_data)
+        return all_elements_data
+
+    def _walk_element_tree(self, element_com, level, all_elements_data, max_depth=25, fields=None, window_depth=None):
         if element_com is None or level > max_depth:
             return
         try:
             element_pwa = UIAWrapper(UIAElementInfo(element_com))
-            element_data = core_logic.get_all_properties(element_pwa, self.uia, self.tree_walker)
+            cache = core_logic.PropertyCache(self.uia, self.tree_walker)
+            cache.prime(element_pwa, self._known_depth(element_pwa, window_depth, level))
+            element_data = core_logic.get_all_properties(element_pwa, self.uia, self.tree_walker, cache=cache, fields=fields)
             if element_data:
                 element_data['sys_unique_id'] = id(element_com)
                 parent_com = self.tree_walker.GetParentElement(element_com)
@@ -90,7 +145,7 @@ class FullScanner:
 
             child = self.tree_walker.GetFirstChildElement(element_com)
             while child:
-                self._walk_element_tree(child, level + 1, all_elements_data, max_depth)
+                self._walk_element_tree(child, level + 1, all_elements_data, max_depth, fields, window_depth)
                 try:
                     child = self.tree_walker.GetNextSiblingElement(child)
                 except comtypes.COMError:
@@ -123,6 +178,7 @@ class ExplorerTab(ttk.Frame):
         self.selected_element_data = None
         self.window_data_cache = []
         self.element_data_cache = []
+        self.element_snapshot = None
         self.window_map = {}
         self.element_map = {}
         self.highlighter_window = None
@@ -148,14 +204,11 @@ class ExplorerTab(ttk.Frame):
             return True
         return False
 
-    def _build_optimal_element_spec(self, selected_element, all_elements_in_window):
+    def _build_optimal_element_spec(self, selected_element, snapshot):
         self.logger.info("--- Building Optimal Element Spec ---")
         if not selected_element: return {}
 
-        def get_matches(spec, elements_list):
-            return [elem for elem in elements_list if all(elem.get(k) == v for k, v in spec.items())]
-
-        comparison_list = all_elements_in_window
+        # Each candidate spec is an equality lookup on the scan's hash indexes.
         property_combinations = [
             ['pwa_auto_id'],
             ['pwa_title', 'pwa_control_type'],
@@ -164,7 +217,7 @@ class ExplorerTab(ttk.Frame):
             ['pwa_class_name'],
         ]
         best_effort_spec = {}
-        min_matches_count = len(comparison_list)
+        min_matches_count = len(snapshot)
 
         for combo in property_combinations:
             spec = {}
@@ -176,13 +229,13 @@ class ExplorerTab(ttk.Frame):
                 spec[prop] = value
             
             if is_combo_valid:
-                matches = get_matches(spec, comparison_list)
+                matches = snapshot.lookup(spec)
                 if len(matches) == 1: return spec
                 if len(matches) < min_matches_count:
                     min_matches_count = len(matches)
                     best_effort_spec = spec
         
-        final_matches = get_matches(best_effort_spec, comparison_list)
+        final_matches = snapshot.lookup(best_effort_spec)
         if len(final_matches) > 1:
             relative_index = next((i for i, match in enumerate(final_matches) if match['sys_unique_id'] == selected_element['sys_unique_id']), -1)
             if relative_index != -1:
@@ -221,9 +274,12 @@ class ExplorerTab(ttk.Frame):
         
         window_info = self.selected_window_data
         element_info = self.selected_element_data
+        # Scanned rows only hold their profile's columns; the detail view shows everything.
+        for info in (window_info, element_info):
+            if hasattr(info, 'load_all'): info.load_all()
         cleaned_element_info = core_logic.clean_element_spec(window_info, element_info)
         
-        optimal_element_spec = self._build_optimal_element_spec(element_info, self.element_data_cache)
+        optimal_element_spec = self._build_optimal_element_spec(element_info, self.element_snapshot or SnapshotIndex(self.element_data_cache))
         optimal_window_spec = self._build_optimal_window_spec(window_info, self.window_data_cache)
 
         def send_specs(win_spec, elem_spec):
@@ -330,6 +386,7 @@ class ExplorerTab(ttk.Frame):
 
     def _scan_elements_thread(self):
         self.element_data_cache = self.scanner.get_all_elements_from_window(self.selected_window_data['pwa_object'])
+        self.element_snapshot = SnapshotIndex(self.element_data_cache)
         self.after(0, self.populate_elements_tree, self.element_data_cache)
 
     def populate_elements_tree(self, elements):
@@ -436,6 +493,8 @@ class ExplorerTab(ttk.Frame):
             return
         try:
             self.update_status(f"Explorer: Exporting to {os.path.basename(file_path)}...")
+            for row in self.element_data_cache:
+                if hasattr(row, 'load_all'): row.load_all()
             df = pd.DataFrame(self.element_data_cache)
             df.to_excel(file_path, index=False, engine='openpyxl')
             self.update_status("Explorer: Excel export successful!")
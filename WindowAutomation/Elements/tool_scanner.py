@@ -1,7 +1,7 @@
 # tool_scanner.py
 # A standalone tool for interactive UI element inspection using hotkeys.
-# --- VERSION 5.6: Corrected the __main__ block to properly launch ScannerApp
-# for standalone execution, fixing the 'not defined' error.
+# --- VERSION 5.8: F9 drill-down hit-tests a spatial index of the current element's children
+# (built from one UIA cache request per press) instead of reading each child's rectangle.
 
 import logging
 import os
@@ -30,10 +30,11 @@ except ImportError as e:
 # --- Shared Logic Import ---
 try:
     import core_logic
+    from spatial_index import SpatialIndex
 except ImportError:
     root = tk.Tk()
     root.withdraw()
-    messagebox.showerror("Missing File", "CRITICAL ERROR: 'core_logic.py' must be in the same directory.")
+    messagebox.showerror("Missing File", "CRITICAL ERROR: 'core_logic.py' and 'spatial_index.py' must be in the same directory.")
     sys.exit(1)
 
 # ======================================================================
@@ -45,17 +46,9 @@ DIALOG_WIDTH = 350
 DIALOG_HEIGHT = 700
 DIALOG_DEFAULT_GEOMETRY = "-10-10" 
 
-ALL_QUICK_SPEC_OPTIONS = [
-    "pwa_title", "pwa_auto_id", "pwa_control_type", "pwa_class_name", "pwa_framework_id",
-    "win32_handle", "win32_styles", "win32_extended_styles", "state_is_visible",
-    "state_is_enabled", "state_is_active", "state_is_minimized", "state_is_maximized",
-    "state_is_focusable", "state_is_password", "state_is_offscreen", "state_is_content_element",
-    "state_is_control_element", "geo_bounding_rect_tuple", "geo_center_point", "proc_pid",
-    "proc_thread_id", "proc_name", "proc_path", "proc_cmdline", "proc_create_time",
-    "proc_username", "rel_level", "rel_parent_handle", "rel_parent_title", "rel_labeled_by",
-    "rel_child_count", "uia_value", "uia_toggle_state", "uia_expand_state",
-    "uia_selection_items", "uia_range_value_info", "uia_grid_cell_info", "uia_table_row_headers"
-]
+# A live view of the registered property keys, so custom properties added with
+# core_logic.register_property() appear as quick-spec options too.
+ALL_QUICK_SPEC_OPTIONS = core_logic.PROPERTY_PROVIDERS.keys()
 DEFAULT_QUICK_SPEC_OPTIONS = [
     'pwa_auto_id',
     'pwa_title',
@@ -68,11 +61,14 @@ DEFAULT_QUICK_SPEC_OPTIONS = [
 # ======================================================================
 
 class InteractiveScannerLogic:
-    def __init__(self, root_gui):
+    def __init__(self, root_gui, profile='full'):
         if UIA is None: raise RuntimeError("UIAutomationClient could not be initialized.")
         self.logger = logging.getLogger(self.__class__.__name__)
         self.root_gui = root_gui
         self.current_element = None
+        # Property profile read for each inspected element and its window (see
+        # core_logic.PROPERTY_PROFILES). The spec dialog prints every property, hence 'full'.
+        self.profile = profile
         try:
             self.uia = comtypes.client.CreateObject(UIA.CUIAutomation)
             self.tree_walker = self.uia.ControlViewWalker
@@ -122,19 +118,8 @@ class InteractiveScannerLogic:
             return
         try:
             cursor_pos = win32gui.GetCursorPos()
-            point = wintypes.POINT(cursor_pos[0], cursor_pos[1])
-            found_child = None
-            child = self.tree_walker.GetFirstChildElement(self.current_element)
-            while child:
-                try:
-                    child_rect = child.CurrentBoundingRectangle
-                    if (child_rect and
-                        point.x >= child_rect.left and point.x <= child_rect.right and
-                        point.y >= child_rect.top and point.y <= child_rect.bottom):
-                        found_child = child
-                        break
-                    child = self.tree_walker.GetNextSiblingElement(child)
-                except comtypes.COMError: break
+            hits = self._children_index(self.current_element).at_point(cursor_pos[0], cursor_pos[1])
+            found_child = hits[0] if hits else None
             if found_child:
                 self.logger.info(f"Entering child: '{found_child.CurrentName}'. Updating...")
                 self.current_element = found_child
@@ -144,18 +129,48 @@ class InteractiveScannerLogic:
         except Exception as e:
             self.logger.error(f"Unexpected error scanning for child element: {e}", exc_info=True)
 
+    def _children_index(self, element_com):
+        """
+        Returns a SpatialIndex of the control-view children of element_com. It is rebuilt
+        on every F9 press, since the layout may have changed while the element stayed
+        current; the children and their rectangles come from a single UIA cache request,
+        and if that fails they are read one by one with the tree walker.
+        """
+        items = []
+        try:
+            request = self.uia.CreateCacheRequest()
+            request.AddProperty(UIA.UIA_BoundingRectanglePropertyId)
+            request.TreeFilter = self.uia.ControlViewCondition
+            request.TreeScope = UIA.TreeScope_Children
+            children = element_com.BuildUpdatedCache(request).GetCachedChildren()
+            for i in range(children.Length if children else 0):
+                child = children.GetElement(i)
+                rect = child.CachedBoundingRectangle
+                items.append((child, (rect.left, rect.top, rect.right, rect.bottom)))
+        except comtypes.COMError as e:
+            self.logger.debug(f"Cache request for children failed ({e}); walking them instead.")
+            items = []
+            child = self.tree_walker.GetFirstChildElement(element_com)
+            while child:
+                try:
+                    rect = child.CurrentBoundingRectangle
+                    items.append((child, (rect.left, rect.top, rect.right, rect.bottom)))
+                    child = self.tree_walker.GetNextSiblingElement(child)
+                except comtypes.COMError: break
+        return SpatialIndex(items)
+
     def _inspect_element(self, element_com):
         element_pwa = self._create_full_pwa_wrapper(element_com)
         if not element_pwa:
             self.logger.error("Could not create PWA wrapper for the selected element.")
             return
         
-        element_details = core_logic.get_all_properties(element_pwa, self.uia, self.tree_walker)
+        element_details = core_logic.get_all_properties(element_pwa, self.uia, self.tree_walker, profile=self.profile)
         top_level_window_pwa = core_logic.get_top_level_window(element_pwa)
 
         window_details = {}
         if top_level_window_pwa:
-            window_details = core_logic.get_all_properties(top_level_window_pwa, self.uia, self.tree_walker)
+            window_details = core_logic.get_all_properties(top_level_window_pwa, self.uia, self.tree_walker, profile=self.profile)
         else:
             self.logger.warning("Could not determine the top-level parent window.")
 
@@ -0,0 +1,365 @@
+# ui_events.py
+# UI change notifications for the event-driven waits of core_controller.UIController.
+# An EventSource delivers UIEvent objects (window opened/closed, structure changed, property
+# changed) to its subscribers: UIAEventSource gets them from UI Automation, SimulatedEventSource
+# from code (tests, replays). EventWaiter turns a subscription into "sleep until something
+# relevant changed", with a timeout so the caller can keep polling as a fallback.
+
+import logging
+import threading
+import time
+
+# --- Required Libraries ---
+try:
+    import comtypes
+    import comtypes.client
+    import win32con
+    import win32gui
+    from comtypes.gen import UIAutomationClient as UIA
+except ImportError as e:
+    print(f"Error importing libraries: {e}")
+    print("Suggestion: pip install comtypes pywin32")
+    exit()
+
+logger = logging.getLogger(__name__)
+
+# ======================================================================
+#                      EVENTS
+# ======================================================================
+
+WINDOW_OPENED = 'window_opened'
+WINDOW_CLOSED = 'window_closed'
+STRUCTURE_CHANGED = 'structure_changed'
+PROPERTY_CHANGED = 'property_changed'
+EVENT_KINDS = (WINDOW_OPENED, WINDOW_CLOSED, STRUCTURE_CHANGED, PROPERTY_CHANGED)
+
+class UIEvent:
+    """
+    One UI change. 'keys' are the spec property keys a property change affects; 'window'
+    is the handle of the top-level window it happened in, when the source knows it.
+    """
+    __slots__ = ('kind', 'keys', 'window', 'time')
+
+    def __init__(self, kind, keys=(), window=None):
+        self.kind = kind
+        self.keys = (keys,) if isinstance(keys, str) else tuple(keys or ())
+        self.window = window
+        self.time = time.monotonic()
+
+    def __repr__(self):
+        return f"UIEvent({self.kind!r}, keys={self.keys}, window={self.window})"
+
+# ======================================================================
+#                      EVENT SOURCES
+# ======================================================================
+
+class EventSource:
+    """
+    Interface of an event source. subscribe(callback, root, property_keys) starts delivering
+    the events below 'root' (a pywinauto element; None = the desktop's top-level windows)
+    to callback(event) and returns a token for unsubscribe(). property_keys limits property
+    changes to those spec keys (None = DEFAULT_PROPERTY_KEYS). Callbacks may run on
+    another thread and must not block. wait_for() is how a subscriber sleeps until one
+    of its callbacks has set a threading.Event.
+    """
+    name = 'base'
+
+    def subscribe(self, callback, root=None, property_keys=None):
+        raise NotImplementedError
+
+    def unsubscribe(self, token):
+        raise NotImplementedError
+
+    def wait_for(self, signal, timeout):
+        """Waits up to timeout seconds for the signal (a threading.Event); returns whether it is set."""
+        return signal.wait(max(timeout, 0))
+
+    def close(self):
+        pass
+
+class SimulatedEventSource(EventSource):
+    """
+    Delivers the events passed to emit() to every subscriber, whatever their root. emit()
+    may be called from any thread; emit_later() does it from a timer thread.
+    """
+    name = 'simulated'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._next_token = 0
+        self.emitted = []
+
+    def subscribe(self, callback, root=None, property_keys=None):
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = callback
+            return self._next_token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def emit(self, kind, keys=(), window=None):
+        event = UIEvent(kind, keys, window)
+        with self._lock:
+            self.emitted.append(event)
+            callbacks = list(self._subscribers.values())
+        for callback in callbacks:
+            callback(event)
+        return event
+
+    def emit_later(self, delay, kind, keys=(), window=None):
+        """Emits the event after 'delay' seconds from a timer thread; returns the timer."""
+        timer = threading.Timer(delay, self.emit, args=(kind, keys, window))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+# Spec property key -> name of the UIA property whose change event can affect it.
+_PROPERTY_EVENT_NAMES = {
+    'pwa_title': 'UIA_NamePropertyId',
+    'pwa_auto_id': 'UIA_AutomationIdPropertyId',
+    'pwa_class_name': 'UIA_ClassNamePropertyId',
+    'state_is_enabled': 'UIA_IsEnabledPropertyId',
+    'state_is_visible': 'UIA_IsOffscreenPropertyId',
+    'state_is_offscreen': 'UIA_IsOffscreenPropertyId',
+    'state_is_focusable': 'UIA_IsKeyboardFocusablePropertyId',
+    'state_is_minimized': 'UIA_WindowWindowVisualStatePropertyId',
+    'state_is_maximized': 'UIA_WindowWindowVisualStatePropertyId',
+    'geo_bounding_rect_tuple': 'UIA_BoundingRectanglePropertyId',
+    'geo_center_point': 'UIA_BoundingRectanglePropertyId',
+    'uia_value': 'UIA_ValueValuePropertyId',
+    'uia_toggle_state': 'UIA_ToggleToggleStatePropertyId',
+    'uia_expand_state': 'UIA_ExpandCollapseExpandCollapseStatePropertyId',
+    'uia_selection_items': 'UIA_SelectionSelectionPropertyId',
+    'uia_range_value_info': 'UIA_RangeValueValuePropertyId',
+}
+PROPERTY_EVENT_IDS = {key: getattr(UIA, name) for key, name in _PROPERTY_EVENT_NAMES.items() if hasattr(UIA, name)}
+_KEYS_BY_PROPERTY_ID = {}
+for _key, _property_id in PROPERTY_EVENT_IDS.items():
+    _KEYS_BY_PROPERTY_ID.setdefault(_property_id, []).append(_key)
+del _key, _property_id
+DEFAULT_PROPERTY_KEYS = ('pwa_title', 'state_is_enabled', 'state_is_offscreen')
+
+def property_event_ids(keys):
+    """The distinct UIA property ids whose change events can affect the given spec keys."""
+    return list(dict.fromkeys(PROPERTY_EVENT_IDS[k] for k in keys if k in PROPERTY_EVENT_IDS))
+
+MAX_WINDOW_LOOKUP_DEPTH = 50
+
+def top_level_handle(uia_instance, com_element):
+    """
+    The handle of the top-level window a UIA COM element belongs to, or None. Elements
+    without a native handle (most WPF and UIA-only controls) use their nearest ancestor
+    that has one.
+    """
+    walker = uia_instance.ControlViewWalker
+    current = com_element
+    for _ in range(MAX_WINDOW_LOOKUP_DEPTH):
+        if not current:
+            return None
+        try:
+            handle = current.CurrentNativeWindowHandle
+            if handle:
+                return win32gui.GetAncestor(handle, win32con.GA_ROOT) or handle
+            current = walker.GetParentElement(current)
+        except comtypes.COMError:
+            return None  # The element is gone (e.g. the sender of a removal).
+    return None
+
+class _AutomationEventHandler(comtypes.COMObject):
+    _com_interfaces_ = [UIA.IUIAutomationEventHandler]
+
+    def __init__(self, deliver):
+        super().__init__()
+        self._deliver = deliver
+
+    def HandleAutomationEvent(self, sender, event_id):
+        kind = WINDOW_OPENED if event_id == UIA.UIA_Window_WindowOpenedEventId else WINDOW_CLOSED
+        self._deliver(UIEvent(kind))
+
+class _StructureChangedEventHandler(comtypes.COMObject):
+    _com_interfaces_ = [UIA.IUIAutomationStructureChangedEventHandler]
+
+    def __init__(self, deliver, window_of=None):
+        super().__init__()
+        self._deliver = deliver
+        self._window_of = window_of
+
+    def HandleStructureChangedEvent(self, sender, change_type, runtime_id):
+        window = None
+        if self._window_of is not None:
+            try:
+                window = self._window_of(sender)
+            except Exception as e:
+                logger.debug(f"Could not resolve the window of a structure change: {e}")
+        self._deliver(UIEvent(STRUCTURE_CHANGED, window=window))
+
+class _PropertyChangedEventHandler(comtypes.COMObject):
+    _com_interfaces_ = [UIA.IUIAutomationPropertyChangedEventHandler]
+
+    def __init__(self, deliver):
+        super().__init__()
+        self._deliver = deliver
+
+    def HandlePropertyChangedEvent(self, sender, property_id, new_value):
+        self._deliver(UIEvent(PROPERTY_CHANGED, _KEYS_BY_PROPERTY_ID.get(property_id, ())))
+
+class UIAEventSource(EventSource):
+    """
+    UI Automation events. Every subscription listens for windows opening and closing
+    anywhere on the desktop; structure and property changes are watched in the root's
+    subtree, or only on the desktop's top-level windows when there is no root (watching
+    the whole desktop subtree would flood UIA with events from every application).
+    Structure changes carry the handle of the top-level window they happened in.
+
+    On a single-threaded apartment (the default for the thread that created the UIA
+    instance) UIA delivers events through the thread's message queue, so wait_for() pumps
+    COM messages in PUMP_SLICE steps instead of blocking on the signal.
+    """
+    name = 'uia'
+    PUMP_SLICE = 0.05
+
+    def __init__(self, uia_instance):
+        self.uia = uia_instance
+        self._subscriptions = {}
+        self._next_token = 0
+
+    def subscribe(self, callback, root=None, property_keys=None):
+        deliver = self._guarded(callback)
+        desktop = self.uia.GetRootElement()
+        if root is None:
+            element, scope = desktop, UIA.TreeScope_Children
+        else:
+            element, scope = getattr(getattr(root, 'element_info', None), 'element', root), UIA.TreeScope_Subtree
+        removals = []
+        window_handler = _AutomationEventHandler(deliver)
+        for event_id in (UIA.UIA_Window_WindowOpenedEventId, UIA.UIA_Window_WindowClosedEventId):
+            self._register(removals, lambda: self.uia.AddAutomationEventHandler(event_id, desktop, UIA.TreeScope_Subtree, None, window_handler),
+                           lambda event_id=event_id: self.uia.RemoveAutomationEventHandler(event_id, desktop, window_handler))
+        structure_handler = _StructureChangedEventHandler(deliver, lambda sender: top_level_handle(self.uia, sender))
+        self._register(removals, lambda: self.uia.AddStructureChangedEventHandler(element, scope, None, structure_handler),
+                       lambda: self.uia.RemoveStructureChangedEventHandler(element, structure_handler))
+        property_ids = property_event_ids(DEFAULT_PROPERTY_KEYS if property_keys is None else property_keys)
+        if property_ids:
+            property_handler = _PropertyChangedEventHandler(deliver)
+            self._register(removals, lambda: self.uia.AddPropertyChangedEventHandler(element, scope, None, property_handler, property_ids),
+                           lambda: self.uia.RemovePropertyChangedEventHandler(element, property_handler))
+        self._next_token += 1
+        self._subscriptions[self._next_token] = removals
+        return self._next_token
+
+    @staticmethod
+    def _register(removals, add, remove):
+        try:
+            add()
+            removals.append(remove)
+        except comtypes.COMError as e:
+            logger.warning(f"Could not subscribe to UIA events: {e}")
+
+    @staticmethod
+    def _guarded(callback):
+        # An exception must not travel back into UIA's event thread.
+        def deliver(event):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.debug(f"Error in UI event callback: {type(e).__name__} - {e}")
+        return deliver
+
+    def unsubscribe(self, token):
+        for remove in self._subscriptions.pop(token, ()):
+            try:
+                remove()
+            except comtypes.COMError as e:
+                logger.debug(f"Error removing UIA event handler: {e}")
+
+    def wait_for(self, signal, timeout):
+        end = time.monotonic() + max(timeout, 0)
+        while not signal.is_set():
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            comtypes.client.PumpEvents(min(self.PUMP_SLICE, remaining))
+        return signal.is_set()
+
+    def close(self):
+        for token in list(self._subscriptions):
+            self.unsubscribe(token)
+
+# ======================================================================
+#                      WAITERS
+# ======================================================================
+
+class EventWaiter:
+    """
+    Wait helper over one subscription, used as a context manager around a retry loop.
+    wait(timeout) returns True as soon as a relevant event arrived since the previous
+    wait, or False after the timeout. Property changes are relevant only for the watched
+    keys (all of them when watch_keys is None); every other kind always is.
+
+    The subscription is made by the first wait(), which then returns at once: searches
+    that succeed on the first attempt never subscribe, and a change that happened between
+    that attempt and the subscription is not missed.
+    """
+    def __init__(self, source, root=None, watch_keys=None, on_event=None):
+        self.source = source
+        self.root = root
+        self.watch_keys = None if watch_keys is None else frozenset(watch_keys)
+        self.on_event = on_event
+        self.events = 0
+        self._signal = threading.Event()
+        self._token = None
+        self._subscribed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._token is not None:
+            self.source.unsubscribe(self._token)
+            self._token = None
+        return False
+
+    def relevant(self, event):
+        if event.kind != PROPERTY_CHANGED or self.watch_keys is None or not event.keys:
+            return True
+        return not self.watch_keys.isdisjoint(event.keys)
+
+    def _on_event(self, event):
+        if self.on_event:
+            self.on_event(event)
+        if self.relevant(event):
+            self.events += 1
+            self._signal.set()
+
+    def wait(self, timeout):
+        if not self._subscribed:
+            self._subscribed = True
+            try:
+                self._token = self.source.subscribe(self._on_event, self.root, self.watch_keys)
+                return True
+            except Exception as e:
+                logger.warning(f"Event subscription failed, polling instead: {e}")
+        fired = self.source.wait_for(self._signal, timeout)
+        self._signal.clear()
+        return fired
+
+class PollingWaiter:
+    """Stand-in for EventWaiter in polling mode: wait() simply sleeps for the timeout."""
+    events = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def wait(self, timeout):
+        time.sleep(max(timeout, 0))
+        return False